@@ -1,15 +1,42 @@
 from __future__ import annotations
 
-import json
-
-from app.core.dependencies import get_db, require_verified_user
+from app.core.dependencies import get_db, get_read_db, require_verified_user
+from app.core.instrumentation import InstrumentedRoute
+from app.core.ratelimit import api_key_throttle
+from app.core.scopes import KeyLimits, encode_scopes, parse_scopes
 from app.crud import apikey as crud
+from app.models.apikey import APIKey
 from app.models.user import User
-from app.schemas.apikey import APIKeyCreate, APIKeyOut, APIKeySecretOut
+from app.schemas.apikey import APIKeyCreate, APIKeyLimits, APIKeyOut, APIKeySecretOut, APIKeyUsage
+from app.services.usage import api_key_usage
 from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-router = APIRouter(prefix="/apikeys", tags=["API Keys"])
+router = APIRouter(prefix="/apikeys", tags=["API Keys"], route_class=InstrumentedRoute)
+
+
+def _limits_out(limits: KeyLimits) -> APIKeyLimits | None:
+    if limits.is_empty():
+        return None
+    return APIKeyLimits(rate_limit_per_sec=limits.rate_per_sec, burst=limits.burst, daily_quota=limits.daily_quota)
+
+
+def _key_out(k: APIKey) -> APIKeyOut:
+    parsed = parse_scopes(k.scopes)
+    usage = api_key_throttle.usage(k.id, parsed.limits)
+    return APIKeyOut(
+        id=k.id,
+        name=k.name,
+        prefix=k.prefix,
+        scopes=list(parsed.scopes) if parsed.scopes else None,
+        limits=_limits_out(parsed.limits),
+        usage=APIKeyUsage(requests_today=usage.requests_today, remaining_today=usage.remaining_today),
+        request_count=(k.request_count or 0) + api_key_usage.pending(k.id),
+        last_used_at=k.last_used_at,
+        expires_at=k.expires_at,
+        revoked=k.revoked,
+        created_at=k.created_at,
+    )
 
 
 @router.post("", response_model=APIKeySecretOut, status_code=status.HTTP_201_CREATED)
@@ -18,18 +45,19 @@ async def create_api_key(
     user: User = Depends(require_verified_user),
     db: AsyncSession = Depends(get_db),
 ):
-    scopes_json = json.dumps(payload.scopes) if payload.scopes else None
+    limits = None
+    if payload.limits:
+        limits = KeyLimits(
+            rate_per_sec=payload.limits.rate_limit_per_sec,
+            burst=payload.limits.burst,
+            daily_quota=payload.limits.daily_quota,
+        )
+    scopes_json = encode_scopes(payload.scopes, limits)
     key, display = await crud.create_api_key(
         db, user_id=user.id, name=payload.name, scopes_json=scopes_json, expires_at=payload.expires_at
     )
     return APIKeySecretOut(
-        id=key.id,
-        name=key.name,
-        prefix=key.prefix,
-        scopes=payload.scopes or None,
-        expires_at=key.expires_at,
-        revoked=key.revoked,
-        created_at=key.created_at,
+        **_key_out(key).model_dump(),
         api_key=display,  # show ONCE
     )
 
@@ -37,25 +65,10 @@ async def create_api_key(
 @router.get("", response_model=list[APIKeyOut])
 async def list_api_keys(
     user: User = Depends(require_verified_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     keys = await crud.list_api_keys(db, user.id)
-    out = []
-
-    for k in keys:
-        scopes = json.loads(k.scopes) if k.scopes else None
-        out.append(
-            APIKeyOut(
-                id=k.id,
-                name=k.name,
-                prefix=k.prefix,
-                scopes=scopes,
-                expires_at=k.expires_at,
-                revoked=k.revoked,
-                created_at=k.created_at,
-            )
-        )
-    return out
+    return [_key_out(k) for k in keys]
 
 
 @router.delete("/{key_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Revoke or delete an API key")
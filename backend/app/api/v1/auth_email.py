@@ -2,20 +2,28 @@ from __future__ import annotations
 
 from app.core.config import settings
 from app.core.dependencies import get_db
-from app.core.security import hash_password
+from app.core.instrumentation import InstrumentedRoute
+from app.core.ratelimit import email_rate_limits
+from app.core.security import password_hasher
+from app.crud.email_outbox import enqueue_email
 from app.crud.email_token import consume_email_token, issue_email_token
+from app.db.sqlite import single_writer
 from app.models.user import User
 from app.schemas.email_token import CompletePasswordReset, RequestPasswordReset, RequestVerifyEmail
-from app.services.mailer import send_email
+from app.services.outbox import email_outbox
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-router = APIRouter(prefix="/auth", tags=["Auth Email"])
+router = APIRouter(prefix="/auth", tags=["Auth Email"], route_class=InstrumentedRoute)
 
 
 # 1) Send verification email (after signup or on demand)
-@router.post("/verify-email/request", status_code=status.HTTP_202_ACCEPTED)
+@router.post(
+    "/verify-email/request",
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(limit) for limit in email_rate_limits],
+)
 async def request_verify_email(
     body: RequestVerifyEmail,
     db: AsyncSession = Depends(get_db),
@@ -28,7 +36,9 @@ async def request_verify_email(
         tok, raw = await issue_email_token(db, user_id=user.id, purpose="verify")
         link = f"{settings.FRONTEND_ORIGIN}/auth/verify-email?token={raw}"
         html = f"<p>Verify your Taskaza email by clicking <a href='{link}'>this link</a>. It expires in 24 hours.</p>"
-        await send_email(user.email, "Verify your Taskaza email", html)
+        # Delivered by the background outbox sender; repeated requests replace a still-pending message
+        await enqueue_email(db, user.email, "Verify your Taskaza email", html, dedupe_key=f"verify:{user.id}")
+        email_outbox.notify()
     return {"message": "If your email exists and is unverified, a link has been sent."}
 
 
@@ -44,13 +54,18 @@ async def complete_verify_email(
 
     user = tok.user
     if not user.email_verified:
-        user.email_verified = True
-        await db.commit()
+        async with single_writer.slot():
+            user.email_verified = True
+            await db.commit()
     return {"message": "Email verified successfully."}
 
 
 # 3) Request password reset
-@router.post("/password-reset/request", status_code=status.HTTP_202_ACCEPTED)
+@router.post(
+    "/password-reset/request",
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(limit) for limit in email_rate_limits],
+)
 async def request_password_reset(
     body: RequestPasswordReset,
     db: AsyncSession = Depends(get_db),
@@ -61,7 +76,8 @@ async def request_password_reset(
         tok, raw = await issue_email_token(db, user_id=user.id, purpose="reset")
         link = f"{settings.FRONTEND_ORIGIN}/auth/reset-password?token={raw}"
         html = f"<p>Reset your Taskaza password <a href='{link}'>here</a>. Link valid for 1 hour.</p>"
-        await send_email(user.email, "Reset your Taskaza password", html)
+        await enqueue_email(db, user.email, "Reset your Taskaza password", html, dedupe_key=f"reset:{user.id}")
+        email_outbox.notify()
     return {"message": "If the account exists, a reset link has been sent."}
 
 
@@ -77,6 +93,8 @@ async def complete_password_reset(
 
     user = tok.user
 
-    user.hashed_password = hash_password(body.new_password)
-    await db.commit()
+    hashed = await password_hasher.hash(body.new_password)
+    async with single_writer.slot():
+        user.hashed_password = hashed
+        await db.commit()
     return {"message": "Password reset successfully."}
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import os
+from typing import Literal, Optional
+
+from app.core.config import settings
+from app.core.instrumentation import InstrumentedRoute
+from app.core.metrics import registry
+from app.core.profiling import profile_paths
+from app.core.security import constant_time_equals
+from app.db.pool import pool_status
+from app.db.session import compiled_cache_stats, engine, pool_profile, pool_stats, replica_engine, replica_pool_stats
+from app.services import telemetry  # noqa: F401  (registers the scrape-time collectors)
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import FileResponse, PlainTextResponse
+
+
+async def require_internal_token(x_internal_token: Optional[str] = Header(default=None)) -> None:
+    # Pretend the routes don't exist unless internal access is configured and the token matches
+    expected = settings.INTERNAL_API_TOKEN
+    if not expected or not x_internal_token or not constant_time_equals(x_internal_token, expected):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["Internal"],
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)],
+    route_class=InstrumentedRoute,
+)
+
+
+@router.get("/db/pool", summary="Connection pool statistics")
+async def db_pool_stats():
+    """
+    Live pool usage (checked out, overflow) plus cumulative checkout wait-time histogram,
+    for sizing pools and worker counts from real traffic, and compiled statement cache hits/misses.
+    """
+    snapshot = pool_status(engine, pool_stats, pool_profile, compiled_cache_stats)
+    if replica_engine is not None:
+        snapshot["replica"] = pool_status(replica_engine, replica_pool_stats, pool_profile)
+    return snapshot
+
+
+@router.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus text format: per-route latency and query counts, in-flight requests, pool, cache,
+    writer queue, password hashing and maintenance stats. Merged across workers when
+    TSKZ_METRICS_MULTIPROC_DIR is set.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/profiles/{profile_id}", summary="Request profile", response_class=PlainTextResponse)
+async def request_profile(profile_id: str, format: Literal["text", "pstats"] = Query("text")):
+    """
+    A profile captured with `X-Profile: 1` (id from the `X-Profile-Id` response header): the text
+    summary with DB time split out, or the raw pstats dump.
+    """
+    try:
+        prof_path, text_path = profile_paths(profile_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    file_path = prof_path if format == "pstats" else text_path
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    if format == "pstats":
+        return FileResponse(file_path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    return FileResponse(file_path, media_type="text/plain; charset=utf-8")
@@ -4,15 +4,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.auth import authenticate_user, create_access_token
 from app.core.dependencies import get_db
+from app.core.instrumentation import InstrumentedRoute
+from app.core.ratelimit import login_rate_limits
 from app.schemas.token import Token
 from app.schemas.user import UserOut
 
-router = APIRouter(tags=["Login"])
+router = APIRouter(tags=["Login"], route_class=InstrumentedRoute)
 
 
 @router.post(
     "/token",
     response_model=Token,
+    dependencies=[Depends(limit) for limit in login_rate_limits],
     summary="Login with username and password",
     description="""
 Obtain a **JWT access token** using the OAuth2 password flow.
@@ -26,6 +29,7 @@ Obtain a **JWT access token** using the OAuth2 password flow.
 
 ### Notes
 - This endpoint does **not** require API Key.
+- Attempts are rate limited per client IP and per username (`429` with `Retry-After` when exceeded).
 - Token expiration and lifetime are configured in `create_access_token`.
   """,
 )
@@ -46,6 +50,7 @@ async def login_with_access_token(form_data: OAuth2PasswordRequestForm = Depends
       }
       ```
     - `401`: Incorrect username or password
+    - `429`: Too many login attempts
     """
     user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
@@ -1,9 +1,23 @@
 from __future__ import annotations
 
-from typing import Literal, Optional
+from typing import Awaitable, Callable, Hashable, Literal, Optional
 
-from app.core.dependencies import get_current_user, get_db, verify_api_key
+from app.core.cache import (
+    CachedBody,
+    task_list_cache,
+    task_list_key,
+    task_tree_cache,
+    task_tree_cache_enabled,
+    task_tree_generation,
+)
+from app.core.compression import reuse_encodings
+from app.core.config import settings
+from app.core.dependencies import get_current_user, get_current_user_read, get_db, get_read_db, verify_api_key
+from app.core.instrumentation import InstrumentedRoute
+from app.core.metrics import TASK_TREE_NODES
+from app.core.singleflight import task_reads
 from app.crud import task as crud
+from app.db.routing import from_replica
 from app.models.user import User
 from app.schemas.task import (
     TaskBulkRequest,
@@ -15,16 +29,51 @@ from app.schemas.task import (
     TaskStatusUpdate,
     TaskUpdate,
 )
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.services.idempotency import SaveResponse, run_idempotent
+from app.services.task_events import task_events
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(
     prefix="/tasks",
     tags=["Tasks"],
     dependencies=[Depends(verify_api_key)],
+    route_class=InstrumentedRoute,
+)
+
+
+_TREE_LIST = TypeAdapter(list[TaskOutTree])
+_SHALLOW_LIST = TypeAdapter(list[TaskOutShallow])
+
+_IDEMPOTENCY_KEY = Header(
+    None,
+    alias="Idempotency-Key",
+    max_length=255,
+    description="Retries with the same key get the first response back instead of creating tasks again",
 )
 
 
+async def _read_once(user_id: int, key: Hashable, render: Callable[[], Awaitable[CachedBody]]) -> Response:
+    """Render a JSON body, sharing it with identical reads in flight (app/core/singleflight.py)."""
+    if settings.SINGLE_FLIGHT_ENABLED:
+        entry = await task_reads.do(user_id, key, render)
+    else:
+        entry = await render()
+    reuse_encodings(entry.encodings)  # concurrent and later (cached) copies reuse the compressed body too
+    return Response(entry.body, media_type="application/json")
+
+
+def _tree_size(tree: TaskOutTree) -> int:
+    size, stack = 0, [tree]
+    while stack:
+        node = stack.pop()
+        size += 1
+        stack.extend(node.subtasks or ())
+    return size
+
+
 # -----------------------------
 # Create (supports nested subtasks via ?create_subtree)
 # -----------------------------
@@ -40,10 +89,12 @@ router = APIRouter(
 )
 async def create_task(
     task_in: TaskCreate,
+    request: Request,
     create_subtree: bool = Query(
         True,
         description="If true, create nested subtasks recursively when provided.",
     ),
+    idempotency_key: Optional[str] = _IDEMPOTENCY_KEY,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -51,11 +102,30 @@ async def create_task(
     Create Task
     """
     payload = task_in.model_dump(exclude_none=True)
-    if create_subtree and (payload.get("subtasks") or []):
-        # This returns an eager-loaded tree; but we still exclude subtasks via response_model_exclude.
-        # If you want to return the full tree on create-with-subtree, remove response_model_exclude above.
-        return await crud.create_task_with_subtree(db, user_id=user.id, task_data=payload)
-    return await crud.create_task(db, user_id=user.id, task_data=payload)
+    user_id = user.id  # `user` is expired if the idempotency claim rolls back
+
+    def shallow_json(task) -> bytes:
+        return TaskOutShallow.model_validate(task, from_attributes=True).model_dump_json().encode()
+
+    async def create(save: Optional[SaveResponse] = None):
+        # With an Idempotency-Key, the response is stored in the same transaction as the task
+        async def ready(task) -> None:
+            if save is not None:
+                await save(shallow_json(task))
+
+        if create_subtree and (payload.get("subtasks") or []):
+            # This returns an eager-loaded tree; but we still exclude subtasks via response_model_exclude.
+            # If you want to return the full tree on create-with-subtree, remove response_model_exclude above.
+            return await crud.create_task_with_subtree(db, user_id=user_id, task_data=payload, before_commit=ready)
+        return await crud.create_task(db, user_id=user_id, task_data=payload, before_commit=ready)
+
+    if idempotency_key:
+
+        async def render(save: SaveResponse) -> bytes:
+            return shallow_json(await create(save))
+
+        return await run_idempotent(db, request, user_id, idempotency_key, status.HTTP_201_CREATED, render)
+    return await create()
 
 
 # -----------------------------
@@ -79,27 +149,86 @@ async def list_tasks(
     sort: Literal["asc", "desc"] = Query("desc", description="Sort by created time"),
     include_tree: bool = Query(False, description="If true, eagerly load subtasks"),
     roots_only: bool = Query(False, description="If true, only return root tasks (parent_id is NULL)"),
-    user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     List Tasks
     """
-    items = await crud.get_tasks_for_user(
-        db,
-        user.id,
-        status=status_,
-        q=q,
-        page=page,
-        limit=limit,
-        sort=sort,
-        include_tree=include_tree,
-        roots_only=roots_only,
+    key = task_list_key(
+        status=status_, q=q, page=page, limit=limit, sort=sort, include_tree=include_tree, roots_only=roots_only
     )
+    # Repeated queries are served from the per-user response cache (see app/core/cache.py)
+    cached = settings.TASK_LIST_CACHE_ENABLED
+    if cached:
+        generation, entry = await task_list_cache.lookup(user.id, key)
+        if entry is not None:
+            reuse_encodings(entry.encodings)
+            return Response(entry.body, media_type="application/json")
 
-    if include_tree:
-        return [TaskOutTree.model_validate(t, from_attributes=True) for t in items]
-    return [TaskOutShallow.model_validate(t, from_attributes=True) for t in items]
+    async def render() -> CachedBody:
+        items = await crud.get_tasks_for_user(
+            db,
+            user.id,
+            status=status_,
+            q=q,
+            page=page,
+            limit=limit,
+            sort=sort,
+            include_tree=include_tree,
+            roots_only=roots_only,
+        )
+        if include_tree:
+            trees = [TaskOutTree.model_validate(t, from_attributes=True) for t in items]
+            for tree in trees:
+                TASK_TREE_NODES.labels("list").observe(_tree_size(tree))
+            entry = CachedBody(_TREE_LIST.dump_json(trees))
+        else:
+            entry = CachedBody(
+                _SHALLOW_LIST.dump_json([TaskOutShallow.model_validate(t, from_attributes=True) for t in items])
+            )
+        # Replica pages may predate writes made through other workers (stickiness is per process), and the
+        # store is shared by all of them, so only pages read from the primary are kept
+        if cached and not from_replica(db):
+            await task_list_cache.store(user.id, key, generation, entry)
+        return entry
+
+    return await _read_once(user.id, ("list", key), render)
+
+
+# -----------------------------
+# Change feed (Server-Sent Events); declared before /{task_id} so "stream" isn't read as an id
+# -----------------------------
+@router.get(
+    "/stream",
+    status_code=status.HTTP_200_OK,
+    summary="Stream task changes",
+    description=(
+        "Server-Sent Events feed of the authenticated user's task changes: `task.created`, `task.updated`, "
+        "`task.status` and `task.deleted`. Reconnect with `Last-Event-ID` to receive missed events; a `reset` "
+        "event means they are no longer available and the task list should be refetched."
+    ),
+    response_class=StreamingResponse,
+)
+async def stream_tasks(
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID", description="Resume after this event"),
+    user: User = Depends(get_current_user_read),
+):
+    """
+    Stream Tasks
+    """
+    if not settings.TASK_EVENTS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task events are disabled")
+    if task_events.streams(user.id) >= settings.TASK_EVENTS_MAX_STREAMS_PER_USER:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many open task streams")
+
+    # The DB session is released before the body streams, so open streams hold no connections
+    stream, backlog = task_events.subscribe(user.id, last_event_id)
+    return StreamingResponse(
+        task_events.frames(stream, backlog),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # -----------------------------
@@ -114,18 +243,35 @@ async def list_tasks(
 async def get_task(
     task_id: int,
     include_tree: bool = Query(True, description="If true, eagerly load subtasks"),
-    user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user_read),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Get Task
     """
-    task = await crud.get_task_by_id(db, task_id, user.id, include_tree=include_tree)
-    if not task:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    if include_tree:
-        return TaskOutTree.model_validate(task, from_attributes=True).model_dump()
-    return TaskOutShallow.model_validate(task, from_attributes=True).model_dump()
+    # Full trees are served from serialized snapshots while nothing in them changes
+    cached = include_tree and task_tree_cache_enabled()
+    if cached:
+        generation = await task_tree_generation(user.id)
+        token, snapshot = task_tree_cache.lookup(user.id, task_id, generation)
+        if snapshot is not None:
+            reuse_encodings(snapshot.encodings)
+            return Response(snapshot.body, media_type="application/json")
+
+    async def render() -> CachedBody:
+        task = await crud.get_task_by_id(db, task_id, user.id, include_tree=include_tree)
+        if not task:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+        if not include_tree:
+            return CachedBody(TaskOutShallow.model_validate(task, from_attributes=True).model_dump_json().encode())
+        tree = TaskOutTree.model_validate(task, from_attributes=True)
+        TASK_TREE_NODES.labels("get").observe(_tree_size(tree))
+        snapshot = CachedBody(tree.model_dump_json().encode())
+        if cached and not from_replica(db):
+            task_tree_cache.store(user.id, task_id, token, snapshot, generation)
+        return snapshot
+
+    return await _read_once(user.id, ("get", task_id, include_tree), render)
 
 
 # -----------------------------
@@ -220,19 +366,47 @@ async def delete_task(
 )
 async def bulk_tasks(
     payload: TaskBulkRequest,
+    request: Request,
+    idempotency_key: Optional[str] = _IDEMPOTENCY_KEY,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """
     Bulk Tasks
     """
-    created = []
-    if payload.create:
-        created = await crud.create_tasks_bulk(db, user.id, [t.model_dump(exclude_none=True) for t in payload.create])
+    user_id = user.id  # `user` is expired if the idempotency claim rolls back
 
-    updated = []
-    if payload.update_status:
+    async def apply(save: Optional[SaveResponse] = None) -> TaskBulkResponse:
+        rows = [t.model_dump(exclude_none=True) for t in payload.create]
         updates = [(u.id, u.status) for u in payload.update_status]
-        updated = await crud.update_tasks_status_bulk(db, user.id, updates)
+        created, updated = [], []
+
+        # The status updates run inside the creates' transaction, so both parts commit at once, along
+        # with the stored response when there is an Idempotency-Key
+        async def created_ready(tasks: list) -> None:
+            nonlocal created
+            created = tasks
+            if updates:
+                await crud.update_tasks_status_bulk(db, user_id, updates, before_commit=updated_ready)
+            elif save is not None:
+                await save(TaskBulkResponse(created=created).model_dump_json().encode())
+
+        async def updated_ready(tasks: list) -> None:
+            nonlocal updated
+            updated = tasks
+            if save is not None:
+                await save(TaskBulkResponse(created=created, updated=updated).model_dump_json().encode())
+
+        if rows:
+            await crud.create_tasks_bulk(db, user_id, rows, before_commit=created_ready)
+        elif updates:
+            await crud.update_tasks_status_bulk(db, user_id, updates, before_commit=updated_ready)
+        return TaskBulkResponse(created=created, updated=updated)
+
+    if idempotency_key:
+
+        async def render(save: SaveResponse) -> bytes:
+            return (await apply(save)).model_dump_json().encode()
 
-    return TaskBulkResponse(created=created, updated=updated)
+        return await run_idempotent(db, request, user_id, idempotency_key, status.HTTP_200_OK, render)
+    return await apply()
@@ -1,18 +1,22 @@
-from app.core.dependencies import get_current_user, get_db, verify_api_key
+from app.core.dependencies import get_current_user, get_current_user_read, get_db, verify_api_key
+from app.core.instrumentation import InstrumentedRoute
+from app.core.ratelimit import signup_rate_limits
 from app.crud import user as crud_user
+from app.db.routing import read_router
 from app.schemas.user import UserCreate, UserOut, UserUpdate
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import User
 
-router = APIRouter(tags=["Users"])
+router = APIRouter(tags=["Users"], route_class=InstrumentedRoute)
 
 
 @router.post(
     "/signup",
     response_model=UserOut,
     status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit) for limit in signup_rate_limits],
     response_description="Successfully registered a new user",
     summary="Register a new user",
     description=(
@@ -35,6 +39,7 @@ async def signup(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     - `201`: Returns the created `UserOut` (without password)
     - `400`: Username or email already taken
     - `422`: Validation error
+    - `429`: Too many sign-ups from this client
     """
     existing = await crud_user.get_user_by_username(db, user_in.username)
     if existing:
@@ -50,6 +55,7 @@ async def signup(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
         email=user_in.email,
         display_name=user_in.display_name,
     )
+    read_router.mark_write(user.id)  # the new account isn't on the replica yet
     return user
 
 
@@ -61,7 +67,7 @@ async def signup(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     summary="Get current user profile",
     description="Retrieve details of the authenticated user (requires JWT + API key).",
 )
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: User = Depends(get_current_user_read)):
     """
     **Get Current User**
 
@@ -0,0 +1,187 @@
+"""
+Admission control: bounded concurrency per route class, a bounded wait queue, and fast shedding.
+
+When the database slows down, requests otherwise pile up in the event loop until every one of
+them times out. Instead, each request is put in a class by cost:
+
+    auth    /token, /signup, /auth/*      (bcrypt)
+    bulk    POST /tasks/bulk
+    tree    GET /tasks?include_tree=true, GET /tasks/{id} (full tree unless include_tree=false)
+    write   any other POST / PUT / PATCH / DELETE
+    read    any other GET
+
+Up to ADMISSION_LIMITS[class] requests of a class run at once. Further requests wait in arrival
+order, up to ADMISSION_QUEUE_SIZE[class] of them and for at most ADMISSION_QUEUE_TIMEOUT_SECONDS.
+Requests beyond that get `503` with `Retry-After` straight away. Requests in ADMISSION_SHED_FIRST
+classes (the expensive ones) are refused outright while any other class has requests waiting, so
+under overload they are turned away before cheap reads and writes.
+
+/internal/* (metrics, pool stats), the docs, / and the long-lived GET /tasks/stream are never
+limited. Limits are per process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.core.config import settings
+from starlette.datastructures import QueryParams
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+_EXEMPT_PREFIXES = ("/internal", "/docs", "/redoc", "/openapi.json")
+_FALSE = ("0", "false", "no", "off")
+
+
+def route_class(scope: Scope) -> Optional[str]:
+    """The admission class of a request, or None if it is never limited."""
+    path, method = scope["path"], scope["method"]
+    if path == "/" or path.startswith(_EXEMPT_PREFIXES) or method == "OPTIONS":
+        return None
+    if path.rstrip("/") == "/tasks/stream":
+        return None  # open for as long as the client listens; limited per user instead
+    if path in ("/token", "/signup") or path.startswith("/auth/"):
+        return "auth"
+    if path.rstrip("/") == "/tasks/bulk":
+        return "bulk"
+    if method not in ("GET", "HEAD"):
+        return "write"
+    if path.startswith("/tasks"):
+        include_tree = QueryParams(scope.get("query_string", b"")).get("include_tree")
+        if path.rstrip("/") == "/tasks":
+            tree = include_tree is not None and include_tree.lower() not in _FALSE
+        else:
+            tree = include_tree is None or include_tree.lower() not in _FALSE
+        if tree:
+            return "tree"
+    return "read"
+
+
+@dataclass
+class AdmissionStats:
+    admitted: Counter[str] = field(default_factory=Counter)  # class -> requests let through
+    shed: Counter[tuple[str, str]] = field(default_factory=Counter)  # (class, reason) -> 503s
+
+
+class _Budget:
+    __slots__ = ("limit", "queue_size", "in_flight", "waiters")
+
+    def __init__(self, limit: int, queue_size: int):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self.waiters: deque[asyncio.Future] = deque()
+
+
+def _granted(slot: asyncio.Future) -> bool:
+    return slot.done() and not slot.cancelled()
+
+
+def _leave(budget: _Budget, slot: asyncio.Future) -> None:
+    if slot in budget.waiters:  # `release` may already have skipped past it
+        budget.waiters.remove(slot)
+
+
+class AdmissionController:
+    """Per-class slots and wait queues; budgets are read from settings on first use (or after reset)."""
+
+    def __init__(self):
+        self._budgets: dict[str, _Budget] = {}
+        self.stats = AdmissionStats()
+
+    def budget(self, route_class: str) -> _Budget:
+        budget = self._budgets.get(route_class)
+        if budget is None:
+            budget = self._budgets[route_class] = _Budget(
+                settings.ADMISSION_LIMITS.get(route_class, 64), settings.ADMISSION_QUEUE_SIZE.get(route_class, 0)
+            )
+        return budget
+
+    def depths(self) -> dict[str, tuple[int, int]]:
+        """class -> (running, waiting)"""
+        return {name: (b.in_flight, len(b.waiters)) for name, b in self._budgets.items()}
+
+    async def admit(self, route_class: str) -> Optional[str]:
+        """Take a slot, waiting for one if need be. Returns None once admitted, else why the request is shed."""
+        budget = self.budget(route_class)
+        if route_class in settings.ADMISSION_SHED_FIRST and any(
+            b.waiters for name, b in self._budgets.items() if name != route_class
+        ):
+            return self._shed(route_class, "shed_first")
+        if budget.in_flight < budget.limit and not budget.waiters:
+            budget.in_flight += 1
+            self.stats.admitted[route_class] += 1
+            return None
+
+        if len(budget.waiters) >= budget.queue_size:
+            return self._shed(route_class, "queue_full")
+
+        slot = asyncio.get_running_loop().create_future()
+        budget.waiters.append(slot)
+        try:
+            async with asyncio.timeout(settings.ADMISSION_QUEUE_TIMEOUT_SECONDS):
+                await slot
+        except TimeoutError:
+            if not _granted(slot):  # handed over just as the deadline hit: keep it
+                _leave(budget, slot)
+                return self._shed(route_class, "timeout")
+        except asyncio.CancelledError:  # client went away while queued
+            if _granted(slot):
+                self.release(route_class)
+            else:
+                _leave(budget, slot)
+            raise
+        self.stats.admitted[route_class] += 1
+        return None
+
+    def release(self, route_class: str) -> None:
+        """Give the slot to the next waiter, if any, else free it."""
+        budget = self._budgets.get(route_class)
+        if budget is None:  # reset while the request ran
+            return
+        while budget.waiters:
+            slot = budget.waiters.popleft()
+            if not slot.done():
+                slot.set_result(None)
+                return
+        budget.in_flight -= 1
+
+    def _shed(self, route_class: str, reason: str) -> str:
+        self.stats.shed[(route_class, reason)] += 1
+        return reason
+
+    def reset(self) -> None:
+        self._budgets.clear()
+        self.stats = AdmissionStats()
+
+
+admission = AdmissionController()
+
+
+class AdmissionMiddleware:
+    """Limits concurrent requests per route class, queueing or shedding the rest; see module docstring."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        cls = route_class(scope) if scope["type"] == "http" and settings.ADMISSION_ENABLED else None
+        if cls is None:
+            await self.app(scope, receive, send)
+            return
+
+        if await admission.admit(cls) is not None:
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry shortly"},
+                status_code=503,
+                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(cls)
@@ -6,7 +6,7 @@ from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.security import verify_password
+from app.core.security import password_hasher
 from app.crud.user import get_user_by_username
 from app.models.user import User
 from app.schemas.token import TokenData
@@ -48,6 +48,6 @@ def verify_access_token(token: str):
 # ---------------------------- #
 async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
     user = await get_user_by_username(db, username)
-    if user and verify_password(password, user.hashed_password):
+    if user and await password_hasher.verify(password, user.hashed_password):
         return user
     return None
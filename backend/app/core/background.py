@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[object]]
+
+
+class BackgroundJobs:
+    """
+    Periodic in-process jobs tied to the app lifespan.
+
+        async with BackgroundJobs() as jobs:
+            jobs.every(5, api_key_throttle.flush)
+            yield
+
+    On exit every loop is cancelled and jobs registered with `run_on_shutdown=True` run one last time,
+    so buffered state (usage counters, queues) is not lost on a clean shutdown.
+    """
+
+    def __init__(self):
+        self._tasks: list[asyncio.Task] = []
+        self._shutdown: list[tuple[str, Job]] = []
+
+    def every(self, seconds: float, job: Job, *, name: str | None = None, run_on_shutdown: bool = True) -> None:
+        name = name or getattr(job, "__qualname__", repr(job))
+        self._tasks.append(asyncio.create_task(self._loop(seconds, job, name), name=f"bg:{name}"))
+        if run_on_shutdown:
+            self._shutdown.append((name, job))
+
+    def start(self, coro: Awaitable[object], *, name: str) -> None:
+        """Run a long-lived coroutine (e.g. a worker loop) until shutdown."""
+        self._tasks.append(asyncio.create_task(coro, name=f"bg:{name}"))
+
+    def on_shutdown(self, job: Job, *, name: str | None = None) -> None:
+        self._shutdown.append((name or getattr(job, "__qualname__", repr(job)), job))
+
+    @staticmethod
+    async def _loop(seconds: float, job: Job, name: str) -> None:
+        while True:
+            await asyncio.sleep(seconds)
+            try:
+                await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Background job %s failed", name)
+
+    async def __aenter__(self) -> "BackgroundJobs":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for name, job in self._shutdown:
+            try:
+                await job()
+            except Exception:
+                logger.exception("Final run of background job %s failed", name)
@@ -0,0 +1,434 @@
+"""
+Response caches for the task read endpoints.
+
+GET /tasks: serialized pages per user, keyed by the normalized query params.
+
+Every user has a generation. Task writes (app/crud/task.py) and user deletion invalidate the
+user's generation after committing, which orphans all of their cached pages at once. A response
+is only stored if the generation it was read under is still current, so a read that raced a
+write never caches the pre-write page.
+
+    memory  per-process LRU; with several workers a write only invalidates its own worker
+    sqlite  a SQLite file shared by every worker on the host (TASK_LIST_CACHE_SQLITE_PATH)
+    auto    (default) sqlite when WEB_CONCURRENCY > 1, the worker count uvicorn, `fastapi run` and
+            gunicorn read, else memory
+
+Entries also expire after TASK_LIST_CACHE_TTL_SECONDS, as a backstop for writes that bypass the
+CRUD layer (e.g. app.db.seed).
+
+GET /tasks/{id} (include_tree): serialized trees per (user, task), in process memory, bounded by
+total bytes. A write to any task drops the snapshots of that task and all of its ancestors (plus
+the whole subtree when it is deleted); see _invalidate_trees in app/crud/task.py. That only
+reaches the worker that handled the write, so when the list cache store is shared, snapshots are
+also tied to the user's generation there and any worker's write retires them all. With several
+workers (WEB_CONCURRENCY > 1) and a per-process list store there is nothing to check them
+against, and the tree cache is not used.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Protocol
+
+from app.core.config import settings, web_concurrency
+
+
+@dataclass
+class CachedBody:
+    """A serialized response, plus the compressed copies the compression middleware adds to it."""
+
+    body: bytes
+    encodings: dict[str, bytes] = field(default_factory=dict)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+def task_list_key(**params) -> str:
+    """Cache key for one combination of list params (values already parsed and defaulted by FastAPI)."""
+    return json.dumps({k: getattr(v, "value", v) for k, v in params.items()}, sort_keys=True, separators=(",", ":"))
+
+
+# ---------------------------- #
+# Stores
+# ---------------------------- #
+class TaskListCache(Protocol):
+    stats: CacheStats
+
+    async def lookup(self, user_id: int, key: str) -> tuple[int, Optional[CachedBody]]:
+        """The user's current generation, and the page cached for `key` in that generation (if any)."""
+
+    async def store(self, user_id: int, key: str, generation: int, page: CachedBody) -> None:
+        """Cache `page`, unless the user's generation has moved on since `lookup` returned `generation`."""
+
+    async def invalidate(self, user_id: int) -> None: ...
+
+    async def reset(self) -> None: ...
+
+
+@dataclass
+class _UserEntries:
+    generation: int
+    entries: OrderedDict[str, tuple[float, CachedBody]] = field(default_factory=OrderedDict)  # key -> (expires, page)
+
+
+class MemoryTaskListCache:
+    """
+    Per-process LRU over users, and over pages within a user. No awaits, so every operation is atomic
+    on the event loop. Invalidation drops the user's record; records are (re)created with a fresh
+    value from a process-wide counter, so a generation is never reused.
+    """
+
+    def __init__(self, max_entries: int, max_per_user: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_per_user = max_per_user
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._users: OrderedDict[int, _UserEntries] = OrderedDict()
+        self._generations = itertools.count(1)
+        self._size = 0
+
+    async def lookup(self, user_id: int, key: str) -> tuple[int, Optional[CachedBody]]:
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserEntries(next(self._generations))
+            self._evict()
+        else:
+            self._users.move_to_end(user_id)
+
+        entry = user.entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                user.entries.move_to_end(key)
+                self.stats.hits += 1
+                return user.generation, entry[1]
+            del user.entries[key]
+            self._size -= 1
+        self.stats.misses += 1
+        return user.generation, None
+
+    async def store(self, user_id: int, key: str, generation: int, page: CachedBody) -> None:
+        user = self._users.get(user_id)
+        if user is None or user.generation != generation:
+            return
+        if key not in user.entries:
+            self._size += 1
+        user.entries[key] = (time.monotonic() + self.ttl, page)
+        user.entries.move_to_end(key)
+        while len(user.entries) > self.max_per_user:
+            user.entries.popitem(last=False)
+            self._size -= 1
+            self.stats.evictions += 1
+        self._evict()
+
+    def _evict(self) -> None:
+        # Least recently used user first: its oldest pages, or the whole record if there are too many users
+        while self._size > self.max_entries or len(self._users) > self.max_entries:
+            user_id, user = next(iter(self._users.items()))
+            if user.entries and len(self._users) <= self.max_entries:
+                user.entries.popitem(last=False)
+                self._size -= 1
+                self.stats.evictions += 1
+            else:
+                del self._users[user_id]
+                self._size -= len(user.entries)
+                self.stats.evictions += len(user.entries)
+
+    async def invalidate(self, user_id: int) -> None:
+        user = self._users.pop(user_id, None)
+        if user is not None:
+            self._size -= len(user.entries)
+
+    async def reset(self) -> None:
+        self._users.clear()
+        self._size = 0
+        self.stats = CacheStats()
+
+
+class SQLiteTaskListCache:
+    """
+    Pages and generations in a SQLite file, so every worker on the host shares them. Only the raw
+    body is shared; compressed copies are redone per lookup.
+    """
+
+    _PRUNE_EVERY = 500
+
+    def __init__(self, db_path: str, max_entries: int, max_per_user: int, ttl: float):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_per_user = max_per_user
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stores = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS task_list_generations ("
+                " user_id INTEGER PRIMARY KEY, generation INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS task_list_entries ("
+                " user_id INTEGER NOT NULL, key TEXT NOT NULL, generation INTEGER NOT NULL, body BLOB NOT NULL,"
+                " expires_at REAL NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (user_id, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_task_list_entries_last_used ON task_list_entries (last_used)")
+            self._conn = conn
+        return self._conn
+
+    def _lookup_sync(self, user_id: int, key: str) -> tuple[int, Optional[bytes]]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            generation, body = conn.execute(
+                "SELECT g.generation, e.body"
+                " FROM (SELECT COALESCE((SELECT generation FROM task_list_generations WHERE user_id = ?), 0)"
+                " AS generation) AS g"
+                " LEFT JOIN task_list_entries AS e"
+                " ON e.user_id = ? AND e.key = ? AND e.generation = g.generation AND e.expires_at > ?",
+                (user_id, user_id, key, now),
+            ).fetchone()
+            if body is not None:
+                conn.execute(
+                    "UPDATE task_list_entries SET last_used = ? WHERE user_id = ? AND key = ?", (now, user_id, key)
+                )
+        return generation, body
+
+    def _generation_sync(self, user_id: int) -> int:
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT generation FROM task_list_generations WHERE user_id = ?", (user_id,))
+                .fetchone()
+            )
+        return row[0] if row else 0
+
+    async def generation(self, user_id: int) -> int:
+        """The user's current generation, as every worker sees it."""
+        return await asyncio.to_thread(self._generation_sync, user_id)
+
+    async def lookup(self, user_id: int, key: str) -> tuple[int, Optional[CachedBody]]:
+        generation, body = await asyncio.to_thread(self._lookup_sync, user_id, key)
+        if body is None:
+            self.stats.misses += 1
+            return generation, None
+        self.stats.hits += 1
+        return generation, CachedBody(body)
+
+    def _store_sync(self, user_id: int, key: str, generation: int, body: bytes) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                stored = conn.execute(
+                    "INSERT INTO task_list_entries (user_id, key, generation, body, expires_at, last_used)"
+                    " SELECT ?, ?, ?, ?, ?, ?"
+                    " WHERE COALESCE((SELECT generation FROM task_list_generations WHERE user_id = ?), 0) = ?"
+                    " ON CONFLICT (user_id, key) DO UPDATE SET generation = excluded.generation,"
+                    " body = excluded.body, expires_at = excluded.expires_at, last_used = excluded.last_used",
+                    (user_id, key, generation, body, now + self.ttl, now, user_id, generation),
+                ).rowcount
+                evicted = 0
+                if stored:
+                    evicted += conn.execute(
+                        "DELETE FROM task_list_entries WHERE user_id = ? AND key NOT IN"
+                        " (SELECT key FROM task_list_entries WHERE user_id = ? ORDER BY last_used DESC LIMIT ?)",
+                        (user_id, user_id, self.max_per_user),
+                    ).rowcount
+                self._stores += 1
+                if self._stores % self._PRUNE_EVERY == 0:
+                    evicted += self._prune(conn, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self.stats.evictions += evicted
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> int:
+        # Expired pages and pages of old generations are dead weight; then trim to size, LRU first
+        conn.execute(
+            "DELETE FROM task_list_entries WHERE expires_at <= ? OR generation <"
+            " COALESCE((SELECT generation FROM task_list_generations AS g"
+            " WHERE g.user_id = task_list_entries.user_id), 0)",
+            (now,),
+        )
+        return conn.execute(
+            "DELETE FROM task_list_entries WHERE rowid NOT IN"
+            " (SELECT rowid FROM task_list_entries ORDER BY last_used DESC LIMIT ?)",
+            (self.max_entries,),
+        ).rowcount
+
+    async def store(self, user_id: int, key: str, generation: int, page: CachedBody) -> None:
+        await asyncio.to_thread(self._store_sync, user_id, key, generation, page.body)
+
+    def _invalidate_sync(self, user_id: int) -> None:
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO task_list_generations (user_id, generation) VALUES (?, 1)"
+                " ON CONFLICT (user_id) DO UPDATE SET generation = generation + 1",
+                (user_id,),
+            )
+
+    async def invalidate(self, user_id: int) -> None:
+        await asyncio.to_thread(self._invalidate_sync, user_id)
+
+    def _reset_sync(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM task_list_entries")
+            conn.execute("DELETE FROM task_list_generations")
+
+    async def reset(self) -> None:
+        await asyncio.to_thread(self._reset_sync)
+        self.stats = CacheStats()
+
+
+def resolve_task_list_store() -> str:
+    if settings.TASK_LIST_CACHE_STORE != "auto":
+        return settings.TASK_LIST_CACHE_STORE
+    return "sqlite" if web_concurrency() > 1 else "memory"
+
+
+def _build_task_list_cache() -> TaskListCache:
+    limits = dict(
+        max_entries=settings.TASK_LIST_CACHE_MAX_ENTRIES,
+        max_per_user=settings.TASK_LIST_CACHE_MAX_PER_USER,
+        ttl=settings.TASK_LIST_CACHE_TTL_SECONDS,
+    )
+    if resolve_task_list_store() == "sqlite":
+        return SQLiteTaskListCache(settings.TASK_LIST_CACHE_SQLITE_PATH, **limits)
+    return MemoryTaskListCache(**limits)
+
+
+task_list_cache = _build_task_list_cache()
+
+
+# ---------------------------- #
+# Tree snapshots
+# ---------------------------- #
+class TaskTreeCache:
+    """
+    Per-process LRU of serialized trees, evicted by total bytes of the raw bodies (compressed copies
+    add a fraction on top). A miss hands out a token; `store` only keeps the tree if nothing
+    invalidated that key in between. No awaits, so every operation is atomic on the event loop.
+    A snapshot stored with a `generation` is only served to lookups passing the same one.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, max_pending: int = 10_000):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_bytes // 4  # one huge tree shouldn't flush everything else
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self.stats = CacheStats()
+        self.bytes = 0
+        # (user, task) -> (expires, generation, tree)
+        self._entries: OrderedDict[tuple[int, int], tuple[float, Optional[int], CachedBody]] = OrderedDict()
+        self._pending: OrderedDict[tuple[int, int], object] = OrderedDict()
+        self._users: Counter[int] = Counter()  # entries + pending reads per user
+
+    def lookup(
+        self, user_id: int, task_id: int, generation: Optional[int] = None
+    ) -> tuple[Optional[object], Optional[CachedBody]]:
+        key = (user_id, task_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic() and entry[1] == generation:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return None, entry[2]
+            self._drop(key)
+
+        self.stats.misses += 1
+        token = self._pending.get(key)  # concurrent misses share one: whichever stores first wins
+        if token is None:
+            token = self._pending[key] = object()
+            self._users[user_id] += 1
+        self._pending.move_to_end(key)
+        while len(self._pending) > self.max_pending:  # reads that never came back to store
+            self._release(self._pending.popitem(last=False)[0][0])
+        return token, None
+
+    def store(
+        self, user_id: int, task_id: int, token: object, tree: CachedBody, generation: Optional[int] = None
+    ) -> None:
+        key = (user_id, task_id)
+        if token is None or self._pending.get(key) is not token:
+            return
+        del self._pending[key]
+        if len(tree.body) > self.max_entry_bytes:
+            self._release(user_id)
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, generation, tree)
+        self.bytes += len(tree.body)
+        while self.bytes > self.max_bytes:
+            (evicted_user, _), (_, _, evicted) = self._entries.popitem(last=False)
+            self.bytes -= len(evicted.body)
+            self._release(evicted_user)
+            self.stats.evictions += 1
+
+    def tracks(self, user_id: int) -> bool:
+        """Whether any snapshot (or read about to store one) exists for the user."""
+        return self._users.get(user_id, 0) > 0
+
+    def invalidate(self, user_id: int, task_ids: Iterable[int]) -> None:
+        for task_id in task_ids:
+            self._drop((user_id, task_id))
+
+    def invalidate_user(self, user_id: int) -> None:
+        if self.tracks(user_id):
+            for key in [k for k in (*self._entries, *self._pending) if k[0] == user_id]:
+                self._drop(key)
+
+    def _drop(self, key: tuple[int, int]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry[2].body)
+            self._release(key[0])
+        if self._pending.pop(key, None) is not None:
+            self._release(key[0])
+
+    def _release(self, user_id: int) -> None:
+        self._users[user_id] -= 1
+        if self._users[user_id] <= 0:
+            del self._users[user_id]
+
+    def reset(self) -> None:
+        self._entries.clear()
+        self._pending.clear()
+        self._users.clear()
+        self.bytes = 0
+        self.stats = CacheStats()
+
+
+task_tree_cache = TaskTreeCache(settings.TASK_TREE_CACHE_MAX_BYTES, settings.TASK_TREE_CACHE_TTL_SECONDS)
+
+
+def task_tree_cache_enabled() -> bool:
+    """Snapshots from one worker can't see another's writes without the shared generations."""
+    if not settings.TASK_TREE_CACHE_ENABLED:
+        return False
+    return web_concurrency() <= 1 or isinstance(task_list_cache, SQLiteTaskListCache)
+
+
+async def task_tree_generation(user_id: int) -> Optional[int]:
+    """The generation to validate the user's tree snapshots against; None without a shared store."""
+    if isinstance(task_list_cache, SQLiteTaskListCache):
+        return await task_list_cache.generation(user_id)
+    return None
@@ -0,0 +1,233 @@
+"""
+Response compression (pure ASGI).
+
+Picks the best encoding the client accepts: zstd and br when the optional `zstandard` / `brotli`
+packages are installed, gzip always. Only allowlisted media types are compressed
+(COMPRESSION_MEDIA_TYPES; never text/event-stream). A body sent in one piece is compressed only
+from COMPRESSION_MIN_SIZE bytes, and only if that actually makes it smaller.
+Streamed bodies (StreamingResponse) are compressed chunk by chunk, each chunk flushed so the
+client receives it right away.
+
+Cached responses: an endpoint serving a cached body calls `reuse_encodings(entry.encodings)`, and
+the middleware takes the encoded copy from that dict, or compresses once and stores the result
+there. Hot payloads are then not recompressed on every hit.
+"""
+
+from __future__ import annotations
+
+import gzip
+import zlib
+from contextvars import ContextVar
+from typing import Optional
+
+from app.core.config import settings
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+
+# ---------------------------- #
+# Encoders
+# ---------------------------- #
+class _Gzip:
+    def __init__(self):
+        self._z = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    @staticmethod
+    def compress(body: bytes) -> bytes:
+        return gzip.compress(body, settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    @staticmethod
+    def compress(body: bytes) -> bytes:
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class _Zstd:
+    def __init__(self):
+        self._c = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    @staticmethod
+    def compress(body: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compress(body)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+# In order of preference when the client accepts several equally
+ENCODERS: dict[str, type] = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = _Zstd
+if brotli is not None:
+    ENCODERS["br"] = _Brotli
+ENCODERS["gzip"] = _Gzip
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The available encoding with the highest q-value in an Accept-Encoding header, if any."""
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        accepted[name.strip().lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in ENCODERS:
+        q = accepted.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+# ---------------------------- #
+# Cached variants
+# ---------------------------- #
+class _Variants:
+    __slots__ = ("encodings",)
+
+    def __init__(self):
+        self.encodings: Optional[dict[str, bytes]] = None
+
+
+_variants: ContextVar[Optional[_Variants]] = ContextVar("compression_variants", default=None)
+
+
+def reuse_encodings(encodings: dict[str, bytes]) -> None:
+    """Read and store encoded copies of the current response body in `encodings` (a cache entry's dict)."""
+    holder = _variants.get()
+    if holder is not None:
+        holder.encodings = encodings
+
+
+# ---------------------------- #
+# Middleware
+# ---------------------------- #
+class CompressionMiddleware:
+    """Compresses allowlisted responses for clients that accept it; see module docstring."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        holder = _Variants()
+        token = _variants.set(holder)
+        try:
+            await self.app(scope, receive, _Responder(send, encoding, holder).send)
+        finally:
+            _variants.reset(token)
+
+
+class _Responder:
+    def __init__(self, send: Send, encoding: str, holder: _Variants):
+        self._send = send
+        self.encoding = encoding
+        self.holder = holder
+        self.start: Optional[Message] = None
+        self.mode: Optional[str] = None  # "identity" or "stream", once decided
+        self.encoder = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message  # held until the first body chunk shows whether and how to compress
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.mode == "identity":
+            await self._send(message)
+        elif self.mode == "stream":
+            await self._send_chunk(message)
+        else:
+            await self._first_body(message)
+
+    async def _first_body(self, message: Message) -> None:
+        headers = MutableHeaders(scope=self.start)
+        if not self._compressible(headers):
+            self.mode = "identity"
+            await self._send(self.start)
+            await self._send(message)
+            return
+        headers.add_vary_header("Accept-Encoding")
+
+        body = message.get("body", b"")
+        if message.get("more_body", False):
+            # Streaming: length unknown up front, so compress as it goes
+            self.mode = "stream"
+            self.encoder = ENCODERS[self.encoding]()
+            del headers["content-length"]
+            headers["Content-Encoding"] = self.encoding
+            await self._send(self.start)
+            await self._send_chunk(message)
+            return
+
+        self.mode = "identity"
+        if len(body) >= settings.COMPRESSION_MIN_SIZE:
+            encodings = self.holder.encodings
+            encoded = encodings.get(self.encoding) if encodings is not None else None
+            if encoded is None:
+                encoded = ENCODERS[self.encoding].compress(body)
+                if encodings is not None:
+                    encodings[self.encoding] = encoded
+            if len(encoded) < len(body):
+                headers["Content-Encoding"] = self.encoding
+                headers["Content-Length"] = str(len(encoded))
+                message = {**message, "body": encoded}
+        await self._send(self.start)
+        await self._send(message)
+
+    async def _send_chunk(self, message: Message) -> None:
+        more_body = message.get("more_body", False)
+        data = self.encoder.chunk(message.get("body", b""))
+        if not more_body:
+            data += self.encoder.finish()
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        if self.start["status"] < 200 or self.start["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+        return media_type in settings.COMPRESSION_MEDIA_TYPES and media_type != "text/event-stream"
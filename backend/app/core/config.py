@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import Dict, List, Literal, Optional
 
 from pydantic import AnyHttpUrl, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -32,8 +32,143 @@ class Settings(BaseSettings):
         ["*"], description="List of allowed CORS origins for the backend"
     )
 
+    # Response compression (see app/core/compression.py; br/zstd need the brotli/zstandard packages)
+    COMPRESSION_ENABLED: bool = Field(True, description="Compress responses for clients that accept it")
+    COMPRESSION_MIN_SIZE: int = Field(1024, ge=0, description="Smallest body (bytes) worth compressing")
+    COMPRESSION_MEDIA_TYPES: List[str] = Field(
+        ["application/json", "text/plain", "text/html", "text/css", "text/csv", "application/javascript"],
+        description="Content types that are compressed",
+    )
+    COMPRESSION_GZIP_LEVEL: int = Field(6, ge=1, le=9, description="gzip level")
+    COMPRESSION_BROTLI_QUALITY: int = Field(4, ge=0, le=11, description="Brotli quality (dynamic content: 4-5)")
+    COMPRESSION_ZSTD_LEVEL: int = Field(3, ge=1, le=22, description="zstd level")
+
     # Database settings
     DATABASE_URL: str = Field("sqlite+aiosqlite:///./data/taskaza.db", description="Database connection URL")
+    DB_POOL_PROFILE: Literal["auto", "sqlite-dev", "postgres-single", "postgres-high"] = Field(
+        "auto", description="Connection pool preset; 'auto' picks sqlite-dev or postgres-single from the URL"
+    )
+    DB_POOL_SIZE: Optional[int] = Field(None, ge=1, description="Persistent connections (overrides the profile)")
+    DB_MAX_OVERFLOW: Optional[int] = Field(None, ge=0, description="Extra connections allowed under load")
+    DB_POOL_TIMEOUT: Optional[float] = Field(None, gt=0, description="Seconds to wait for a free connection")
+    DB_POOL_RECYCLE: Optional[int] = Field(None, description="Recycle connections older than this (-1 = never)")
+    DB_POOL_PRE_PING: Optional[bool] = Field(None, description="Ping connections on checkout (one extra round trip)")
+    DB_STATEMENT_CACHE_SIZE: Optional[int] = Field(None, ge=0, description="asyncpg prepared statement cache size")
+    DB_MIGRATE_ON_STARTUP: bool = Field(
+        False, description="Apply pending migrations at startup (single-process dev only; use app.db.migrate)"
+    )
+    DATABASE_REPLICA_URL: Optional[str] = Field(None, description="Read replica used by read-only routes")
+    DB_REPLICA_STICKY_SECONDS: float = Field(
+        5.0, ge=0, description="After a user writes, serve their reads from the primary for this long"
+    )
+
+    # SQLite production profile (ignored for other databases)
+    SQLITE_TUNED: bool = Field(True, description="Apply busy_timeout/cache/mmap/synchronous=NORMAL pragmas")
+    SQLITE_BUSY_TIMEOUT_MS: int = Field(5000, ge=0, description="How long a connection waits for a lock")
+    SQLITE_CACHE_SIZE_KB: int = Field(65536, ge=0, description="Page cache per connection, in KiB")
+    SQLITE_MMAP_SIZE: int = Field(268435456, ge=0, description="Bytes of the database file to memory-map")
+    SQLITE_SINGLE_WRITER: bool = Field(True, description="Queue write transactions in-process, one at a time")
+
+    # Serve /openapi.json from a file generated at build time (python -m app.core.openapi)
+    OPENAPI_SCHEMA_PATH: Optional[str] = Field(None, description="Prebuilt OpenAPI JSON; generated on demand if unset")
+
+    # Request instrumentation (Server-Timing header, slow request log, sampled query plans)
+    SQL_INSTRUMENTATION_ENABLED: bool = Field(True, description="Count/time SQL per request and add Server-Timing")
+    SLOW_REQUEST_MS: float = Field(500.0, ge=0, description="Log requests that take at least this long")
+    SLOW_REQUEST_QUERIES: int = Field(25, ge=1, description="Log requests that run at least this many statements")
+    SQL_EXPLAIN_SAMPLE_RATE: float = Field(
+        0.0, ge=0, le=1, description="Fraction of requests whose SELECT plans are logged (runs EXPLAIN inline)"
+    )
+    SQL_EXPLAIN_MAX_STATEMENTS: int = Field(5, ge=1, description="Statements explained per sampled request")
+    N_PLUS_ONE_DETECTION: Literal["off", "log", "raise"] = Field(
+        "off", description="Flag requests repeating one statement shape; 'raise' fails the request (tests/dev)"
+    )
+    N_PLUS_ONE_THRESHOLD: int = Field(5, ge=2, description="Executions of the same statement shape per request")
+
+    # Prometheus metrics at /internal/metrics
+    METRICS_ENABLED: bool = Field(True, description="Record per-route latency and query count metrics")
+    METRICS_MULTIPROC_DIR: Optional[str] = Field(
+        None, description="Directory shared by all workers for merged metrics; empty it when the service starts"
+    )
+    METRICS_FLUSH_SECONDS: float = Field(10.0, gt=0, description="How often a worker writes its metrics snapshot")
+
+    # Internal endpoints (/internal/*) are disabled unless a token is configured
+    INTERNAL_API_TOKEN: Optional[str] = Field(None, description="Shared secret for the X-Internal-Token header")
+
+    # On-demand profiling: requests with X-Profile: 1 and a valid X-Internal-Token run under cProfile
+    PROFILING_ENABLED: bool = Field(False, description="Allow internal-token holders to profile single requests")
+    PROFILING_DIR: str = Field(
+        os.path.join(path.LOGS_DIR, "profiles"), description="Where pstats dumps and text summaries are written"
+    )
+    PROFILING_TOP_FUNCTIONS: int = Field(40, ge=1, description="Functions listed in the text summary")
+
+    # GET /tasks response cache (per user, invalidated by task writes; see app/core/cache.py)
+    TASK_LIST_CACHE_ENABLED: bool = Field(True, description="Serve repeated task list queries from cache")
+    TASK_LIST_CACHE_STORE: Literal["auto", "memory", "sqlite"] = Field(
+        "auto", description="In-process LRU, SQLite file shared by workers, or auto: sqlite if WEB_CONCURRENCY > 1"
+    )
+    TASK_LIST_CACHE_SQLITE_PATH: str = Field(
+        os.path.join(path.DATA_DIR, "taskcache.db"), description="SQLite file used when TASK_LIST_CACHE_STORE=sqlite"
+    )
+    TASK_LIST_CACHE_MAX_ENTRIES: int = Field(10_000, ge=1, description="Cached pages across all users")
+    TASK_LIST_CACHE_MAX_PER_USER: int = Field(32, ge=1, description="Cached pages per user (LRU)")
+    TASK_LIST_CACHE_TTL_SECONDS: float = Field(300.0, gt=0, description="Upper bound on how long a page is cached")
+
+    # GET /tasks/{id} tree snapshots (per process, invalidated up the ancestor chain on writes). With several
+    # workers they are also checked against the shared list cache generations, and unused without them
+    TASK_TREE_CACHE_ENABLED: bool = Field(True, description="Serve full task trees from serialized snapshots")
+    TASK_TREE_CACHE_MAX_BYTES: int = Field(64 * 1024 * 1024, ge=1024, description="Memory budget for snapshots")
+    TASK_TREE_CACHE_TTL_SECONDS: float = Field(300.0, gt=0, description="Upper bound on how long a tree is cached")
+
+    # Identical concurrent GET /tasks and GET /tasks/{id} share one computation (app/core/singleflight.py)
+    SINGLE_FLIGHT_ENABLED: bool = Field(True, description="Coalesce identical concurrent task reads per user")
+
+    # Admission control: concurrent requests per route class, then a bounded queue (app/core/admission.py)
+    ADMISSION_ENABLED: bool = Field(True, description="Limit concurrent requests per route class, shed the excess")
+    ADMISSION_LIMITS: Dict[str, int] = Field(
+        {"read": 64, "tree": 16, "write": 32, "bulk": 4, "auth": 8},
+        description="Requests running at once per class (read, tree, write, bulk, auth)",
+    )
+    ADMISSION_QUEUE_SIZE: Dict[str, int] = Field(
+        {"read": 256, "tree": 16, "write": 128, "bulk": 4, "auth": 32},
+        description="Requests allowed to wait per class; more get 503",
+    )
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = Field(2.0, gt=0, description="Longest wait for a slot before a 503")
+    ADMISSION_SHED_FIRST: List[str] = Field(
+        ["tree", "bulk"], description="Classes refused outright while any other class has requests waiting"
+    )
+    ADMISSION_RETRY_AFTER_SECONDS: int = Field(1, ge=1, description="Retry-After sent with shed requests")
+
+    # Idempotency-Key on POST /tasks and /tasks/bulk (see app/services/idempotency.py)
+    IDEMPOTENCY_TTL_SECONDS: int = Field(24 * 3600, ge=60, description="How long a stored response is replayed")
+    IDEMPOTENCY_LOCK_SECONDS: int = Field(60, ge=1, description="After this, an unfinished claim can be taken over")
+    IDEMPOTENCY_WAIT_SECONDS: float = Field(10.0, ge=0, description="How long a duplicate waits for the first request")
+    IDEMPOTENCY_POLL_SECONDS: float = Field(0.1, gt=0, description="Re-check interval while waiting on another worker")
+    IDEMPOTENCY_MAX_ROWS: int = Field(100_000, ge=1, description="Stored responses kept; the sweeper drops the oldest")
+
+    # GET /tasks/stream change feed (Server-Sent Events; see app/services/task_events.py)
+    TASK_EVENTS_ENABLED: bool = Field(True, description="Publish task changes to open event streams")
+    TASK_EVENTS_BROKER: Literal["auto", "local", "sqlite"] = Field(
+        "auto", description="In-process only, SQLite file shared by workers, or auto: sqlite if WEB_CONCURRENCY > 1"
+    )
+    TASK_EVENTS_SQLITE_PATH: str = Field(
+        os.path.join(path.DATA_DIR, "taskevents.db"), description="SQLite file used when TASK_EVENTS_BROKER=sqlite"
+    )
+    TASK_EVENTS_POLL_SECONDS: float = Field(0.2, gt=0, description="How often workers poll the SQLite broker")
+    TASK_EVENTS_REPLAY_SIZE: int = Field(256, ge=1, description="Recent events kept per user for Last-Event-ID resume")
+    TASK_EVENTS_REPLAY_USERS: int = Field(10_000, ge=1, description="Users whose recent events are kept (LRU)")
+    TASK_EVENTS_REPLAY_MAX_BYTES: int = Field(
+        32 * 1024 * 1024, ge=1024, description="Memory budget for replay buffers across all users (LRU by user)"
+    )
+    TASK_EVENTS_QUEUE_SIZE: int = Field(1000, ge=1, description="Events buffered per stream before it is closed")
+    TASK_EVENTS_HEARTBEAT_SECONDS: float = Field(15.0, gt=0, description="Keep-alive comment interval on idle streams")
+    TASK_EVENTS_RETRY_MS: int = Field(3000, ge=0, description="Reconnect delay suggested to clients")
+    TASK_EVENTS_MAX_STREAMS_PER_USER: int = Field(
+        10, ge=1, description="Open streams per user and worker; more get 429"
+    )
+
+    # Password hashing (bcrypt runs on a small dedicated thread pool, off the event loop)
+    PASSWORD_HASH_WORKERS: int = Field(4, ge=1, description="Threads hashing/verifying passwords concurrently")
 
     # Email settings
     FRONTEND_ORIGIN: str = Field("http://localhost:3000", description="Frontend origin for CORS and email links")
@@ -42,6 +177,52 @@ class Settings(BaseSettings):
     SMTP_USERNAME: str = Field("username", description="SMTP username")
     SMTP_PASSWORD: str = Field("password", description="SMTP password or app password")
     EMAIL_FROM: str = Field("Taskaza <noreply@taskaza.app>", description="Default 'from' email address")
+    SMTP_START_TLS: bool = Field(True, description="Upgrade SMTP connections with STARTTLS")
+    SMTP_TIMEOUT_SECONDS: float = Field(30.0, description="Timeout for SMTP connect and commands")
+    SMTP_POOL_SIZE: int = Field(2, ge=1, description="Long-lived authenticated SMTP connections per worker")
+    SMTP_IDLE_CHECK_SECONDS: float = Field(60.0, description="Send a NOOP before reusing a connection idle this long")
+
+    # Email outbox (background sender)
+    EMAIL_OUTBOX_ENABLED: bool = Field(True, description="Run the outbox sender in the app lifespan")
+    EMAIL_OUTBOX_BATCH_SIZE: int = Field(20, ge=1, description="Messages claimed per sender pass")
+    EMAIL_OUTBOX_POLL_SECONDS: float = Field(5.0, description="Idle poll interval when nothing wakes the sender")
+    EMAIL_OUTBOX_LEASE_SECONDS: float = Field(120.0, description="How long a claimed batch is hidden from others")
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = Field(6, ge=1, description="Attempts before a message is marked failed")
+    EMAIL_OUTBOX_BACKOFF_SECONDS: float = Field(30.0, description="First retry delay; doubles per attempt")
+    EMAIL_OUTBOX_BACKOFF_MAX_SECONDS: float = Field(3600.0, description="Upper bound for the retry delay")
+
+    # Rate limiting settings (limits use "<count>/<period>", e.g. "10/minute" or "5/30s")
+    RATE_LIMIT_ENABLED: bool = Field(True, description="Enable request throttling on auth endpoints")
+    RATE_LIMIT_STORE: Literal["memory", "sqlite"] = Field(
+        "memory", description="Counter store: in-process memory or a SQLite file shared by all workers"
+    )
+    RATE_LIMIT_SQLITE_PATH: str = Field(
+        os.path.join(path.DATA_DIR, "ratelimit.db"), description="SQLite file used when RATE_LIMIT_STORE=sqlite"
+    )
+    RATE_LIMIT_LOGIN_PER_IP: str = Field("30/minute", description="Login attempts allowed per client IP")
+    RATE_LIMIT_LOGIN_PER_USERNAME: str = Field("10/minute", description="Login attempts allowed per username")
+    RATE_LIMIT_SIGNUP_PER_IP: str = Field("20/hour", description="Sign-ups allowed per client IP")
+    RATE_LIMIT_EMAIL_PER_IP: str = Field("10/minute", description="Verify/reset email requests per client IP")
+    RATE_LIMIT_EMAIL_PER_ADDRESS: str = Field("5/hour", description="Verify/reset email requests per address")
+
+    # Per-API-key limits (a key's own "limit:*" scopes take precedence over these defaults). Unset by
+    # default: keys are only throttled when they carry their own limits, since one key (e.g. the
+    # frontend's) may be shared by many users
+    API_KEY_DEFAULT_RATE_PER_SEC: Optional[float] = Field(None, description="Sustained requests/sec per API key")
+    API_KEY_DEFAULT_BURST: Optional[int] = Field(None, description="Token bucket capacity per API key")
+    API_KEY_DEFAULT_DAILY_QUOTA: Optional[int] = Field(None, description="Requests per UTC day per API key")
+    API_KEY_QUOTA_FLUSH_SECONDS: float = Field(5.0, description="How often per-key usage is pushed to the store")
+    API_KEY_USAGE_FLUSH_SECONDS: float = Field(
+        10.0, description="How often buffered last_used_at/request_count updates are written to the database"
+    )
+
+    # Maintenance sweeper (purges expired/consumed rows in bounded chunks)
+    MAINTENANCE_ENABLED: bool = Field(True, description="Run the periodic maintenance sweep in the app lifespan")
+    MAINTENANCE_INTERVAL_SECONDS: float = Field(3600.0, description="Seconds between maintenance sweeps")
+    MAINTENANCE_CHUNK_SIZE: int = Field(500, ge=1, description="Rows deleted per transaction")
+    RETENTION_EMAIL_TOKENS_DAYS: int = Field(7, ge=0, description="Keep consumed/expired email tokens this long")
+    RETENTION_API_KEYS_DAYS: int = Field(30, ge=0, description="Keep revoked/expired API keys this long")
+    RETENTION_EMAIL_OUTBOX_DAYS: int = Field(14, ge=0, description="Keep sent/failed outbox messages this long")
 
     # Configuration for Pydantic settings
     model_config = SettingsConfigDict(env_prefix="TSKZ_", env_file=".env", env_file_encoding="utf-8", extra="ignore")
@@ -49,6 +230,15 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
+
+def web_concurrency() -> int:
+    """Worker processes configured through WEB_CONCURRENCY (read by uvicorn and gunicorn); 1 if unset."""
+    try:
+        return int(os.environ.get("WEB_CONCURRENCY", "1"))
+    except ValueError:
+        return 1
+
+
 if __name__ == "__main__":
     # Debugging: Print the settings to verify they are loaded correctly
     from pprint import pprint
@@ -3,13 +3,17 @@ from datetime import datetime, timezone
 from typing import AsyncGenerator
 
 from app.core.auth import verify_access_token
+from app.core.ratelimit import RateLimitExceeded, api_key_throttle, too_many_requests
+from app.core.scopes import parse_scopes
 from app.core.timeutils import as_aware_utc
 
 # from app.core.config import settings
 from app.crud.apikey import get_key_by_hash
 from app.crud.user import get_user_by_id
+from app.db.routing import REPLICA_KEY, USER_KEY, read_router
 from app.db.session import async_session
 from app.models.user import User
+from app.services.usage import api_key_usage
 from fastapi import Depends, HTTPException, status
 from fastapi.security import APIKeyHeader, OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -26,6 +30,24 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def get_read_db(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for read-only routes: the replica if configured, the primary right after the user wrote.
+    On the primary this is the request's `get_db` session (already used by the API key check), so a
+    request never holds two connections from the same pool.
+    """
+    token_data = verify_access_token(token)
+    factory = read_router.session_for(token_data.id)
+    if factory is read_router.primary:
+        yield db
+        return
+    async with factory() as session:
+        session.info[REPLICA_KEY] = True
+        yield session
+
+
 # ---------------------------- #
 # Dependency: API Key Check
 # ---------------------------- #
@@ -63,6 +85,13 @@ async def verify_api_key(
     if key.expires_at and as_aware_utc(key.expires_at) < datetime.now(timezone.utc):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="API key expired")
 
+    # per-key throughput / daily quota (in-memory; flushed to the shared store in the background)
+    try:
+        api_key_throttle.hit(key.id, parse_scopes(key.scopes).limits)
+    except RateLimitExceeded as e:
+        raise too_many_requests(e.retry_after)
+    api_key_usage.record(key.id)  # buffered; persisted by a background flush
+
     # You can attach scopes or the user to request state if needed
     return key
 
@@ -70,7 +99,7 @@ async def verify_api_key(
 # ---------------------------- #
 # Dependency: Get Current User
 # ---------------------------- #
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+async def _load_user(token: str, db: AsyncSession) -> User:
     token_data = verify_access_token(token)
     user = await get_user_by_id(db, token_data.id)
     if not user:
@@ -81,6 +110,17 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     return user
 
 
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+    user = await _load_user(token, db)
+    db.info[USER_KEY] = user.id  # writes committed on this session make the user's reads sticky
+    return user
+
+
+async def get_current_user_read(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)) -> User:
+    """Like `get_current_user`, but loaded through the read session; don't modify the returned user."""
+    return await _load_user(token, db)
+
+
 # ---------------------------- #
 # Dependency: Require Verified User
 # ---------------------------- #
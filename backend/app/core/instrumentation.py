@@ -0,0 +1,299 @@
+"""
+Per-request SQL and timing instrumentation.
+
+Cursor events on every engine add each statement's count and duration to the stats of the request
+being served (a contextvar set by RequestTimingMiddleware), and every response carries
+
+    Server-Timing: db;dur=3.10;desc="4 queries", serialize;dur=0.80, app;dur=5.20
+
+`serialize` is response model validation + JSON rendering (routes must use InstrumentedRoute) and
+`app` is whatever is left. Requests over TSKZ_SLOW_REQUEST_MS / TSKZ_SLOW_REQUEST_QUERIES are logged,
+and a sampled fraction (TSKZ_SQL_EXPLAIN_SAMPLE_RATE) logs the plans of their SELECT statements.
+The same stats feed the per-route metrics in app/core/metrics.py.
+
+With TSKZ_N_PLUS_ONE_DETECTION=log|raise, statements are also grouped by shape (whitespace and IN
+lists normalized) and a request that runs one shape TSKZ_N_PLUS_ONE_THRESHOLD times or more is
+logged, or fails with NPlusOneDetected (meant for tests and dev, where the exception surfaces).
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import DB_QUERY_SECONDS, HTTP_REQUEST_QUERIES, HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestStats:
+    explain: bool = False
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db_seconds: float = 0.0
+    serialize_seconds: float = 0.0
+    endpoint_done: Optional[float] = None
+    plans: list[tuple[float, str, list[str]]] = field(default_factory=list)
+    shapes: Optional[Counter[str]] = None  # statement fingerprint -> executions, when N+1 detection is on
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        total = self.elapsed()
+        app = max(total - self.db_seconds - self.serialize_seconds, 0.0)
+        return (
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries", '
+            f"serialize;dur={self.serialize_seconds * 1000:.2f}, app;dur={app * 1000:.2f}"
+        )
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Stats of the request being served, or None outside a request (background jobs, CLI)."""
+    return _current.get()
+
+
+class NPlusOneDetected(AssertionError):
+    """A request repeated one statement shape N+1 style (TSKZ_N_PLUS_ONE_DETECTION=raise)."""
+
+
+_IN_LIST = re.compile(r"\(\s*(?:\?|\$\d+|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|\$\d+|%\(\w+\)s|:\w+))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """Statement shape: the same query with any number of IN (...) placeholders maps to one fingerprint."""
+    return _WHITESPACE.sub(" ", _IN_LIST.sub("(?, ...)", statement)).strip()
+
+
+# ---------------------------- #
+# SQL
+# ---------------------------- #
+_STARTED_KEY = "instrumentation_started"
+_EXPLAIN_PREFIX = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+_EXPLAIN_SAVEPOINT = "tskz_explain"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current.get()
+    started = conn.info.get(_STARTED_KEY)
+    if stats is None or not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats.queries += 1
+    stats.db_seconds += elapsed
+    if stats.shapes is not None:
+        stats.shapes[fingerprint(statement)] += 1
+    if (
+        stats.explain
+        and not executemany
+        and len(stats.plans) < settings.SQL_EXPLAIN_MAX_STATEMENTS
+        and statement.lstrip()[:6].upper() == "SELECT"
+    ):
+        plan = _explain(conn, statement, parameters)
+        if plan:
+            stats.plans.append((elapsed, statement, plan))
+
+
+def _handle_error(exception_context) -> None:
+    conn = exception_context.connection
+    if conn is not None and conn.info.get(_STARTED_KEY):
+        conn.info[_STARTED_KEY].pop()
+
+
+def _explain(conn, statement: str, parameters) -> Optional[list[str]]:
+    """Plan of `statement` on the same connection, bypassing SQLAlchemy so it isn't counted itself.
+
+    Runs inside a savepoint: on Postgres a failed statement aborts the whole transaction, and this one belongs
+    to the request.
+    """
+    prefix = _EXPLAIN_PREFIX.get(conn.dialect.name)
+    if prefix is None:
+        return None
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return [str(row[-1]) for row in cursor.fetchall()]
+        except Exception:
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            raise
+        finally:
+            cursor.execute(f"RELEASE SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+    except Exception:
+        logger.debug("EXPLAIN failed for %s", statement, exc_info=True)
+        return None
+    finally:
+        cursor.close()
+
+
+def instrument_engine(engine) -> None:
+    """Count and time statements on `engine` (an AsyncEngine) for the current request."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+# ---------------------------- #
+# Routes
+# ---------------------------- #
+def _mark_endpoint_done(call):
+    def mark() -> None:
+        stats = _current.get()
+        if stats is not None:
+            stats.endpoint_done = time.perf_counter()
+
+    if inspect.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def endpoint(**values: Any) -> Any:
+            try:
+                return await call(**values)
+            finally:
+                mark()
+
+    else:
+
+        @functools.wraps(call)
+        def endpoint(**values: Any) -> Any:
+            try:
+                return call(**values)
+            finally:
+                mark()
+
+    return endpoint
+
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute that times response serialization (everything after the endpoint returns)."""
+
+    def get_route_handler(self):
+        if self.dependant.call is not None:
+            self.dependant.call = _mark_endpoint_done(self.dependant.call)
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            stats = _current.get()
+            if stats is not None and stats.endpoint_done is not None:
+                stats.serialize_seconds += time.perf_counter() - stats.endpoint_done
+                stats.endpoint_done = None
+            return response
+
+        return timed_handler
+
+
+# ---------------------------- #
+# Middleware
+# ---------------------------- #
+class RequestTimingMiddleware:
+    """Server-Timing + slow request log (SQL_INSTRUMENTATION_ENABLED) and per-route metrics (METRICS_ENABLED)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        timing, record = settings.SQL_INSTRUMENTATION_ENABLED, settings.METRICS_ENABLED
+        detect = settings.N_PLUS_ONE_DETECTION
+        if scope["type"] != "http" or not (timing or record or detect != "off"):
+            await self.app(scope, receive, send)
+            return
+
+        rate = settings.SQL_EXPLAIN_SAMPLE_RATE
+        stats = RequestStats(explain=timing and rate > 0 and random.random() < rate)
+        if detect != "off":
+            stats.shapes = Counter()
+        status_code, streaming = 500, False
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Event streams stay open by design: not slow requests
+                streaming = MutableHeaders(scope=message).get("content-type", "").startswith("text/event-stream")
+                if timing:
+                    MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        token = _current.set(stats)
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        completed = False
+        try:
+            await self.app(scope, receive, send_with_timing)
+            completed = True
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            _current.reset(token)
+            if timing and not streaming:
+                _report(scope, status_code, stats)
+            if record:
+                _record(scope, status_code, stats)
+            if stats.shapes is not None:
+                # Raising out of a failed request would replace its own exception: only log those
+                _check_repeats(scope, stats, raise_=detect == "raise" and completed)
+
+
+def _record(scope: Scope, status_code: int, stats: RequestStats) -> None:
+    # Route templates ("/tasks/{task_id}") keep label cardinality bounded; unrouted paths share one label
+    method, route = scope["method"], getattr(scope.get("route"), "path", "unmatched")
+    HTTP_REQUEST_SECONDS.labels(method, route, status_code).observe(stats.elapsed())
+    HTTP_REQUEST_QUERIES.labels(method, route).observe(stats.queries)
+    if stats.db_seconds:
+        DB_QUERY_SECONDS.labels(method, route).inc(stats.db_seconds)
+
+
+def _report(scope: Scope, status_code: int, stats: RequestStats) -> None:
+    total_ms = stats.elapsed() * 1000
+    method, path = scope["method"], scope["path"]
+    if total_ms >= settings.SLOW_REQUEST_MS or stats.queries >= settings.SLOW_REQUEST_QUERIES:
+        logger.warning(
+            "Slow request %s %s -> %s: %.1fms total, %.1fms in %d queries, %.1fms serializing",
+            method,
+            path,
+            status_code,
+            total_ms,
+            stats.db_seconds * 1000,
+            stats.queries,
+            stats.serialize_seconds * 1000,
+        )
+    for elapsed, statement, plan in stats.plans:
+        logger.info(
+            "Query plan (%.1fms) in %s %s\n%s\n  %s", elapsed * 1000, method, path, statement, "\n  ".join(plan)
+        )
+
+
+def _check_repeats(scope: Scope, stats: RequestStats, *, raise_: bool) -> None:
+    threshold = settings.N_PLUS_ONE_THRESHOLD
+    repeated = [(n, shape) for shape, n in stats.shapes.most_common() if n >= threshold]
+    if not repeated:
+        return
+    detail = "\n".join(f"  {n}x {shape}" for n, shape in repeated)
+    message = f"Possible N+1 in {scope['method']} {scope['path']} ({stats.queries} queries):\n{detail}"
+    if raise_:
+        raise NPlusOneDetected(message)
+    logger.warning(message)
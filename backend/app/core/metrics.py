@@ -0,0 +1,302 @@
+"""
+In-process metrics in the Prometheus text format (served at /internal/metrics).
+
+Observations only touch a dict and a float/list in memory. Values that already live elsewhere
+(pool stats, cache counters, queue depths) are copied in by collectors when a scrape happens.
+
+With several workers, set TSKZ_METRICS_MULTIPROC_DIR to a directory shared by the workers (and
+emptied when the service starts): each worker writes a snapshot there every
+TSKZ_METRICS_FLUSH_SECONDS and whichever worker serves the scrape merges them. Counters and
+histograms are summed across all snapshots, gauges only across workers that are still alive.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# ---------------------------- #
+# Metrics
+# ---------------------------- #
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        """Gauges, or counters mirroring a cumulative count kept elsewhere."""
+        self.value = value
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._children: dict[tuple[str, ...], Any] = {}
+        self._default = None if self.labelnames else self.labels()
+
+    def _new_child(self):
+        return _Value()
+
+    def labels(self, *values: Any):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def dump(self) -> dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "help": self.help,
+            "labels": self.labelnames,
+            "samples": [[list(k), c.value] for k, c in self._children.items()],
+        }
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labels)
+
+    def _new_child(self):
+        return _Buckets(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def dump(self) -> dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "help": self.help,
+            "labels": self.labelnames,
+            "bounds": self.bounds,
+            "samples": [[list(k), c.counts, c.sum] for k, c in self._children.items()],
+        }
+
+
+# ---------------------------- #
+# Registry
+# ---------------------------- #
+class MetricsRegistry:
+    def __init__(self, multiproc_dir: Optional[str] = None):
+        self.multiproc_dir = multiproc_dir
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def _add(self, metric: Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(
+        self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def collector(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Register a function that refreshes metrics from live state right before each snapshot."""
+        self._collectors.append(fn)
+        return fn
+
+    def snapshot(self) -> dict[str, Any]:
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception:
+                logger.exception("Metrics collector %s failed", getattr(collect, "__qualname__", collect))
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+    # Multiprocess
+    def _snapshot_path(self, pid: int) -> Path:
+        return Path(self.multiproc_dir) / f"metrics_{pid}.json"
+
+    async def flush(self) -> None:
+        """Write this worker's snapshot to the shared directory (periodic background job)."""
+        if not self.multiproc_dir:
+            return
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.multiproc_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump({"pid": os.getpid(), "metrics": self.snapshot()}, fh, separators=(",", ":"))
+        os.replace(tmp, self._snapshot_path(os.getpid()))
+
+    def _collect_all(self) -> dict[str, Any]:
+        if not self.multiproc_dir:
+            return self.snapshot()
+        snapshots = [{"pid": os.getpid(), "metrics": self.snapshot()}]
+        for path in Path(self.multiproc_dir).glob("metrics_*.json"):
+            if path == self._snapshot_path(os.getpid()):
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue  # being replaced right now; it'll be there next scrape
+        return merge_snapshots(snapshots)
+
+    def render(self) -> str:
+        return render_text(self._collect_all())
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshots(snapshots: list[dict[str, Any]]) -> dict[str, Any]:
+    merged: dict[str, Any] = {}
+    for snap in snapshots:
+        alive = snap["pid"] == os.getpid() or _pid_alive(snap["pid"])
+        for name, metric in snap["metrics"].items():
+            if metric["kind"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            for sample in metric["samples"]:
+                key = tuple(sample[0])
+                if metric["kind"] == "histogram":
+                    counts, total = target["samples"].get(key, ([0] * len(sample[1]), 0.0))
+                    target["samples"][key] = ([a + b for a, b in zip(counts, sample[1])], total + sample[2])
+                else:
+                    target["samples"][key] = target["samples"].get(key, 0.0) + sample[1]
+    for metric in merged.values():
+        metric["samples"] = [[list(k), *(v if isinstance(v, tuple) else (v,))] for k, v in metric["samples"].items()]
+    return merged
+
+
+# ---------------------------- #
+# Text exposition
+# ---------------------------- #
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_text(metrics: dict[str, Any]) -> str:
+    """Prometheus text exposition format 0.0.4."""
+    lines: list[str] = []
+    for name, metric in metrics.items():
+        if not metric["samples"]:
+            continue
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric["labels"]
+        for sample in metric["samples"]:
+            values = sample[0]
+            if metric["kind"] != "histogram":
+                lines.append(f"{name}{_labels(names, values)} {_num(sample[1])}")
+                continue
+            counts, total, running = sample[1], sample[2], 0
+            for bound, n in zip([*(repr(float(b)) for b in metric["bounds"]), "+Inf"], counts):
+                running += n
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{_labels(names, values, le)} {running}")
+            lines.append(f"{name}_sum{_labels(names, values)} {_num(total)}")
+            lines.append(f"{name}_count{_labels(names, values)} {running}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------- #
+# Request metrics (recorded by RequestTimingMiddleware)
+# ---------------------------- #
+registry = MetricsRegistry(settings.METRICS_MULTIPROC_DIR)
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "taskaza_http_request_duration_seconds", "Request latency by route", ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge("taskaza_http_requests_in_flight", "Requests currently being served")
+HTTP_REQUEST_QUERIES = registry.histogram(
+    "taskaza_http_request_queries",
+    "SQL statements per request",
+    ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+DB_QUERY_SECONDS = registry.counter(
+    "taskaza_db_query_seconds_total", "Time spent in SQL statements by route", ("method", "route")
+)
+TASK_TREE_NODES = registry.histogram(
+    "taskaza_task_tree_nodes",
+    "Tasks per tree returned with include_tree",
+    ("endpoint",),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
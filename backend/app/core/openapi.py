@@ -0,0 +1,55 @@
+"""
+Build-time OpenAPI schema.
+
+    python -m app.core.openapi --output openapi.json
+
+Point TSKZ_OPENAPI_SCHEMA_PATH at the file and workers serve /openapi.json (and /docs) from it
+instead of walking every route and model to build the schema on the first request.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from pathlib import Path
+
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+
+def export_openapi(app: FastAPI, output: str | Path) -> Path:
+    output = Path(output)
+    output.write_text(json.dumps(app.openapi(), separators=(",", ":")), encoding="utf-8")
+    return output
+
+
+def use_prebuilt_openapi(app: FastAPI, path: str | Path) -> None:
+    """Load the schema from `path` on first use; fall back to generating it if the file is missing."""
+    generate = app.openapi
+
+    def openapi() -> dict:
+        if app.openapi_schema is None:
+            try:
+                app.openapi_schema = json.loads(Path(path).read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                logger.warning("Prebuilt OpenAPI schema %s not found; generating it", path)
+                return generate()
+        return app.openapi_schema
+
+    app.openapi = openapi
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="openapi.json", help="where to write the schema")
+    args = parser.parse_args()
+
+    from app.main import app
+
+    print(f"Wrote {export_openapi(app, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+On-demand request profiling, for reproducing one user's slow requests against their real data.
+
+With TSKZ_PROFILING_ENABLED=true, a request sent with `X-Profile: 1` and a valid `X-Internal-Token`
+runs under cProfile. The response carries `X-Profile-Id`; once the response is sent, two files are
+written under TSKZ_PROFILING_DIR:
+
+    <id>.prof   pstats dump (python -m pstats, snakeviz, ...)
+    <id>.txt    summary with DB / serialization time split out, then the top functions
+
+Both are also served by GET /internal/profiles/{id}. DB time comes from the per-request SQL
+stats (app/core/instrumentation.py); the queries themselves run on the driver's thread, so they
+show up in the profile as time awaiting results.
+
+cProfile traces the whole event loop thread, so other requests running at the same time end up
+in the profile too: profile on a quiet worker. One profile runs at a time per process; a second
+request asking for one is served normally with `X-Profile: busy`. When profiling is disabled, or
+the request doesn't ask for it, the middleware only checks a setting.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import time
+import uuid
+from typing import Optional
+
+from app.core.config import settings
+from app.core.instrumentation import RequestStats, current_request_stats
+from app.core.security import constant_time_equals
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ID = re.compile(r"[0-9]{8}T[0-9]{6}-[A-Z]+-[\w.-]*-[0-9a-f]{8}")
+
+_active = False  # cProfile can't nest, one profile per process at a time
+
+
+def profile_paths(profile_id: str) -> tuple[str, str]:
+    """(pstats file, text summary) for a profile id; ValueError for anything that isn't one."""
+    if not PROFILE_ID.fullmatch(profile_id):
+        raise ValueError(f"Invalid profile id {profile_id!r}")
+    base = os.path.join(settings.PROFILING_DIR, profile_id)
+    return f"{base}.prof", f"{base}.txt"
+
+
+def _wants_profile(scope: Scope) -> bool:
+    headers = Headers(scope=scope)
+    token, expected = headers.get("x-internal-token"), settings.INTERNAL_API_TOKEN
+    return (
+        headers.get("x-profile", "").lower() in ("1", "true")
+        and bool(expected and token)
+        and constant_time_equals(token, expected)
+    )
+
+
+def _summary(
+    scope: Scope, status_code: int, elapsed: float, stats: Optional[RequestStats], profiler: cProfile.Profile
+) -> str:
+    query = f"?{scope['query_string'].decode()}" if scope.get("query_string") else ""
+    lines = [f"{scope['method']} {scope['path']}{query} -> {status_code}", f"total     {elapsed * 1000:9.1f}ms"]
+    if stats is not None:
+        other = elapsed - stats.db_seconds - stats.serialize_seconds
+        lines += [
+            f"db        {stats.db_seconds * 1000:9.1f}ms in {stats.queries} queries",
+            f"serialize {stats.serialize_seconds * 1000:9.1f}ms",
+            f"other     {other * 1000:9.1f}ms",
+        ]
+    else:
+        lines.append("db        not recorded (TSKZ_SQL_INSTRUMENTATION_ENABLED and TSKZ_METRICS_ENABLED are off)")
+
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(settings.PROFILING_TOP_FUNCTIONS)
+    return "\n".join(lines) + "\n\n" + out.getvalue()
+
+
+def _write(profile_id: str, profiler: cProfile.Profile, summary: str) -> None:
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    prof_path, text_path = profile_paths(profile_id)
+    profiler.dump_stats(prof_path)
+    with open(text_path, "w", encoding="utf-8") as fh:
+        fh.write(summary)
+
+
+class ProfilingMiddleware:
+    """Runs requests that ask for it (X-Profile + internal token) under cProfile; see module docstring."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        global _active
+        if not settings.PROFILING_ENABLED or scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if _active:
+            await self.app(scope, receive, _with_header(send, "X-Profile", "busy"))
+            return
+
+        slug = re.sub(r"[^\w.-]+", "_", scope["path"].strip("/"))[:60]
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method']}-{slug}-{uuid.uuid4().hex[:8]}"
+        status_code = 500
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await _with_header(send, "X-Profile-Id", profile_id)(message)
+
+        stats = current_request_stats()  # set by RequestTimingMiddleware, which wraps this one
+        profiler = cProfile.Profile()
+        _active = True
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            _active = False
+            elapsed = time.perf_counter() - started
+            summary = _summary(scope, status_code, elapsed, stats, profiler)
+            await asyncio.to_thread(_write, profile_id, profiler, summary)
+            logger.info("Profiled %s %s as %s", scope["method"], scope["path"], profile_id)
+
+
+def _with_header(send: Send, name: str, value: str) -> Send:
+    async def wrapped(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            MutableHeaders(scope=message).append(name, value)
+        await send(message)
+
+    return wrapped
@@ -0,0 +1,367 @@
+import asyncio
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Protocol
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.core.scopes import KeyLimits
+
+# ---------------------------- #
+# Rates
+# ---------------------------- #
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(?:(\d+)\s*s|(second|minute|hour|day)s?)\s*$")
+
+
+@dataclass(frozen=True)
+class Rate:
+    limit: int
+    window: int  # seconds
+
+    @classmethod
+    def parse(cls, spec: str) -> "Rate":
+        """Parse "10/minute", "100/hours" or "5/30s" into a Rate."""
+        m = _RATE_RE.match(spec)
+        if not m:
+            raise ValueError(f"Invalid rate limit spec: {spec!r}")
+        window = int(m.group(2)) if m.group(2) else _PERIODS[m.group(3)]
+        return cls(limit=int(m.group(1)), window=max(window, 1))
+
+
+# ---------------------------- #
+# Stores
+# ---------------------------- #
+class RateLimitStore(Protocol):
+    async def hit(self, key: str, window: int, now: float, cost: int = 1) -> tuple[int, int]:
+        """Add `cost` to the fixed window containing `now`; return (current, previous) window counts."""
+
+    async def reset(self) -> None: ...
+
+
+class MemoryRateLimitStore:
+    """
+    Per-process counters. Two integers per key; no awaits, so updates are atomic on the event loop.
+    When `max_keys` is reached, the least recently hit keys are evicted down to 90% of it, so a
+    flood of new keys cannot reset the counters of keys that are in use.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> [window_start, current_count, previous_count], least recently hit first
+        self._buckets: OrderedDict[str, list[int]] = OrderedDict()
+
+    async def hit(self, key: str, window: int, now: float, cost: int = 1) -> tuple[int, int]:
+        start = int(now // window) * window
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = self._buckets[key] = [start, 0, 0]
+        else:
+            self._buckets.move_to_end(key)
+        if bucket[0] != start:
+            # Roll the window; anything older than one window back no longer counts
+            bucket[2] = bucket[1] if bucket[0] == start - window else 0
+            bucket[0], bucket[1] = start, 0
+        bucket[1] += cost
+        return bucket[1], bucket[2]
+
+    def _prune(self, now: float) -> None:
+        # Buckets are only meaningful for two windows; drop anything idle for a day
+        cutoff = now - 86400
+        for k in [k for k, b in self._buckets.items() if b[0] < cutoff]:
+            del self._buckets[k]
+        low_water = self.max_keys * 9 // 10
+        while len(self._buckets) > low_water:
+            self._buckets.popitem(last=False)
+
+    async def reset(self) -> None:
+        self._buckets.clear()
+
+
+class SQLiteRateLimitStore:
+    """Counters in a SQLite file so every worker on the host shares the same limits."""
+
+    _PRUNE_EVERY = 1000
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._hits = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                " key TEXT NOT NULL, window_start INTEGER NOT NULL, count INTEGER NOT NULL,"
+                " expires_at INTEGER NOT NULL, PRIMARY KEY (key, window_start))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _hit_sync(self, key: str, window: int, now: float, cost: int) -> tuple[int, int]:
+        start = int(now // window) * window
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = conn.execute(
+                    "INSERT INTO rate_limits (key, window_start, count, expires_at) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (key, window_start) DO UPDATE SET count = count + excluded.count"
+                    " RETURNING count",
+                    (key, start, cost, start + 2 * window),
+                ).fetchone()[0]
+                row = conn.execute(
+                    "SELECT count FROM rate_limits WHERE key = ? AND window_start = ?", (key, start - window)
+                ).fetchone()
+                self._hits += 1
+                if self._hits % self._PRUNE_EVERY == 0:
+                    conn.execute("DELETE FROM rate_limits WHERE expires_at < ?", (int(now),))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return current, row[0] if row else 0
+
+    async def hit(self, key: str, window: int, now: float, cost: int = 1) -> tuple[int, int]:
+        return await asyncio.to_thread(self._hit_sync, key, window, now, cost)
+
+    def _reset_sync(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM rate_limits")
+
+    async def reset(self) -> None:
+        await asyncio.to_thread(self._reset_sync)
+
+
+def _build_store() -> RateLimitStore:
+    if settings.RATE_LIMIT_STORE == "sqlite":
+        return SQLiteRateLimitStore(settings.RATE_LIMIT_SQLITE_PATH)
+    return MemoryRateLimitStore()
+
+
+# ---------------------------- #
+# Limiter (sliding window counter)
+# ---------------------------- #
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Rate limit exceeded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Sliding-window counter: the previous fixed window is weighted by how much of it still overlaps
+    the sliding window. Rejected attempts still count, so a client that keeps hammering stays blocked.
+    """
+
+    def __init__(self, store: RateLimitStore):
+        self.store = store
+
+    async def check(self, key: str, rate: Rate, cost: int = 1, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        current, previous = await self.store.hit(key, rate.window, now, cost)
+        elapsed = now - (now // rate.window) * rate.window
+        estimated = previous * (1 - elapsed / rate.window) + current
+        if estimated <= rate.limit:
+            return
+
+        if current > rate.limit or previous == 0:
+            wait = rate.window - elapsed
+        else:
+            # Time until the previous window's weight decays enough to fit under the limit
+            wait = rate.window * (1 - (rate.limit - current) / previous) - elapsed
+        raise RateLimitExceeded(max(1, math.ceil(wait)))
+
+
+limiter = RateLimiter(_build_store())
+
+
+# ---------------------------- #
+# Key functions
+# ---------------------------- #
+KeyFunc = Callable[[Request], Awaitable[Optional[str]]]
+
+
+async def client_ip(request: Request) -> Optional[str]:
+    # Behind a proxy, uvicorn's --proxy-headers already resolves the real client into request.client
+    return request.client.host if request.client else "unknown"
+
+
+def form_field(name: str) -> KeyFunc:
+    """Key on a form field (Starlette caches the parsed form, so this does not re-read the body)."""
+
+    async def _key(request: Request) -> Optional[str]:
+        value = (await request.form()).get(name)
+        return str(value).strip().lower() if value else None
+
+    return _key
+
+
+def json_field(name: str) -> KeyFunc:
+    """Key on a top-level JSON body field (the parsed body is cached on the request)."""
+
+    async def _key(request: Request) -> Optional[str]:
+        try:
+            body = await request.json()
+        except ValueError:
+            return None
+        value = body.get(name) if isinstance(body, dict) else None
+        return str(value).strip().lower() if value else None
+
+    return _key
+
+
+def too_many_requests(retry_after: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests, please try again later",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+# ---------------------------- #
+# Dependency
+# ---------------------------- #
+class RateLimit:
+    """
+    Route dependency: `dependencies=[Depends(RateLimit("login:ip", settings.RATE_LIMIT_LOGIN_PER_IP))]`.
+    Raises 429 with a `Retry-After` header when the caller is over the limit.
+    """
+
+    def __init__(self, scope: str, rate: str | Rate, key: KeyFunc = client_ip):
+        self.scope = scope
+        self.rate = Rate.parse(rate) if isinstance(rate, str) else rate
+        self.key = key
+
+    async def __call__(self, request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        ident = await self.key(request)
+        if ident is None:
+            return
+        # Hash identifiers so raw usernames/emails never end up in a shared store
+        digest = hashlib.sha256(ident.encode("utf-8")).hexdigest()[:32]
+        try:
+            await limiter.check(f"{self.scope}:{digest}", self.rate)
+        except RateLimitExceeded as e:
+            raise too_many_requests(e.retry_after)
+
+
+login_rate_limits = [
+    RateLimit("login:ip", settings.RATE_LIMIT_LOGIN_PER_IP),
+    RateLimit("login:user", settings.RATE_LIMIT_LOGIN_PER_USERNAME, key=form_field("username")),
+]
+signup_rate_limits = [
+    RateLimit("signup:ip", settings.RATE_LIMIT_SIGNUP_PER_IP),
+]
+email_rate_limits = [
+    RateLimit("email:ip", settings.RATE_LIMIT_EMAIL_PER_IP),
+    RateLimit("email:addr", settings.RATE_LIMIT_EMAIL_PER_ADDRESS, key=json_field("email")),
+]
+
+
+# ---------------------------- #
+# Per-API-key throughput and daily quota
+# ---------------------------- #
+_DAY = 86400
+
+
+@dataclass(slots=True)
+class _KeyState:
+    tokens: float
+    refilled_at: float
+    day: int
+    pending: int = 0  # requests today not yet flushed to the shared store
+    shared: int = 0  # today's total across workers as of the last flush
+
+
+@dataclass(frozen=True)
+class KeyUsage:
+    requests_today: int
+    daily_quota: Optional[int]
+
+    @property
+    def remaining_today(self) -> Optional[int]:
+        return None if self.daily_quota is None else max(self.daily_quota - self.requests_today, 0)
+
+
+class APIKeyThrottle:
+    """
+    Token bucket (requests/sec + burst) and daily quota per API key, checked entirely in memory.
+    Daily counts are pushed to the rate limit store by `flush()` on a timer, so the request path
+    never waits on I/O; with the SQLite store every worker sees the others' usage after a flush.
+    """
+
+    def __init__(self):
+        self._state: dict[int, _KeyState] = {}
+
+    def effective_limits(self, limits: KeyLimits) -> KeyLimits:
+        rate = limits.rate_per_sec if limits.rate_per_sec is not None else settings.API_KEY_DEFAULT_RATE_PER_SEC
+        burst = limits.burst if limits.burst is not None else settings.API_KEY_DEFAULT_BURST
+        quota = limits.daily_quota if limits.daily_quota is not None else settings.API_KEY_DEFAULT_DAILY_QUOTA
+        if rate and not burst:
+            burst = max(1, math.ceil(rate))
+        return KeyLimits(rate_per_sec=rate, burst=burst, daily_quota=quota)
+
+    def hit(self, key_id: int, limits: KeyLimits, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        limits = self.effective_limits(limits)
+        day = int(now // _DAY)
+
+        st = self._state.get(key_id)
+        if st is None:
+            st = self._state[key_id] = _KeyState(tokens=float(limits.burst or 0), refilled_at=now, day=day)
+        if st.day != day:
+            st.day, st.pending, st.shared = day, 0, 0
+
+        if limits.daily_quota is not None and st.shared + st.pending >= limits.daily_quota:
+            raise RateLimitExceeded(max(1, math.ceil(_DAY - now % _DAY)))
+
+        if limits.rate_per_sec:
+            capacity = float(limits.burst)
+            st.tokens = min(capacity, st.tokens + (now - st.refilled_at) * limits.rate_per_sec)
+            st.refilled_at = now
+            if st.tokens < 1:
+                raise RateLimitExceeded(max(1, math.ceil((1 - st.tokens) / limits.rate_per_sec)))
+            st.tokens -= 1
+
+        st.pending += 1
+
+    def usage(self, key_id: int, limits: KeyLimits, now: Optional[float] = None) -> KeyUsage:
+        now = time.time() if now is None else now
+        quota = self.effective_limits(limits).daily_quota
+        st = self._state.get(key_id)
+        if st is None or st.day != int(now // _DAY):
+            return KeyUsage(requests_today=0, daily_quota=quota)
+        return KeyUsage(requests_today=st.shared + st.pending, daily_quota=quota)
+
+    async def flush(self) -> None:
+        for key_id, st in list(self._state.items()):
+            if not st.pending:
+                continue
+            n, st.pending = st.pending, 0
+            try:
+                total, _ = await limiter.store.hit(f"apikey:{key_id}:day", _DAY, st.day * _DAY, n)
+            except Exception:
+                st.pending += n
+                raise
+            st.shared = total
+
+    def reset(self) -> None:
+        self._state.clear()
+
+
+api_key_throttle = APIKeyThrottle()
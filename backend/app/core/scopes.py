@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Optional
+
+# Limits live inside the key's scopes list as "limit:<name>=<value>" entries, e.g. "limit:rps=5"
+LIMIT_PREFIX = "limit:"
+
+
+@dataclass(frozen=True)
+class KeyLimits:
+    rate_per_sec: Optional[float] = None
+    burst: Optional[int] = None
+    daily_quota: Optional[int] = None
+
+    def is_empty(self) -> bool:
+        return self.rate_per_sec is None and self.burst is None and self.daily_quota is None
+
+
+@dataclass(frozen=True)
+class ParsedScopes:
+    scopes: Optional[tuple[str, ...]]
+    limits: KeyLimits
+
+
+@lru_cache(maxsize=4096)
+def parse_scopes(raw: Optional[str]) -> ParsedScopes:
+    """
+    Parse the JSON text stored in `APIKey.scopes`. Cached by the raw string, so hot paths
+    (API key verification, key listing) don't re-run `json.loads` for the same key.
+    """
+    if not raw:
+        return ParsedScopes(scopes=None, limits=KeyLimits())
+    try:
+        items = json.loads(raw)
+    except ValueError:
+        return ParsedScopes(scopes=None, limits=KeyLimits())
+    if not isinstance(items, list):
+        return ParsedScopes(scopes=None, limits=KeyLimits())
+
+    scopes: list[str] = []
+    values: dict[str, str] = {}
+    for item in items:
+        item = str(item)
+        if item.startswith(LIMIT_PREFIX) and "=" in item:
+            name, _, value = item[len(LIMIT_PREFIX) :].partition("=")
+            values[name.strip()] = value.strip()
+        else:
+            scopes.append(item)
+
+    def _num(name: str, cast):
+        try:
+            return cast(values[name]) if name in values else None
+        except ValueError:
+            return None
+
+    limits = KeyLimits(rate_per_sec=_num("rps", float), burst=_num("burst", int), daily_quota=_num("daily", int))
+    return ParsedScopes(scopes=tuple(scopes) or None, limits=limits)
+
+
+def encode_scopes(scopes: Optional[Iterable[str]], limits: Optional[KeyLimits] = None) -> Optional[str]:
+    """Inverse of `parse_scopes`: JSON text for `APIKey.scopes` (None when there is nothing to store)."""
+    items = [s for s in (scopes or []) if not s.startswith(LIMIT_PREFIX)]
+    if limits:
+        if limits.rate_per_sec is not None:
+            items.append(f"{LIMIT_PREFIX}rps={limits.rate_per_sec:g}")
+        if limits.burst is not None:
+            items.append(f"{LIMIT_PREFIX}burst={limits.burst}")
+        if limits.daily_quota is not None:
+            items.append(f"{LIMIT_PREFIX}daily={limits.daily_quota}")
+    return json.dumps(items) if items else None
@@ -1,23 +1,65 @@
+import asyncio
 import hashlib
 import hmac
 import secrets
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Tuple
 
-from passlib.context import CryptContext
 from app.core.config import settings
 
+
 # ---------------------------- #
 # Password Hashing
 # ---------------------------- #
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def pwd_context():
+    """passlib + bcrypt are only needed by signup/login/reset; load them on first use, not at import."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def hash_password(password: str):
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated thread pool so slow hashes never block the event loop or starve the
+    default executor. Calls beyond `workers` wait in the pool's queue (`queue_depth`).
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.in_flight = 0
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.in_flight - self.workers, 0)
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+
+password_hasher = PasswordHasher(workers=settings.PASSWORD_HASH_WORKERS)
 
 
 def generate_api_key() -> Tuple[str, str, str]:
@@ -28,6 +70,11 @@ def generate_api_key() -> Tuple[str, str, str]:
     """
     prefix = secrets.token_hex(3)  # short, user-visible fragment
     secret = secrets.token_urlsafe(32)
+    return api_key_from_parts(prefix, secret)
+
+
+def api_key_from_parts(prefix: str, secret: str) -> Tuple[str, str, str]:
+    """(display_key, prefix, secret_hash) for a given prefix/secret pair; see generate_api_key."""
     raw = f"{prefix}.{secret}"
     secret_hash = hashlib.sha256(raw.encode("utf-8")).hexdigest()
     display_key = f"{settings.API_KEY_PREFIX}_{prefix}_{secret}"
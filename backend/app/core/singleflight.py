@@ -0,0 +1,89 @@
+"""
+Single-flight coalescing of identical concurrent reads.
+
+Several tabs or an integration firing parallel requests often have the same GET in flight many
+times over. `task_reads.do(user_id, key, render)` runs `render` once per (user, key) at a time: the
+first caller (the leader) runs it, and callers arriving meanwhile await that result instead of
+running the same queries again.
+
+- Errors: whatever the leader raises is raised to every waiter (a 404 is a 404 for all of them).
+- Cancellation: a waiter that goes away (client disconnect) just stops waiting; the flight is
+  shielded from it. If the leader itself is cancelled, its waiters retry: one becomes the new
+  leader and runs `render` on its own request (and DB session).
+- Writes: call `forget(user_id)` right after committing. Flights already running may have read
+  the old rows, so requests arriving after the write start a new one instead of joining.
+
+Per process, in memory; results are shared by reference, so they must not be mutated.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """The leader's request was cancelled before it produced a result; waiters retry."""
+
+
+@dataclass
+class FlightStats:
+    leaders: int = 0  # calls that ran `render`
+    shared: int = 0  # calls that awaited another call's result
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: dict[int, dict[Hashable, asyncio.Future]] = {}
+        self.stats = FlightStats()
+
+    async def do(self, user_id: int, key: Hashable, render: Callable[[], Awaitable[T]]) -> T:
+        """`render()`'s result, shared with every identical call made while it runs."""
+        while True:
+            flight = self._flights.get(user_id, {}).get(key)
+            if flight is None:
+                break
+            self.stats.shared += 1
+            try:
+                return await asyncio.shield(flight)
+            except _LeaderCancelled:
+                continue
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights.setdefault(user_id, {})[key] = flight
+        self.stats.leaders += 1
+        try:
+            result = await render()
+        except asyncio.CancelledError:
+            flight.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as exc:
+            flight.set_exception(exc)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            flight.exception()  # retrieved here, so a flight nobody joined doesn't log "never retrieved"
+            flights = self._flights.get(user_id)
+            if flights is not None and flights.get(key) is flight:
+                del flights[key]
+                if not flights:
+                    del self._flights[user_id]
+
+    def forget(self, user_id: int) -> None:
+        """Detach the user's running flights: later calls don't join them (call after a write)."""
+        self._flights.pop(user_id, None)
+
+    def in_flight(self) -> int:
+        return sum(len(flights) for flights in self._flights.values())
+
+    def reset(self) -> None:
+        self._flights.clear()
+        self.stats = FlightStats()
+
+
+task_reads = SingleFlight()
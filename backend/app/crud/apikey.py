@@ -1,14 +1,20 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Iterable, Optional
 
 from app.core.security import generate_api_key
+from app.db.sqlite import serialized_write
 from app.models.apikey import APIKey
-from sqlalchemy import select
+from sqlalchemy import bindparam, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+# Prebuilt hot-path statements (verify_api_key runs on every /tasks request)
+_KEY_BY_HASH = select(APIKey).where(APIKey.secret_hash == bindparam("secret_hash"))
+_KEYS_FOR_USER = select(APIKey).where(APIKey.user_id == bindparam("user_id")).order_by(APIKey.created_at.desc())
 
+
+@serialized_write
 async def create_api_key(
     db: AsyncSession,
     user_id: int,
@@ -33,11 +39,11 @@ async def create_api_key(
 
 
 async def list_api_keys(db: AsyncSession, user_id: int):
-    q = select(APIKey).where(APIKey.user_id == user_id).order_by(APIKey.created_at.desc())
-    res = await db.execute(q)
+    res = await db.execute(_KEYS_FOR_USER, {"user_id": user_id})
     return list(res.scalars())
 
 
+@serialized_write
 async def revoke_api_key(db: AsyncSession, user_id: int, key_id: int) -> bool:
     q = select(APIKey).where(APIKey.id == key_id, APIKey.user_id == user_id)
     res = await db.execute(q)
@@ -51,11 +57,11 @@ async def revoke_api_key(db: AsyncSession, user_id: int, key_id: int) -> bool:
 
 
 async def get_key_by_hash(db: AsyncSession, secret_hash: str) -> Optional[APIKey]:
-    q = select(APIKey).where(APIKey.secret_hash == secret_hash)
-    res = await db.execute(q)
+    res = await db.execute(_KEY_BY_HASH, {"secret_hash": secret_hash})
     return res.scalar_one_or_none()
 
 
+@serialized_write
 async def delete_api_key(db, user_id: int, key_id: int) -> bool:
     res = await db.execute(select(APIKey).where(APIKey.id == key_id, APIKey.user_id == user_id))
     key = res.scalar_one_or_none()
@@ -64,3 +70,23 @@ async def delete_api_key(db, user_id: int, key_id: int) -> bool:
     await db.delete(key)
     await db.commit()
     return True
+
+
+@serialized_write
+async def record_key_usage(db: AsyncSession, usage: Iterable[tuple[int, int, datetime]]) -> int:
+    """
+    Apply buffered usage as `(key_id, request_count_delta, last_used_at)` rows.
+    Runs as a single executemany UPDATE in one transaction.
+    """
+    rows = [{"key_id": key_id, "n": n, "used_at": used_at} for key_id, n, used_at in usage]
+    if not rows:
+        return 0
+    table = APIKey.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("key_id"))
+        .values(request_count=table.c.request_count + bindparam("n"), last_used_at=bindparam("used_at"))
+    )
+    await db.execute(stmt, rows)
+    await db.commit()
+    return len(rows)
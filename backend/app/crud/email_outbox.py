@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from app.db.sqlite import serialized_write
+from app.models.email_outbox import EmailOutbox
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@serialized_write
+async def enqueue_email(
+    db: AsyncSession,
+    to_email: str,
+    subject: str,
+    html: str,
+    *,
+    dedupe_key: Optional[str] = None,
+) -> EmailOutbox:
+    """
+    Queue a message for the background sender. If a pending message with the same `dedupe_key`
+    exists it is replaced (newest content wins) instead of queueing a duplicate. A message a sender
+    has already claimed is left alone: it gives up the key and the new one is queued beside it.
+    """
+    now = datetime.now(timezone.utc)
+    if dedupe_key:
+        # Conditional UPDATE: a claim taken between a SELECT and the write could not be overwritten
+        res = await db.execute(
+            update(EmailOutbox)
+            .where(
+                EmailOutbox.dedupe_key == dedupe_key,
+                EmailOutbox.status == "pending",
+                EmailOutbox.claim_token.is_(None),
+            )
+            .values(to_email=to_email, subject=subject, html=html, next_attempt_at=now)
+            .returning(EmailOutbox)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        existing = res.scalar_one_or_none()
+        await db.commit()
+        if existing is not None:
+            return existing
+        await db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.dedupe_key == dedupe_key)
+            .values(dedupe_key=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    msg = EmailOutbox(to_email=to_email, subject=subject, html=html, dedupe_key=dedupe_key, next_attempt_at=now)
+    db.add(msg)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent enqueue for the same key; theirs is equivalent
+        await db.rollback()
+        res = await db.execute(select(EmailOutbox).where(EmailOutbox.dedupe_key == dedupe_key))
+        return res.scalar_one()
+    return msg
+
+
+@serialized_write
+async def claim_due_emails(db: AsyncSession, limit: int, lease: timedelta) -> list[EmailOutbox]:
+    """
+    Atomically claim up to `limit` due messages by stamping them with a claim token and pushing
+    `next_attempt_at` out by `lease` (so a crashed worker's claim expires and is retried).
+    """
+    now = datetime.now(timezone.utc)
+    token = secrets.token_hex(8)
+    due = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(limit)
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(due), EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .values(claim_token=token, next_attempt_at=now + lease)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    res = await db.execute(select(EmailOutbox).where(EmailOutbox.claim_token == token).order_by(EmailOutbox.id))
+    return list(res.scalars())
+
+
+# Bodies carry live verify/reset links: blanked once a message leaves the queue, so the outbox
+# doesn't keep usable tokens around for RETENTION_EMAIL_OUTBOX_DAYS
+_SCRUBBED_HTML = ""
+
+
+@serialized_write
+async def mark_emails_sent(db: AsyncSession, ids: Iterable[int]) -> None:
+    ids = list(ids)
+    if not ids:
+        return
+    await db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids))
+        .values(
+            status="sent",
+            sent_at=datetime.now(timezone.utc),
+            html=_SCRUBBED_HTML,
+            dedupe_key=None,
+            claim_token=None,
+            last_error=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+@serialized_write
+async def mark_email_failed(
+    db: AsyncSession,
+    msg_id: int,
+    error: str,
+    *,
+    attempts: int,
+    retry_at: Optional[datetime],
+) -> None:
+    """Record a failed attempt; `retry_at=None` gives up on the message for good."""
+    values = dict(attempts=attempts, last_error=error[:2000], claim_token=None)
+    if retry_at is None:
+        values.update(status="failed", html=_SCRUBBED_HTML, dedupe_key=None)
+    else:
+        values.update(next_attempt_at=retry_at)
+    await db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id == msg_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
@@ -5,6 +5,7 @@ from typing import Optional
 
 from app.core.security import generate_email_token, hash_email_token
 from app.core.timeutils import as_aware_utc
+from app.db.sqlite import serialized_write
 from app.models.email_token import EmailToken
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -13,6 +14,7 @@ DEFAULT_VERIFY_TTL = timedelta(hours=24)
 DEFAULT_RESET_TTL = timedelta(hours=1)
 
 
+@serialized_write
 async def issue_email_token(db: AsyncSession, user_id: int, purpose: str, ttl: Optional[timedelta] = None):
     raw, thash = generate_email_token()
     expires_at = datetime.now(timezone.utc) + (
@@ -25,6 +27,7 @@ async def issue_email_token(db: AsyncSession, user_id: int, purpose: str, ttl: O
     return tok, raw
 
 
+@serialized_write
 async def consume_email_token(db: AsyncSession, raw_token: str, purpose: str) -> Optional[EmailToken]:
     thash = hash_email_token(raw_token)
     q = select(EmailToken).where(EmailToken.token_hash == thash, EmailToken.purpose == purpose)
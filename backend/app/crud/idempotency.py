@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.db.sqlite import serialized_write
+from app.models.idempotency_key import IdempotencyKey
+from sqlalchemy import Row, and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def get_idempotency_record(db: AsyncSession, user_id: int, key: str) -> Optional[Row]:
+    """(request_hash, status_code, body, locked_until) of the user's unexpired record for `key`."""
+    stmt = select(
+        IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.body, IdempotencyKey.locked_until
+    ).where(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.expires_at > datetime.now(timezone.utc),
+    )
+    return (await db.execute(stmt)).first()
+
+
+@serialized_write
+async def claim_idempotency_key(
+    db: AsyncSession, user_id: int, key: str, request_hash: str, *, lease: timedelta, ttl: timedelta
+) -> bool:
+    """
+    Record that this request is now running under `key`. False if another request holds it; an
+    expired record, or a claim whose lease ran out (its worker died), is taken over.
+    """
+    now = datetime.now(timezone.utc)
+    values = dict(
+        request_hash=request_hash, status_code=None, body=None, locked_until=now + lease, expires_at=now + ttl
+    )
+    db.add(IdempotencyKey(user_id=user_id, key=key, **values))
+    try:
+        await db.commit()
+        return True
+    except IntegrityError:
+        await db.rollback()
+
+    res = await db.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            or_(
+                IdempotencyKey.expires_at <= now,
+                and_(IdempotencyKey.status_code.is_(None), IdempotencyKey.locked_until <= now),
+            ),
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return res.rowcount == 1
+
+
+async def stage_idempotent_response(db: AsyncSession, user_id: int, key: str, status_code: int, body: bytes) -> None:
+    """Store the response in the current transaction; it commits together with the request's own writes."""
+    await db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .values(status_code=status_code, body=body, locked_until=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@serialized_write
+async def save_idempotent_response(db: AsyncSession, user_id: int, key: str, status_code: int, body: bytes) -> None:
+    await stage_idempotent_response(db, user_id, key, status_code, body)
+    await db.commit()
+
+
+@serialized_write
+async def release_idempotency_key(db: AsyncSession, user_id: int, key: str) -> None:
+    """Drop an unfinished claim, so a retry runs the request again."""
+    await db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
@@ -1,15 +1,38 @@
 from __future__ import annotations
 
-from collections import deque
-from typing import Any, Iterable, Mapping, Sequence
+import json
+from typing import Any, Awaitable, Callable, Iterable, Mapping, Optional, TypeVar
 
+from app.core.cache import task_list_cache, task_tree_cache
+from app.core.config import settings
+from app.core.singleflight import task_reads
+from app.db.sqlite import serialized_write
 from app.models.task import DBTaskCategory, DBTaskPriority, DBTaskStatus, Task
-from sqlalchemy import asc, desc, select
+from app.services.task_events import task_events
+from sqlalchemy import bindparam, insert, lambda_stmt, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import noload, selectinload
+from sqlalchemy.orm import noload
+from sqlalchemy.orm.attributes import set_committed_value
+
+# ---------- prebuilt statements ----------
+# Built once at import: executing them skips statement construction and cache-key generation and
+# goes straight to the engine's compiled cache. Pass values as {"task_id": ..., "user_id": ...}.
+
+_TASK_SHALLOW = (
+    select(Task)
+    .where(Task.id == bindparam("task_id"), Task.user_id == bindparam("user_id"))
+    .options(noload(Task.subtasks))  # no implicit loads during serialization
+)
 
 # ---------- helpers ----------
 
+_COLUMNS = frozenset(c.key for c in Task.__table__.columns)
+
+T = TypeVar("T")
+# Awaited with the write's result just before it commits, so the caller can add its own writes to the
+# same transaction (app/services/idempotency.py stores the response there)
+BeforeCommit = Optional[Callable[[T], Awaitable[None]]]
+
 _ENUM_FIELDS = {
     "status": DBTaskStatus,
     "priority": DBTaskPriority,
@@ -36,6 +59,17 @@ def _normalize_payload(data: Mapping[str, Any]) -> dict:
     return out
 
 
+def _column_payload(data: Mapping[str, Any]) -> dict:
+    """`_normalize_payload` restricted to real columns (drops e.g. an empty `subtasks` list) for Core INSERTs."""
+    return {k: v for k, v in _normalize_payload(data).items() if k in _COLUMNS}
+
+
+def _without_children(task: Task) -> Task:
+    """A freshly inserted task has no subtasks: mark the collection loaded so nothing lazy-loads it."""
+    set_committed_value(task, "subtasks", [])
+    return task
+
+
 async def _refresh_with_tree(db: AsyncSession, task: Task) -> Task:
     # Explicitly refresh fields we might need; keeps control over IO
     await db.refresh(task, attribute_names=["subtasks", "updated_at"])
@@ -43,104 +77,180 @@ async def _refresh_with_tree(db: AsyncSession, task: Task) -> Task:
 
 
 async def _is_descendant(db: AsyncSession, node_id: int, maybe_ancestor_id: int) -> bool:
-    stmt = select(Task).where(Task.id == maybe_ancestor_id).options(selectinload(Task.subtasks))
-    res = await db.execute(stmt)
-    root = res.scalar_one_or_none()
-    if not root:
-        return False
-
-    stack = list(root.subtasks)
-    while stack:
-        n = stack.pop()
-        if n.id == node_id:
+    """Walk down from `maybe_ancestor_id` one level per query, looking for `node_id`."""
+    frontier = [maybe_ancestor_id]
+    while frontier:
+        res = await db.execute(select(Task.id).where(Task.parent_id.in_(frontier)))
+        frontier = res.scalars().all()
+        if node_id in frontier:
             return True
-        await db.refresh(n, attribute_names=["subtasks"])
-        stack.extend(n.subtasks)
     return False
 
 
-async def _eager_load_full_tree(db: AsyncSession, root: Task) -> Task:
+async def _subtree_ids(db: AsyncSession, task_id: int) -> list[int]:
+    """`task_id` and all of its descendants, in one recursive query."""
+    tree = select(Task.id).where(Task.id == task_id).cte("subtree", recursive=True)
+    tree = tree.union_all(select(Task.id).join(tree, Task.parent_id == tree.c.id))
+    return list((await db.execute(select(tree.c.id))).scalars())
+
+
+async def _invalidate_trees(
+    db: AsyncSession, user_id: int, changed: Iterable[int | None], removed: Iterable[int] = ()
+) -> None:
+    """
+    Drop the cached tree snapshots (app/core/cache.py) that include a changed task: the task itself
+    and every ancestor, found in one recursive query up the parent chain. Call after committing.
+    `removed` ids (a deleted subtree) are dropped as they are.
+    """
+    task_tree_cache.invalidate(user_id, removed)
+    start = {task_id for task_id in changed if task_id is not None}
+    if not start or not task_tree_cache.tracks(user_id):
+        return
+    chain = select(Task.id, Task.parent_id).where(Task.id.in_(start)).cte("chain", recursive=True)
+    chain = chain.union(select(Task.id, Task.parent_id).join(chain, Task.id == chain.c.parent_id))
+    task_tree_cache.invalidate(user_id, start | set((await db.execute(select(chain.c.id))).scalars()))
+
+
+async def _eager_load_trees(db: AsyncSession, roots: Iterable[Task]) -> None:
     """
-    Breadth-first: ensure `subtasks` is loaded for all descendants.
+    Breadth-first: load `subtasks` for all descendants of `roots`, one query per tree level
+    (for all roots at once) instead of one per node.
     Prevents async lazy loads during Pydantic serialization.
     """
-    q = deque([root])
-    while q:
-        node = q.popleft()
-        # ensure children loaded
-        await db.refresh(node, attribute_names=["subtasks"])
-        # extend downwards
-        for child in node.subtasks:
-            q.append(child)
-    return root
+    frontier = {t.id: t for t in roots}
+    while frontier:
+        res = await db.execute(
+            select(Task)
+            .where(Task.parent_id.in_(list(frontier)))
+            .order_by(Task.id)
+            .options(noload(Task.subtasks), noload(Task.parent))
+        )
+        children: dict[int, list[Task]] = {task_id: [] for task_id in frontier}
+        for child in res.scalars().all():
+            children[child.parent_id].append(child)
+        for task_id, node in frontier.items():
+            set_committed_value(node, "subtasks", children[task_id])
+        frontier = {c.id: c for level in children.values() for c in level}
 
 
 # ---------- create ----------
 
 
-async def create_task(db: AsyncSession, user_id: int, task_data: Mapping[str, Any]) -> Task:
+@serialized_write
+async def create_task(
+    db: AsyncSession, user_id: int, task_data: Mapping[str, Any], *, before_commit: BeforeCommit[Task] = None
+) -> Task:
     """
     Create a single task (optionally with parent_id). Does not create nested subtasks.
-    Returns the row re-selected with `noload(Task.subtasks)` to avoid lazy IO on serialize.
+    The row comes back from INSERT ... RETURNING, so no re-select is needed to serialize it.
     """
-    payload = _normalize_payload(task_data)
-    task = Task(**payload, user_id=user_id)
-    db.add(task)
+    payload = _column_payload(task_data)
+    res = await db.execute(insert(Task).values(**payload, user_id=user_id).returning(Task))
+    task = _without_children(res.scalar_one())
+    if before_commit is not None:
+        await before_commit(task)
     await db.commit()
+    task_reads.forget(user_id)
+    await task_list_cache.invalidate(user_id)
+    await _invalidate_trees(db, user_id, [task.parent_id])
+    await task_events.tasks_changed(user_id, "created", [task])
+    return task
 
-    # Re-select with noload to prevent Pydantic from triggering a lazy load
-    stmt = select(Task).where(Task.id == task.id, Task.user_id == user_id).options(noload(Task.subtasks))
-    res = await db.execute(stmt)
-    return res.scalar_one()
 
+async def _insert_tasks(db: AsyncSession, rows: list[dict[str, Any]]) -> list[Task]:
+    """
+    Multi-row INSERT ... RETURNING, rows returned in the order of `rows`.
+
+    Neither RETURNING order nor id order is guaranteed in general, so other dialects ask for
+    sort_by_parameter_order (on asyncpg an INSERT ... SELECT ... ORDER BY with a sentinel). SQLite
+    would degrade that to one INSERT per row; there a statement's rows get increasing rowids in
+    VALUES order (one writer at a time), so sorting by id restores the order.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        res = await db.execute(insert(Task).returning(Task), rows)
+        return sorted(res.scalars().all(), key=lambda t: t.id)
+    res = await db.execute(insert(Task).returning(Task, sort_by_parameter_order=True), rows)
+    return list(res.scalars().all())
 
+
+@serialized_write
 async def create_task_with_subtree(
     db: AsyncSession,
     user_id: int,
     task_data: Mapping[str, Any],
+    *,
+    before_commit: BeforeCommit[Task] = None,
 ) -> Task:
     """
     Create a task and all of its nested subtasks (recursive).
     Expects `subtasks` in `task_data` as list[dict].
-    """
 
-    def build_node(data: Mapping[str, Any], parent: Task | None) -> Task:
-        payload = _normalize_payload({k: v for k, v in data.items() if k != "subtasks"})
-        node = Task(**payload, user_id=user_id, parent=parent)
-        for child in data.get("subtasks") or []:
-            build_node(child, node)
-        return node
-
-    root = build_node(task_data, None)
-    db.add(root)
+    Inserted one tree level at a time: one multi-row INSERT ... RETURNING per level and column set,
+    rather than one INSERT per node. The returned root has its whole tree loaded.
+    """
+    created: list[Task] = []
+    children: dict[int, list[Task]] = {}
+    level: list[tuple[Mapping[str, Any], int | None]] = [(task_data, task_data.get("parent_id"))]
+    while level:
+        # Rows with the same columns share a statement
+        groups: dict[frozenset, list[int]] = {}
+        rows = []
+        for i, (data, parent_id) in enumerate(level):
+            row = {**_column_payload(data), "user_id": user_id}
+            if parent_id is not None:
+                row["parent_id"] = parent_id
+            rows.append(row)
+            groups.setdefault(frozenset(row), []).append(i)
+
+        nodes: list[Task | None] = [None] * len(level)
+        for indices in groups.values():
+            # Returned in row order: the next level's parent ids are taken from these positions
+            for i, node in zip(indices, await _insert_tasks(db, [rows[i] for i in indices])):
+                nodes[i] = node
+
+        next_level = []
+        for (data, _), node in zip(level, nodes):
+            children[node.id] = []
+            if created:
+                children[node.parent_id].append(node)
+            created.append(node)
+            next_level.extend((child, node.id) for child in data.get("subtasks") or [])
+        level = next_level
+
+    if before_commit is not None:
+        await before_commit(created[0])
     await db.commit()
+    task_reads.forget(user_id)
+    await task_list_cache.invalidate(user_id)
+    await _invalidate_trees(db, user_id, [created[0].parent_id])
+    for node in created:
+        set_committed_value(node, "subtasks", children[node.id])
+    await task_events.tasks_changed(user_id, "created", created)
+    return created[0]
 
-    # Load the tree for safe serialization (2 levels; extend if you need deeper)
-    stmt = (
-        select(Task)
-        .where(Task.id == root.id, Task.user_id == user_id)
-        .options(selectinload(Task.subtasks).selectinload(Task.subtasks))
-    )
-    result = await db.execute(stmt)
-    return result.scalar_one()
-
-
-async def create_tasks_bulk(db: AsyncSession, user_id: int, tasks_data: Iterable[Mapping[str, Any]]) -> list[Task]:
-    tasks = [Task(**_normalize_payload(data), user_id=user_id) for data in tasks_data]
-    db.add_all(tasks)
-    await db.commit()
 
-    ids = [t.id for t in tasks]
-    if not ids:
+@serialized_write
+async def create_tasks_bulk(
+    db: AsyncSession,
+    user_id: int,
+    tasks_data: Iterable[Mapping[str, Any]],
+    *,
+    before_commit: BeforeCommit[list[Task]] = None,
+) -> list[Task]:
+    rows = [{**_column_payload(data), "user_id": user_id} for data in tasks_data]
+    if not rows:
         return []
 
-    stmt = (
-        select(Task)
-        .where(Task.user_id == user_id, Task.id.in_(ids))
-        .options(noload(Task.subtasks))  # no implicit loads during serialization
-    )
-    res = await db.execute(stmt)
-    return res.scalars().all()
+    # Multi-row INSERT ... RETURNING (one statement per run of rows with the same columns)
+    tasks = [_without_children(t) for t in await _insert_tasks(db, rows)]
+    if before_commit is not None:
+        await before_commit(tasks)
+    await db.commit()
+    task_reads.forget(user_id)
+    await task_list_cache.invalidate(user_id)
+    await _invalidate_trees(db, user_id, {t.parent_id for t in tasks})
+    await task_events.tasks_changed(user_id, "created", tasks)
+    return tasks
 
 
 # ---------- read ----------
@@ -163,34 +273,39 @@ async def get_tasks_for_user(
     - include_tree: eager-load subtasks to avoid N+1 queries
     - roots_only: only return tasks with parent_id IS NULL
     """
-    stmt = select(Task).where(Task.user_id == user_id)
+    # lambda_stmt: each optional piece is cached by its code location, with the closure values
+    # (user_id, status, pattern, offset, limit) extracted as bound parameters on every call
+    stmt = lambda_stmt(lambda: select(Task).where(Task.user_id == user_id))
 
     if isinstance(status, str):
         status = DBTaskStatus(status)
     if status:
-        stmt = stmt.where(Task.status == status)
+        stmt += lambda s: s.where(Task.status == status)
 
     if q:
-        stmt = stmt.where(Task.title.ilike(f"%{q}%"))
+        pattern = f"%{q}%"
+        stmt += lambda s: s.where(Task.title.ilike(pattern))
 
     if roots_only:
-        stmt = stmt.where(Task.parent_id.is_(None))
-
-    order = desc(Task.created_at) if str(sort).lower() == "desc" else asc(Task.created_at)
-    stmt = stmt.order_by(order).offset(max(page - 1, 0) * max(limit, 1)).limit(max(limit, 1))
+        stmt += lambda s: s.where(Task.parent_id.is_(None))
 
-    if include_tree:
-        stmt = stmt.options(selectinload(Task.subtasks).selectinload(Task.subtasks))  # 2 levels
+    if str(sort).lower() == "desc":
+        stmt += lambda s: s.order_by(Task.created_at.desc())
     else:
-        stmt = stmt.options(noload(Task.subtasks))
+        stmt += lambda s: s.order_by(Task.created_at.asc())
+
+    limit = max(limit, 1)
+    offset = max(page - 1, 0) * limit
+    stmt += lambda s: s.offset(offset).limit(limit)
+
+    stmt += lambda s: s.options(noload(Task.subtasks))
 
     result = await db.execute(stmt)
     rows = result.scalars().all()
 
     if include_tree:
-        # fully load each tree root so Pydantic never triggers lazy IO
-        for r in rows:
-            await _eager_load_full_tree(db, r)
+        # fully load every tree on the page so Pydantic never triggers lazy IO
+        await _eager_load_trees(db, rows)
     return rows
 
 
@@ -201,22 +316,18 @@ async def get_task_by_id(
     *,
     include_tree: bool = True,
 ) -> Task | None:
-    stmt = select(Task).where(Task.id == task_id, Task.user_id == user_id)
-    if include_tree:
-        stmt = stmt.options(selectinload(Task.subtasks).selectinload(Task.subtasks))
-    else:
-        stmt = stmt.options(noload(Task.subtasks))
-    result = await db.execute(stmt)
+    result = await db.execute(_TASK_SHALLOW, {"task_id": task_id, "user_id": user_id})
     task = result.scalar_one_or_none()
 
     if include_tree and task:
-        task = await _eager_load_full_tree(db, task)
+        await _eager_load_trees(db, [task])
     return task
 
 
 # ---------- update ----------
 
 
+@serialized_write
 async def update_task(db: AsyncSession, task: Task, updated_data: Mapping[str, Any]) -> Task:
     payload = _normalize_payload(updated_data)
 
@@ -234,61 +345,101 @@ async def update_task(db: AsyncSession, task: Task, updated_data: Mapping[str, A
             if await _is_descendant(db, task.id, new_parent_id):
                 raise ValueError("Cannot set a descendant as the parent (cycle).")
 
-        setattr(task, "parent_id", new_parent_id)
-
-    for key, value in payload.items():
-        if key == "parent_id":
-            continue
-        setattr(task, key, value)
+        payload["parent_id"] = new_parent_id
 
-    await db.commit()
-    stmt = select(Task).where(Task.id == task.id, Task.user_id == task.user_id).options(noload(Task.subtasks))
-    return (await db.execute(stmt)).scalar_one()
+    old_parent_id = task.parent_id
+    task = await _update_returning(db, task, payload)
+    # After a move, walking up from the task covers the new chain; the old one needs its own walk
+    await _invalidate_trees(db, task.user_id, [task.id, old_parent_id])
+    await task_events.tasks_changed(task.user_id, "updated", [task])
+    return task
 
 
+@serialized_write
 async def update_task_status(db: AsyncSession, task: Task, new_status: DBTaskStatus | str) -> Task:
     if isinstance(new_status, str):
         new_status = DBTaskStatus(new_status)
-    task.status = new_status
+    task = await _update_returning(db, task, {"status": new_status})
+    await _invalidate_trees(db, task.user_id, [task.id])
+    await task_events.tasks_changed(task.user_id, "status", [task])
+    return task
+
+
+async def _update_returning(db: AsyncSession, task: Task, values: Mapping[str, Any]) -> Task:
+    """UPDATE ... RETURNING refreshes `task` in place (including updated_at) in the same round trip."""
+    values = {k: v for k, v in values.items() if k in _COLUMNS}
+    if values:
+        stmt = (
+            update(Task)
+            .where(Task.id == task.id, Task.user_id == task.user_id)
+            .values(**values)
+            .returning(Task)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        task = (await db.execute(stmt)).scalar_one()
     await db.commit()
-    stmt = select(Task).where(Task.id == task.id, Task.user_id == task.user_id).options(noload(Task.subtasks))
-    return (await db.execute(stmt)).scalar_one()
+    task_reads.forget(task.user_id)
+    await task_list_cache.invalidate(task.user_id)
+    return task
 
 
+@serialized_write
 async def update_tasks_status_bulk(
     db: AsyncSession,
     user_id: int,
     updates: Iterable[tuple[int, DBTaskStatus | str]],
+    *,
+    before_commit: BeforeCommit[list[Task]] = None,
 ) -> list[Task]:
-    ids: list[int] = []
     desired: dict[int, DBTaskStatus] = {}
     for task_id, status in updates:
-        ids.append(task_id)
-        desired[task_id] = DBTaskStatus(status) if isinstance(status, str) else status
+        desired[task_id] = DBTaskStatus(status) if isinstance(status, str) else status  # last one wins
 
-    if not ids:
+    if not desired:
         return []
 
-    # Fetch rows to update (children not needed)
-    stmt = select(Task).where(Task.user_id == user_id, Task.id.in_(ids))
-    res = await db.execute(stmt)
-    rows: Sequence[Task] = res.scalars().all()
-
-    for t in rows:
-        t.status = desired[t.id]
-
+    # One UPDATE ... RETURNING per distinct target status (at most four), not one per task
+    by_status: dict[DBTaskStatus, list[int]] = {}
+    for task_id, status in desired.items():
+        by_status.setdefault(status, []).append(task_id)
+
+    updated: dict[int, Task] = {}
+    for status, ids in by_status.items():
+        stmt = (
+            update(Task)
+            .where(Task.user_id == user_id, Task.id.in_(ids))
+            .values(status=status)
+            .returning(Task)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        for t in (await db.execute(stmt)).scalars().all():
+            updated[t.id] = t
+    # Ids the user doesn't own are skipped; keep request order
+    tasks = [updated[task_id] for task_id in desired if task_id in updated]
+    if before_commit is not None:
+        await before_commit(tasks)
     await db.commit()
+    task_reads.forget(user_id)
+    await task_list_cache.invalidate(user_id)
+    await _invalidate_trees(db, user_id, updated)
 
-    # Re-fetch for safe serialization with subtasks disabled
-    stmt2 = select(Task).where(Task.user_id == user_id, Task.id.in_(ids)).options(noload(Task.subtasks))
-    res2 = await db.execute(stmt2)
-    return res2.scalars().all()
+    await task_events.tasks_changed(user_id, "status", tasks)
+    return tasks
 
 
 # ---------- delete ----------
 
 
+@serialized_write
 async def delete_task(db: AsyncSession, task: Task) -> None:
     """Delete a task (DB is configured with cascade delete for children)."""
+    user_id, task_id, parent_id = task.user_id, task.id, task.parent_id
+    # The subtree is gone after the commit, so collect it first (cheap: one recursive query)
+    needs_subtree = settings.TASK_TREE_CACHE_ENABLED or settings.TASK_EVENTS_ENABLED
+    removed = await _subtree_ids(db, task_id) if needs_subtree else []
     await db.delete(task)
     await db.commit()
+    task_reads.forget(user_id)
+    await task_list_cache.invalidate(user_id)
+    await _invalidate_trees(db, user_id, [parent_id], removed)
+    await task_events.publish(user_id, [("task.deleted", json.dumps({"id": task_id, "deleted": removed}))])
@@ -1,25 +1,37 @@
 from datetime import datetime
 from typing import Optional
 
-from app.core.security import hash_password
+from app.core.cache import task_list_cache, task_tree_cache
+from app.core.security import password_hasher
+from app.core.singleflight import task_reads
+from app.db.sqlite import serialized_write, single_writer
 from app.models.user import User
-from sqlalchemy import delete
+from sqlalchemy import bindparam, delete
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
 from sqlalchemy.future import select
 
+# Hot lookups (every authenticated request) are built once: executing a prebuilt statement skips
+# construction and cache-key generation and goes straight to the engine's compiled cache.
+_USER_BY_USERNAME = select(User).where(User.username == bindparam("username"))
+# Auth loads the user by id on every request; nothing reads `user.tasks` there, so skip the
+# relationship's selectin load (a query over all of the user's tasks)
+_USER_BY_ID = select(User).where(User.id == bindparam("user_id")).options(noload(User.tasks))
+_USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+
 
 async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
-    result = await db.execute(select(User).filter(User.username == username))
+    result = await db.execute(_USER_BY_USERNAME, {"username": username})
     return result.scalars().first()
 
 
 async def get_user_by_id(db: AsyncSession, id: int) -> Optional[User]:
-    result = await db.execute(select(User).filter(User.id == id))
+    result = await db.execute(_USER_BY_ID, {"user_id": id})
     return result.scalars().first()
 
 
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
-    result = await db.execute(select(User).filter(User.email == email))
+    result = await db.execute(_USER_BY_EMAIL, {"email": email})
     return result.scalars().first()
 
 
@@ -31,7 +43,7 @@ async def create_user(
     email: str | None = None,
     display_name: str | None = None,
 ):
-    hashed_pw = hash_password(password)
+    hashed_pw = await password_hasher.hash(password)  # before taking the writer slot: bcrypt is slow
     new_user = User(
         username=username,
         hashed_password=hashed_pw,
@@ -39,12 +51,14 @@ async def create_user(
         display_name=display_name,
     )
 
-    db.add(new_user)
-    await db.commit()
+    async with single_writer.slot():
+        db.add(new_user)
+        await db.commit()
     await db.refresh(new_user)
     return new_user
 
 
+@serialized_write
 async def update_user(db: AsyncSession, user: User, updates: dict) -> User:
     for field, value in updates.items():
         setattr(user, field, value)
@@ -54,6 +68,7 @@ async def update_user(db: AsyncSession, user: User, updates: dict) -> User:
     return user
 
 
+@serialized_write
 async def set_verification_token(db: AsyncSession, user: User, token: str, expires: datetime) -> User:
     user.verification_token = token
     user.verification_token_expires = expires
@@ -63,6 +78,7 @@ async def set_verification_token(db: AsyncSession, user: User, token: str, expir
     return user
 
 
+@serialized_write
 async def verify_user_email(db: AsyncSession, token: str) -> Optional[User]:
     result = await db.execute(select(User).filter(User.verification_token == token))
     user = result.scalars().first()
@@ -79,8 +95,13 @@ async def verify_user_email(db: AsyncSession, token: str) -> Optional[User]:
     return user
 
 
+@serialized_write
 async def delete_user(db: AsyncSession, user_id: int) -> bool:
     stmt = delete(User).where(User.id == user_id)
     result = await db.execute(stmt)
     await db.commit()
+    # Its tasks went with it (ON DELETE CASCADE)
+    task_reads.forget(user_id)
+    await task_list_cache.invalidate(user_id)
+    task_tree_cache.invalidate_user(user_id)
     return result.rowcount > 0
@@ -0,0 +1,143 @@
+"""
+Apply schema migrations:
+
+    python -m app.db.migrate            # upgrade to the latest version
+    python -m app.db.migrate --check    # exit 1 if migrations are pending
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.db.migrations import Migration, build_index, load_migrations
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, insert, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Kept out of Base.metadata: only the migrator creates or writes it
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+# pg_advisory_lock key, so two migrators (e.g. several containers starting at once) never interleave
+_ADVISORY_LOCK_KEY = 0x7461736B
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def latest_version() -> int:
+    migrations = load_migrations()
+    return migrations[-1].version if migrations else 0
+
+
+async def current_version(conn: AsyncConnection) -> Optional[int]:
+    """Highest applied version, 0 for an empty table, None when the table doesn't exist yet."""
+    try:
+        return (await conn.execute(select(func.coalesce(func.max(schema_version.c.version), 0)))).scalar_one()
+    except (OperationalError, ProgrammingError):
+        await conn.rollback()
+        return None
+
+
+async def check_schema(engine: AsyncEngine) -> None:
+    """Startup check: a single SELECT. Raises SchemaOutOfDate if migrations are pending."""
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+    latest = latest_version()
+    if version is None or version < latest:
+        raise SchemaOutOfDate(
+            f"Database schema is at version {version or 0}, the app needs {latest}. "
+            "Run `python -m app.db.migrate` before starting the app."
+        )
+
+
+async def _apply(engine: AsyncEngine, migration: Migration) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(migration.upgrade)
+
+    if migration.indexes:
+        async with engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for index in migration.indexes:
+                await conn.run_sync(build_index, index)
+            await conn.commit()
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(schema_version).values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.now(timezone.utc),
+            )
+        )
+
+
+async def migrate(engine: AsyncEngine, target: Optional[int] = None) -> list[int]:
+    """Apply pending migrations up to `target` (default: latest). Returns the versions applied."""
+    migrations = load_migrations()
+    applied: list[int] = []
+    async with engine.connect() as lock_conn:
+        if lock_conn.dialect.name == "postgresql":
+            await lock_conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _ADVISORY_LOCK_KEY})
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(_metadata.create_all, checkfirst=True)
+            async with engine.connect() as conn:
+                version = await current_version(conn) or 0
+
+            for migration in migrations:
+                if migration.version <= version or (target is not None and migration.version > target):
+                    continue
+                logger.info("Applying migration %04d: %s", migration.version, migration.description)
+                await _apply(engine, migration)
+                applied.append(migration.version)
+        finally:
+            if lock_conn.dialect.name == "postgresql":
+                await lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _ADVISORY_LOCK_KEY})
+    return applied
+
+
+async def main() -> int:
+    from app.db.session import engine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="only report whether migrations are pending")
+    parser.add_argument("--target", type=int, default=None, help="stop after this version")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    logger.setLevel(logging.INFO)
+
+    try:
+        if args.check:
+            try:
+                await check_schema(engine)
+            except SchemaOutOfDate as e:
+                print(e)
+                return 1
+            print(f"Schema is up to date (version {latest_version()}).")
+            return 0
+
+        applied = await migrate(engine, target=args.target)
+        print(f"Applied {len(applied)} migration(s)." if applied else "Nothing to apply.")
+        return 0
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
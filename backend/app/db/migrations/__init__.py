@@ -0,0 +1,90 @@
+"""
+Versioned schema migrations, applied in order by `python -m app.db.migrate`.
+
+Each migration module defines `VERSION`, `DESCRIPTION`, a synchronous `upgrade(conn)` that runs
+inside one transaction, and optionally `INDEXES`: indexes built after that transaction commits,
+with `CREATE INDEX CONCURRENTLY` on Postgres so live tables stay writable during the build.
+Steps must be safe to re-run: a migration is only recorded once all of it has succeeded.
+"""
+
+from __future__ import annotations
+
+import importlib
+import pkgutil
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Callable
+
+from sqlalchemy import Connection, inspect, text
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    name: str
+    table: str
+    columns: tuple[str, ...]
+    unique: bool = False
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+    indexes: tuple[IndexSpec, ...] = ()
+
+
+def _load(module: ModuleType) -> Migration:
+    return Migration(
+        version=module.VERSION,
+        description=module.DESCRIPTION,
+        upgrade=module.upgrade,
+        indexes=tuple(getattr(module, "INDEXES", ())),
+    )
+
+
+def load_migrations() -> list[Migration]:
+    """All `mNNNN_*` modules in this package, sorted by version."""
+    migrations = [
+        _load(importlib.import_module(f"{__name__}.{info.name}"))
+        for info in pkgutil.iter_modules(__path__)
+        if info.name.startswith("m")
+    ]
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return migrations
+
+
+# ---------------------------- #
+# Helpers for migration modules
+# ---------------------------- #
+def add_column_if_missing(conn: Connection, table: str, column: str, ddl: str) -> bool:
+    """`ALTER TABLE ... ADD COLUMN` unless the column exists (databases created by the old create_all)."""
+    if column in {c["name"] for c in inspect(conn).get_columns(table)}:
+        return False
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return True
+
+
+def build_index(conn: Connection, index: IndexSpec) -> None:
+    """
+    Create an index if it doesn't exist. On Postgres this must run on an AUTOCOMMIT connection:
+    it builds CONCURRENTLY, first dropping an INVALID leftover from an interrupted build.
+    """
+    unique = "UNIQUE " if index.unique else ""
+    columns = ", ".join(index.columns)
+    if conn.dialect.name == "postgresql":
+        invalid = conn.execute(
+            text(
+                "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ),
+            {"name": index.name},
+        ).first()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+        conn.execute(text(f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {index.name} ON {index.table} ({columns})"))
+    else:
+        conn.execute(text(f"CREATE {unique}INDEX IF NOT EXISTS {index.name} ON {index.table} ({columns})"))
@@ -0,0 +1,106 @@
+"""Core tables. Databases created by the old create_all-on-boot already have them and are adopted as-is."""
+
+from __future__ import annotations
+
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    Connection,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    func,
+)
+
+VERSION = 1
+DESCRIPTION = "users, tasks, api_keys, email_tokens"
+
+# The tables as they were at version 1, frozen here: later model changes belong in later migrations
+_metadata = MetaData()
+
+users = Table(
+    "users",
+    _metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(50), unique=True, index=True, nullable=False),
+    Column("hashed_password", String(255), nullable=False),
+    Column("email", String(320), unique=True, index=True, nullable=True),
+    Column("display_name", String(100), nullable=True),
+    Column("email_verified", Boolean, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    Column("verification_token", String, unique=True, index=True, nullable=True),
+    Column("verification_token_expires", DateTime, nullable=True),
+)
+
+
+def _enum(name: str, *values: str) -> Enum:
+    return Enum(*values, name=name, native_enum=False, create_constraint=True, validate_strings=True)
+
+
+tasks = Table(
+    "tasks",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False),
+    Column("parent_id", Integer, ForeignKey("tasks.id", ondelete="CASCADE"), index=True, nullable=True),
+    Column("title", String(255), nullable=False),
+    Column("description", Text),
+    Column("notes", Text),
+    Column("status", _enum("task_status", "todo", "in_progress", "completed", "cancelled"), nullable=False),
+    Column("priority", _enum("task_priority", "low", "medium", "high", "urgent"), nullable=False),
+    Column(
+        "category",
+        _enum("task_category", "work", "personal", "shopping", "health", "learning", "finance", "family", "travel"),
+        nullable=False,
+    ),
+    Column("tags", JSON, nullable=False),
+    Column("due_date", DateTime(timezone=True)),
+    Column("completed_date", DateTime(timezone=True)),
+    Column("estimated_hours", Float),
+    Column("actual_hours", Float),
+    Column("created_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    Index("ix_tasks_user_status_due", "user_id", "status", "due_date"),
+)
+
+api_keys = Table(
+    "api_keys",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False),
+    Column("name", String(100), nullable=False),
+    Column("secret_hash", String(128), unique=True, index=True, nullable=False),
+    Column("prefix", String(32), index=True, nullable=False),
+    Column("scopes", Text, nullable=True),
+    Column("expires_at", DateTime(timezone=False), index=True, nullable=True),
+    Column("revoked", Boolean, nullable=False),
+    Column("created_at", DateTime(timezone=False), nullable=False),
+    Column("revoked_at", DateTime(timezone=False), nullable=True),
+    Index("ix_api_keys_user_active", "user_id", "revoked"),
+)
+
+email_tokens = Table(
+    "email_tokens",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False),
+    Column("purpose", Enum("verify", "reset", name="email_token_purpose"), nullable=False),
+    Column("token_hash", String(128), unique=True, index=True, nullable=False),
+    Column("expires_at", DateTime(timezone=False), index=True, nullable=False),
+    Column("consumed_at", DateTime(timezone=False), nullable=True),
+    Column("created_at", DateTime(timezone=False), nullable=False),
+    Index("ix_email_tokens_user_purpose", "user_id", "purpose"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    _metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,14 @@
+"""Write-behind usage columns on api_keys."""
+
+from __future__ import annotations
+
+from app.db.migrations import add_column_if_missing
+from sqlalchemy import Connection
+
+VERSION = 2
+DESCRIPTION = "api_keys.last_used_at and api_keys.request_count"
+
+
+def upgrade(conn: Connection) -> None:
+    add_column_if_missing(conn, "api_keys", "last_used_at", "TIMESTAMP NULL")
+    add_column_if_missing(conn, "api_keys", "request_count", "INTEGER NOT NULL DEFAULT 0")
@@ -0,0 +1,33 @@
+"""Persistent outbox for verification and password-reset emails."""
+
+from __future__ import annotations
+
+from sqlalchemy import Column, Connection, DateTime, Enum, Index, Integer, MetaData, String, Table, Text, func
+
+VERSION = 3
+DESCRIPTION = "email_outbox table"
+
+# Frozen at version 3 (see m0001_initial)
+_metadata = MetaData()
+
+email_outbox = Table(
+    "email_outbox",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("to_email", String(320), nullable=False),
+    Column("subject", String(255), nullable=False),
+    Column("html", Text, nullable=False),
+    Column("dedupe_key", String(128), unique=True, nullable=True),
+    Column("status", Enum("pending", "sent", "failed", name="email_outbox_status"), nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("next_attempt_at", DateTime(timezone=True), nullable=False),
+    Column("claim_token", String(32), nullable=True, index=True),
+    Column("last_error", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    Column("sent_at", DateTime(timezone=True), nullable=True),
+    Index("ix_email_outbox_status_next", "status", "next_attempt_at"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    _metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,18 @@
+"""Indexes for the per-user task listing (GET /tasks ordering and roots_only)."""
+
+from __future__ import annotations
+
+from app.db.migrations import IndexSpec
+from sqlalchemy import Connection
+
+VERSION = 4
+DESCRIPTION = "tasks (user_id, created_at) and (user_id, parent_id) indexes"
+
+INDEXES = (
+    IndexSpec("ix_tasks_user_created", "tasks", ("user_id", "created_at")),
+    IndexSpec("ix_tasks_user_parent", "tasks", ("user_id", "parent_id")),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    pass  # index-only migration
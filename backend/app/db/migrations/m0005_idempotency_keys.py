@@ -0,0 +1,43 @@
+"""Stored first responses for requests sent with an Idempotency-Key header."""
+
+from __future__ import annotations
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    UniqueConstraint,
+    func,
+)
+
+VERSION = 5
+DESCRIPTION = "idempotency_keys table"
+
+# Frozen at version 5 (see m0001_initial). `users` is only declared for the foreign key; it is not created here
+_metadata = MetaData()
+Table("users", _metadata, Column("id", Integer, primary_key=True))
+
+idempotency_keys = Table(
+    "idempotency_keys",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("key", String(255), nullable=False),
+    Column("request_hash", String(64), nullable=False),
+    Column("status_code", Integer, nullable=True),
+    Column("body", LargeBinary, nullable=True),
+    Column("locked_until", DateTime(timezone=True), nullable=True),
+    Column("created_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
+    UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    _metadata.create_all(conn, tables=[idempotency_keys], checkfirst=True)
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import bisect
+import time
+from typing import Any
+
+from app.core.config import settings
+from sqlalchemy import event, exc
+from sqlalchemy.engine import URL
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# ---------------------------- #
+# Pool profiles
+# ---------------------------- #
+# Explicit TSKZ_DB_* settings override the selected profile value by value.
+POOL_PROFILES: dict[str, dict[str, Any]] = {
+    # Local SQLite: a handful of connections, no pre-ping (a file can't go away under us)
+    "sqlite-dev": dict(pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=-1, pool_pre_ping=False),
+    # One app instance against one Postgres: recycle instead of pinging on every checkout
+    "postgres-single": dict(
+        pool_size=10, max_overflow=5, pool_timeout=10, pool_recycle=1800, pool_pre_ping=False, statement_cache_size=100
+    ),
+    # Many workers: bigger pools, fail fast when exhausted, larger asyncpg statement cache
+    "postgres-high": dict(
+        pool_size=20, max_overflow=20, pool_timeout=5, pool_recycle=900, pool_pre_ping=False, statement_cache_size=500
+    ),
+}
+
+_OVERRIDES = {
+    "pool_size": "DB_POOL_SIZE",
+    "max_overflow": "DB_MAX_OVERFLOW",
+    "pool_timeout": "DB_POOL_TIMEOUT",
+    "pool_recycle": "DB_POOL_RECYCLE",
+    "pool_pre_ping": "DB_POOL_PRE_PING",
+    "statement_cache_size": "DB_STATEMENT_CACHE_SIZE",
+}
+
+
+def resolve_pool_profile(url: URL) -> str:
+    if settings.DB_POOL_PROFILE != "auto":
+        return settings.DB_POOL_PROFILE
+    return "sqlite-dev" if url.get_backend_name() == "sqlite" else "postgres-single"
+
+
+def is_memory_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+# ---------------------------- #
+# Pool telemetry
+# ---------------------------- #
+# Checkout wait buckets (seconds); the last bucket is +Inf
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_sum = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def observe_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_sum += seconds
+        self.wait_buckets[bisect.bisect_left(WAIT_BUCKETS, seconds)] += 1
+
+    def histogram(self) -> dict[str, int]:
+        """Cumulative counts keyed by upper bound, Prometheus style."""
+        out, running = {}, 0
+        for bound, n in zip([*map(str, WAIT_BUCKETS), "+Inf"], self.wait_buckets):
+            running += n
+            out[bound] = running
+        return out
+
+
+def instrumented_pool_class(stats: PoolStats) -> type[AsyncAdaptedQueuePool]:
+    """
+    AsyncAdaptedQueuePool that times every checkout (waiting for a free connection, or opening a new one).
+    Stats live on the class so they survive `engine.dispose()` recreating the pool.
+    """
+
+    class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+        pool_stats = stats
+
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                self.pool_stats.timeouts += 1
+                raise
+            finally:
+                self.pool_stats.observe_wait(time.perf_counter() - started)
+
+    return InstrumentedAsyncQueuePool
+
+
+class CompiledCacheStats:
+    """
+    Per-execution outcome of SQLAlchemy's compiled statement cache. A miss means the statement was
+    compiled to SQL again; steady traffic should be almost all hits.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+
+    def attach(self, engine) -> None:
+        event.listen(engine.sync_engine, "after_cursor_execute", self._observe)
+
+    def _observe(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is None:
+            return
+        if context.cache_hit is CACHE_HIT:
+            self.hits += 1
+        elif context.cache_hit is CACHE_MISS:
+            self.misses += 1
+        else:
+            self.uncached += 1  # DDL, PRAGMAs, raw driver SQL
+
+
+def engine_options(url: URL, stats: PoolStats) -> dict[str, Any]:
+    """Keyword arguments for `create_async_engine` from the pool profile and explicit overrides."""
+    if is_memory_sqlite(url):
+        # In-memory SQLite uses a static/singleton pool; sizing options don't apply
+        return {}
+
+    opts = dict(POOL_PROFILES[resolve_pool_profile(url)])
+    for key, setting in _OVERRIDES.items():
+        value = getattr(settings, setting)
+        if value is not None:
+            opts[key] = value
+
+    statement_cache_size = opts.pop("statement_cache_size", None)
+    if url.get_backend_name() == "postgresql" and url.get_driver_name() == "asyncpg":
+        if statement_cache_size is not None:
+            # SQLAlchemy's per-connection prepared statement cache and asyncpg's own statement cache
+            opts["connect_args"] = {
+                "prepared_statement_cache_size": statement_cache_size,
+                "statement_cache_size": statement_cache_size,
+            }
+
+    opts["poolclass"] = instrumented_pool_class(stats)
+    return opts
+
+
+def pool_status(
+    engine, stats: PoolStats, profile: str, cache_stats: CompiledCacheStats | None = None
+) -> dict[str, Any]:
+    pool = engine.pool
+    snapshot: dict[str, Any] = {"profile": profile, "pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        snapshot.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    snapshot.update(
+        checkouts=stats.checkouts,
+        timeouts=stats.timeouts,
+        wait_seconds_sum=round(stats.wait_seconds_sum, 6),
+        wait_seconds_histogram=stats.histogram(),
+    )
+    if cache_stats is not None:
+        compiled_cache = getattr(engine.sync_engine, "_compiled_cache", None)
+        snapshot["compiled_cache"] = {
+            "size": len(compiled_cache) if compiled_cache is not None else 0,
+            "hits": cache_stats.hits,
+            "misses": cache_stats.misses,
+            "uncached": cache_stats.uncached,
+        }
+    return snapshot
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.db.session import async_session, replica_session
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import ORMExecuteState, Session
+
+# Keys kept in `Session.info` by the write tracking below
+USER_KEY = "routing_user_id"
+WROTE_KEY = "routing_wrote"
+# Set by `get_read_db` on sessions opened on the replica
+REPLICA_KEY = "routing_replica"
+
+
+class ReadRouter:
+    """
+    Picks the session factory for read-only requests: the replica when one is configured, except
+    for users who wrote within the last `sticky_seconds` (read-your-writes while the replica catches
+    up). Stickiness is tracked in-process, so with several workers it only covers the worker that
+    handled the write; keep the window a bit longer than typical replication lag.
+    """
+
+    def __init__(
+        self,
+        primary: async_sessionmaker,
+        replica: Optional[async_sessionmaker] = None,
+        sticky_seconds: float = 5.0,
+        max_tracked: int = 100_000,
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.sticky_seconds = sticky_seconds
+        self.max_tracked = max_tracked
+        self._sticky_until: dict[int, float] = {}
+
+    def mark_write(self, user_id: int, now: Optional[float] = None) -> None:
+        if self.replica is None or self.sticky_seconds <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        if len(self._sticky_until) >= self.max_tracked:
+            self._sticky_until = {uid: t for uid, t in self._sticky_until.items() if t > now}
+        self._sticky_until[user_id] = now + self.sticky_seconds
+
+    def is_sticky(self, user_id: Optional[int], now: Optional[float] = None) -> bool:
+        if user_id is None:
+            return False
+        until = self._sticky_until.get(user_id)
+        if until is None:
+            return False
+        if until <= (time.monotonic() if now is None else now):
+            del self._sticky_until[user_id]
+            return False
+        return True
+
+    def session_for(self, user_id: Optional[int]) -> async_sessionmaker:
+        if self.replica is None or self.is_sticky(user_id):
+            return self.primary
+        return self.replica
+
+    def reset(self) -> None:
+        self._sticky_until.clear()
+
+
+def from_replica(session) -> bool:
+    """Whether a read session was opened on the replica, whose rows may lag the primary."""
+    return session.info.get(REPLICA_KEY, False)
+
+
+read_router = ReadRouter(async_session, replica_session, settings.DB_REPLICA_STICKY_SECONDS)
+
+
+# ---------------------------- #
+# Write tracking
+# ---------------------------- #
+# Request sessions are tagged with the user id (see `get_current_user`); once such a session commits
+# an INSERT/UPDATE/DELETE the user's reads stick to the primary for the configured window.
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session: Session, _flush_context) -> None:
+    session.info[WROTE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_dml(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info[WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_sticky(session: Session) -> None:
+    if session.info.pop(WROTE_KEY, False) and session.info.get(USER_KEY) is not None:
+        read_router.mark_write(session.info[USER_KEY])
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_writes(session: Session) -> None:
+    session.info.pop(WROTE_KEY, None)
@@ -0,0 +1,287 @@
+"""
+Synthetic data seeder: users, API keys and task trees written straight to the database in bulk.
+
+    python -m app.db.seed --users 10000 --roots 20 --fanout 2 --depth 2 --keys-out keys.jsonl
+
+The same --seed (and --username-prefix) produces the same rows, apart from bcrypt salts and API
+key secrets (drawn from `secrets`, so a published seed doesn't give the keys away); dates are
+relative to --anchor (default: today, UTC). Rows get explicit ids after the current maximum, so
+children know their parent's id without RETURNING and every batch is a plain executemany. On
+Postgres the id sequences are moved past the new rows at the end.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import secrets
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import Table, func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.security import api_key_from_parts, hash_password
+from app.models.apikey import APIKey
+from app.models.task import DBTaskCategory, DBTaskPriority, DBTaskStatus, Task
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATUS_MIX = "todo=45,in_progress=20,completed=30,cancelled=5"
+_VERBS = ("Draft", "Review", "Plan", "Fix", "Call", "Book", "Refactor", "Buy", "Write", "Schedule")
+_NOUNS = ("report", "budget", "trip", "invoice", "release", "groceries", "workout", "meeting", "docs", "backlog")
+_PRIORITIES = [p.value for p in DBTaskPriority]
+_CATEGORIES = [c.value for c in DBTaskCategory]
+
+
+@dataclass
+class SeedConfig:
+    users: int = 100
+    roots: int = 20  # root tasks per user
+    fanout: int = 3  # children per task
+    depth: int = 2  # levels below each root
+    tags: int = 3  # tags per task
+    tag_vocabulary: int = 200
+    api_keys: int = 1  # per user
+    status_mix: dict[str, float] = field(default_factory=lambda: parse_status_mix(DEFAULT_STATUS_MIX))
+    due_ratio: float = 0.6  # fraction of tasks with a due date
+    due_days: int = 60  # due dates fall within +/- this many days of the anchor
+    history_days: int = 365  # created_at spread over this many days before the anchor
+    password: str = "password"
+    username_prefix: str = "seed"
+    anchor: Optional[datetime] = None
+    seed: int = 42
+    batch_size: int = 5000
+
+    @property
+    def tasks_per_user(self) -> int:
+        return self.roots * sum(self.fanout**level for level in range(self.depth + 1))
+
+
+@dataclass
+class SeededUser:
+    id: int
+    username: str
+    api_keys: list[str] = field(default_factory=list)  # display keys, only recoverable here
+    root_ids: list[int] = field(default_factory=list)
+
+
+@dataclass
+class SeedResult:
+    users: list[SeededUser]
+    tasks: int
+    seconds: float
+
+
+def parse_status_mix(spec: str) -> dict[str, float]:
+    """Parse "todo=45,completed=30,..." into relative weights per task status."""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DBTaskStatus.__members__:
+            raise ValueError(f"Unknown task status {name!r} in {spec!r}")
+        mix[name] = float(weight)
+    return mix
+
+
+# ---------------------------- #
+# Row generators
+# ---------------------------- #
+class _Generator:
+    def __init__(self, config: SeedConfig):
+        self.config = config
+        self.rng = random.Random(f"{config.seed}:{config.username_prefix}")
+        self.anchor = config.anchor or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.vocabulary = [f"tag-{i}" for i in range(max(config.tag_vocabulary, config.tags))]
+        self.statuses = list(config.status_mix)
+        self.weights = list(itertools.accumulate(config.status_mix.values()))
+
+    def user_rows(self, first_id: int, hashed_password: str) -> Iterator[dict]:
+        for i in range(self.config.users):
+            username = f"{self.config.username_prefix}{i}"
+            yield {
+                "id": first_id + i,
+                "username": username,
+                "email": f"{username}@example.com",
+                "display_name": f"Seed user {i}",
+                "hashed_password": hashed_password,
+                "email_verified": True,
+            }
+
+    def api_key(self) -> tuple[str, str, str]:
+        prefix = f"{self.rng.getrandbits(24):06x}"
+        return api_key_from_parts(prefix, secrets.token_urlsafe(32))
+
+    def task_rows(self, user: SeededUser, ids: Iterator[int]) -> Iterator[dict]:
+        """Depth-first, so every parent row comes before its children."""
+        cfg = self.config
+        for _ in range(cfg.roots):
+            stack: list[tuple[Optional[int], int]] = [(None, 0)]
+            while stack:
+                parent_id, level = stack.pop()
+                task_id = next(ids)
+                if parent_id is None:
+                    user.root_ids.append(task_id)
+                yield self._task(task_id, user.id, parent_id)
+                if level < cfg.depth:
+                    stack.extend([(task_id, level + 1)] * cfg.fanout)
+
+    def _task(self, task_id: int, user_id: int, parent_id: Optional[int]) -> dict:
+        cfg, rng = self.config, self.rng
+        status = rng.choices(self.statuses, cum_weights=self.weights)[0]
+        created = self.anchor - timedelta(seconds=rng.randrange(cfg.history_days * 86400))
+        due = None
+        if rng.random() < cfg.due_ratio:
+            due = self.anchor + timedelta(days=rng.uniform(-cfg.due_days, cfg.due_days))
+        return {
+            "id": task_id,
+            "user_id": user_id,
+            "parent_id": parent_id,
+            "title": f"{rng.choice(_VERBS)} {rng.choice(_NOUNS)} #{task_id}",
+            "description": None if rng.random() < 0.5 else "Synthetic task generated by app.db.seed",
+            "status": status,
+            "priority": rng.choice(_PRIORITIES),
+            "category": rng.choice(_CATEGORIES),
+            "tags": rng.sample(self.vocabulary, cfg.tags),
+            "due_date": due,
+            "completed_date": created + timedelta(days=rng.uniform(0, 30)) if status == "completed" else None,
+            "estimated_hours": round(rng.uniform(0.5, 16), 1),
+            "created_at": created,
+            "updated_at": created,
+        }
+
+
+# ---------------------------- #
+# Bulk insert
+# ---------------------------- #
+async def _next_id(engine: AsyncEngine, table: Table) -> int:
+    async with engine.connect() as conn:
+        return int((await conn.execute(select(func.coalesce(func.max(table.c.id), 0)))).scalar_one()) + 1
+
+
+async def _insert(engine: AsyncEngine, table: Table, rows: Iterable[dict], batch_size: int) -> int:
+    """executemany in batches of `batch_size`, one transaction per batch."""
+    total, report_at = 0, 100_000
+    for batch in itertools.batched(rows, batch_size):
+        async with engine.begin() as conn:
+            await conn.execute(table.insert(), list(batch))
+        total += len(batch)
+        if total >= report_at:
+            logger.info("%s: %d rows", table.name, total)
+            report_at += 100_000
+    return total
+
+
+async def _sync_sequences(engine: AsyncEngine, tables: Iterable[Table]) -> None:
+    if engine.dialect.name != "postgresql":
+        return
+    async with engine.begin() as conn:
+        for table in tables:
+            await conn.execute(
+                text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT MAX(id) FROM {table.name}))")
+            )
+
+
+async def seed(engine: AsyncEngine, config: SeedConfig) -> SeedResult:
+    """Insert `config.users` users with API keys and task trees; the schema must already exist."""
+    started = time.perf_counter()
+    gen = _Generator(config)
+    users_t, keys_t, tasks_t = User.__table__, APIKey.__table__, Task.__table__
+
+    first_user = await _next_id(engine, users_t)
+    user_rows = list(gen.user_rows(first_user, hash_password(config.password)))  # one bcrypt hash for everyone
+    await _insert(engine, users_t, user_rows, config.batch_size)
+    users = [SeededUser(id=row["id"], username=row["username"]) for row in user_rows]
+
+    key_rows = []
+    for user in users:
+        for _ in range(config.api_keys):
+            display_key, prefix, secret_hash = gen.api_key()
+            user.api_keys.append(display_key)
+            key_rows.append({"user_id": user.id, "name": "seed", "prefix": prefix, "secret_hash": secret_hash})
+    await _insert(engine, keys_t, key_rows, config.batch_size)
+
+    ids = itertools.count(await _next_id(engine, tasks_t))
+    tasks = await _insert(
+        engine, tasks_t, itertools.chain.from_iterable(gen.task_rows(u, ids) for u in users), config.batch_size
+    )
+    await _sync_sequences(engine, (users_t, tasks_t))
+    return SeedResult(users=users, tasks=tasks, seconds=time.perf_counter() - started)
+
+
+# ---------------------------- #
+# CLI
+# ---------------------------- #
+async def main() -> int:
+    from app.db.migrate import migrate
+    from app.db.session import engine
+
+    defaults = SeedConfig()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--roots", type=int, default=defaults.roots, help="root tasks per user")
+    parser.add_argument("--fanout", type=int, default=defaults.fanout, help="children per task")
+    parser.add_argument("--depth", type=int, default=defaults.depth, help="levels below each root")
+    parser.add_argument("--tags", type=int, default=defaults.tags, help="tags per task")
+    parser.add_argument("--tag-vocabulary", type=int, default=defaults.tag_vocabulary)
+    parser.add_argument("--api-keys", type=int, default=defaults.api_keys, help="API keys per user")
+    parser.add_argument("--status-mix", default=DEFAULT_STATUS_MIX, help="relative weights per status")
+    parser.add_argument("--due-ratio", type=float, default=defaults.due_ratio)
+    parser.add_argument("--due-days", type=int, default=defaults.due_days)
+    parser.add_argument("--password", default=defaults.password, help="password of every seeded user")
+    parser.add_argument("--username-prefix", default=defaults.username_prefix)
+    parser.add_argument("--anchor", type=datetime.fromisoformat, help="date the generated dates are relative to")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--batch-size", type=int, default=defaults.batch_size)
+    parser.add_argument("--keys-out", help="write username/user_id/api_key JSON lines here")
+    parser.add_argument("--no-migrate", action="store_true", help="don't apply pending migrations first")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    logger.setLevel(logging.INFO)
+
+    config = SeedConfig(
+        users=args.users,
+        roots=args.roots,
+        fanout=args.fanout,
+        depth=args.depth,
+        tags=args.tags,
+        tag_vocabulary=args.tag_vocabulary,
+        api_keys=args.api_keys,
+        status_mix=parse_status_mix(args.status_mix),
+        due_ratio=args.due_ratio,
+        due_days=args.due_days,
+        password=args.password,
+        username_prefix=args.username_prefix,
+        anchor=args.anchor,
+        seed=args.seed,
+        batch_size=args.batch_size,
+    )
+    print(
+        f"Seeding {config.users} users x {config.tasks_per_user} tasks = {config.users * config.tasks_per_user} tasks"
+    )
+    try:
+        if not args.no_migrate:
+            await migrate(engine)
+        result = await seed(engine, config)
+    finally:
+        await engine.dispose()
+
+    if args.keys_out:
+        with open(args.keys_out, "w", encoding="utf-8") as fh:
+            for user in result.users:
+                for key in user.api_keys:
+                    fh.write(json.dumps({"username": user.username, "user_id": user.id, "api_key": key}) + "\n")
+    print(f"Inserted {len(result.users)} users and {result.tasks} tasks in {result.seconds:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -1,39 +1,67 @@
 from __future__ import annotations
 
+from typing import Optional
+
 from app.core.config import settings
+from app.core.instrumentation import instrument_engine
+from app.db.pool import CompiledCacheStats, PoolStats, engine_options, is_memory_sqlite, resolve_pool_profile
+from app.db.sqlite import sqlite_pragmas
 from sqlalchemy import event
-from sqlalchemy.engine import make_url
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 
 url = make_url(settings.DATABASE_URL)
 IS_SQLITE = url.get_backend_name() == "sqlite"  # robust check
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-)
 
-# Enable SQLite FKs (and optionally WAL) on every new pooled connection
-if IS_SQLITE:
+def _enable_sqlite_pragmas(engine: AsyncEngine, url: URL) -> None:
+    """Enable SQLite FKs, WAL and the tuned profile on every new pooled connection; see app/db/sqlite.py"""
+    pragmas = sqlite_pragmas(file_based=not is_memory_sqlite(url), tuned=settings.SQLITE_TUNED)
 
     @event.listens_for(engine.sync_engine, "connect")
-    def _enable_sqlite_pragmas(dbapi_connection, _):
+    def _on_connect(dbapi_connection, _):
         cursor = dbapi_connection.cursor()
-        # Always enable FK cascades
-        cursor.execute("PRAGMA foreign_keys=ON")
-        # If file-based (not :memory:), WAL improves concurrency
-        if url.database and url.database not in (":memory:", ""):
-            cursor.execute("PRAGMA journal_mode=WAL")
+        for pragma in pragmas:
+            cursor.execute(pragma)
         cursor.close()
 
 
-async_session = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autoflush=False,
-    autocommit=False,
+def _session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(
+        bind=engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False,
+        autocommit=False,
+    )
+
+
+# Pool sizing comes from TSKZ_DB_POOL_PROFILE (+ per-value overrides); see app/db/pool.py
+pool_profile = resolve_pool_profile(url)
+pool_stats = PoolStats()
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    **engine_options(url, pool_stats),
 )
+if IS_SQLITE:
+    _enable_sqlite_pragmas(engine, url)
+compiled_cache_stats = CompiledCacheStats()
+compiled_cache_stats.attach(engine)
+instrument_engine(engine)
+
+async_session = _session_factory(engine)
+
+# Optional read replica for read-only routes (see app/db/routing.py); same pool profile as the primary
+replica_engine: Optional[AsyncEngine] = None
+replica_session: Optional[async_sessionmaker] = None
+replica_pool_stats = PoolStats()
+if settings.DATABASE_REPLICA_URL:
+    replica_url = make_url(settings.DATABASE_REPLICA_URL)
+    replica_engine = create_async_engine(replica_url, **engine_options(replica_url, replica_pool_stats))
+    if replica_url.get_backend_name() == "sqlite":
+        _enable_sqlite_pragmas(replica_engine, replica_url)
+    instrument_engine(replica_engine)
+    replica_session = _session_factory(replica_engine)
 
 Base = declarative_base(name="BaseModel")
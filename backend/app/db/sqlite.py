@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+import weakref
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, ParamSpec, TypeVar
+
+from app.core.config import settings
+
+# ---------------------------- #
+# Connection pragmas
+# ---------------------------- #
+
+
+def sqlite_pragmas(file_based: bool, tuned: bool) -> list[str]:
+    """PRAGMAs run on every new SQLite connection."""
+    pragmas = ["PRAGMA foreign_keys=ON"]  # always enable FK cascades
+    if file_based:
+        # WAL lets readers run while a writer commits
+        pragmas.append("PRAGMA journal_mode=WAL")
+    if tuned:
+        pragmas += [
+            f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",  # wait for the lock instead of failing
+            f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",  # negative = KiB, per connection
+            "PRAGMA temp_store=MEMORY",
+        ]
+        if file_based:
+            pragmas += [
+                # Durable across app crashes under WAL; only an OS crash can lose the last commits
+                "PRAGMA synchronous=NORMAL",
+                f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+            ]
+    return pragmas
+
+
+# ---------------------------- #
+# Single-writer coordinator
+# ---------------------------- #
+P = ParamSpec("P")
+R = TypeVar("R")
+
+_holding: ContextVar[bool] = ContextVar("sqlite_writer_holding", default=False)
+
+
+class SingleWriter:
+    """
+    SQLite allows one writer at a time. Rather than letting concurrent write transactions each grab a
+    pooled connection and spin in the busy handler (or fail with "database is locked"), writers queue
+    here in FIFO order and run one at a time; reads never touch the queue and keep running
+    concurrently on the rest of the pool. Re-entrant within a task, so nested CRUD calls are safe.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._locks: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock] = weakref.WeakKeyDictionary()
+        self.waiting = 0
+        self.acquired = 0
+        self.wait_seconds_sum = 0.0
+
+    def _lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        return lock
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if not self.enabled or _holding.get():
+            yield
+            return
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._lock().acquire()
+        finally:
+            self.waiting -= 1
+        self.acquired += 1
+        self.wait_seconds_sum += time.perf_counter() - started
+        token = _holding.set(True)
+        try:
+            yield
+        finally:
+            _holding.reset(token)
+            self._lock().release()
+
+    def serialized(self, fn: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        """Decorator for CRUD functions that write and commit."""
+
+        @functools.wraps(fn)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            async with self.slot():
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+
+single_writer = SingleWriter(enabled=settings.SQLITE_SINGLE_WRITER and settings.DATABASE_URL.startswith("sqlite"))
+serialized_write = single_writer.serialized
@@ -4,17 +4,47 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 
-from app.api.v1 import login, tasks, users, apikeys, auth_email
+from app.api.v1 import login, tasks, users, apikeys, auth_email, internal
+from app.core.admission import AdmissionMiddleware
 from app.core import metadata
+from app.core.background import BackgroundJobs
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.db.session import Base, engine
+from app.core.instrumentation import RequestTimingMiddleware
+from app.core.metrics import registry
+from app.core.openapi import use_prebuilt_openapi
+from app.core.profiling import ProfilingMiddleware
+from app.core.ratelimit import api_key_throttle
+from app.db.migrate import check_schema, migrate
+from app.db.session import engine
+from app.services.maintenance import maintenance
+from app.services.outbox import email_outbox
+from app.services.task_events import task_events
+from app.services.usage import api_key_usage
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    yield
+    # Schema changes go through `python -m app.db.migrate`; startup only checks the version
+    if settings.DB_MIGRATE_ON_STARTUP:
+        await migrate(engine)
+    else:
+        await check_schema(engine)
+    async with BackgroundJobs() as jobs:
+        jobs.every(settings.API_KEY_QUOTA_FLUSH_SECONDS, api_key_throttle.flush, name="api_key_quota_flush")
+        jobs.every(settings.API_KEY_USAGE_FLUSH_SECONDS, api_key_usage.flush, name="api_key_usage_flush")
+        if settings.EMAIL_OUTBOX_ENABLED:
+            jobs.start(email_outbox.run_forever(), name="email_outbox")
+            jobs.on_shutdown(email_outbox.close, name="email_outbox_close")
+        if settings.METRICS_MULTIPROC_DIR:
+            jobs.every(settings.METRICS_FLUSH_SECONDS, registry.flush, name="metrics_flush")
+        if settings.TASK_EVENTS_ENABLED:
+            jobs.start(task_events.broker.run(), name="task_events_broker")
+        if settings.MAINTENANCE_ENABLED:
+            jobs.every(
+                settings.MAINTENANCE_INTERVAL_SECONDS, maintenance.run_once, name="maintenance", run_on_shutdown=False
+            )
+        yield
 
 
 app = FastAPI(
@@ -29,6 +59,9 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Innermost, so shed 503s still get CORS headers and show up in timing and metrics; see app/core/admission.py
+app.add_middleware(AdmissionMiddleware)
+
 # Handle CORS protection
 origins = settings.BACKEND_CORS_ORIGINS
 
@@ -38,13 +71,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "Retry-After", "X-Profile-Id"],
 )
+# Inside timing and profiling, so compression time is counted; see app/core/compression.py
+app.add_middleware(CompressionMiddleware)
+# Inside the timing middleware, so profiles can split out DB time; see app/core/profiling.py
+app.add_middleware(ProfilingMiddleware)
+# Outermost, so Server-Timing covers the whole request; see app/core/instrumentation.py
+app.add_middleware(RequestTimingMiddleware)
 
 app.include_router(users.router)
 app.include_router(login.router)
 app.include_router(apikeys.router)
 app.include_router(tasks.router)
 app.include_router(auth_email.router)
+app.include_router(internal.router)
+
+if settings.OPENAPI_SCHEMA_PATH:
+    use_prebuilt_openapi(app, settings.OPENAPI_SCHEMA_PATH)
 
 
 @app.get("/", include_in_schema=False)
@@ -2,5 +2,7 @@ from .user import User
 from .task import Task
 from .apikey import APIKey
 from .email_token import EmailToken
+from .email_outbox import EmailOutbox
+from .idempotency_key import IdempotencyKey
 
-__all__ = ["User", "Task", "APIKey", "EmailToken"]
+__all__ = ["User", "Task", "APIKey", "EmailToken", "EmailOutbox", "IdempotencyKey"]
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from app.db.session import Base
+from sqlalchemy import DateTime, Enum, Index, Integer, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    to_email: Mapped[str] = mapped_column(String(320), nullable=False)
+    subject: Mapped[str] = mapped_column(String(255), nullable=False)
+    html: Mapped[str] = mapped_column(Text, nullable=False)  # blanked once sent or given up on
+    # e.g. "verify:<user_id>"; while a message is pending, re-enqueues with the same key replace it.
+    # Cleared once the message leaves the queue so the key can be reused.
+    dedupe_key: Mapped[Optional[str]] = mapped_column(String(128), unique=True, nullable=True)
+    status: Mapped[str] = mapped_column(
+        Enum("pending", "sent", "failed", name="email_outbox_status"), nullable=False, default="pending"
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # Set by the worker that claimed the row, so concurrent workers never send the same message twice
+    claim_token: Mapped[Optional[str]] = mapped_column(String(32), nullable=True, index=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+Index("ix_email_outbox_status_next", EmailOutbox.status, EmailOutbox.next_attempt_at)
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from app.db.session import Base
+from sqlalchemy import DateTime, ForeignKey, Integer, LargeBinary, String, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class IdempotencyKey(Base):
+    """First response to a request sent with an `Idempotency-Key` header, replayed to retries."""
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    # sha256 of method, path, query and body: a key reused for a different request is rejected
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    # NULL while the first request is still running; `locked_until` bounds how long that claim holds
+    status_code: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    body: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    locked_until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
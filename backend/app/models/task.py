@@ -116,7 +116,12 @@ class Task(Base):
         lazy="selectin",
     )
 
-    __table_args__ = (Index("ix_tasks_user_status_due", "user_id", "status", "due_date"),)
+    __table_args__ = (
+        Index("ix_tasks_user_status_due", "user_id", "status", "due_date"),
+        # GET /tasks: per-user listing ordered by created_at, and roots_only (parent_id IS NULL)
+        Index("ix_tasks_user_created", "user_id", "created_at"),
+        Index("ix_tasks_user_parent", "user_id", "parent_id"),
+    )
 
     @property
     def progress(self) -> float:
@@ -6,10 +6,22 @@ from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
+class APIKeyLimits(BaseModel):
+    rate_limit_per_sec: Optional[float] = Field(None, gt=0, description="Sustained requests per second")
+    burst: Optional[int] = Field(None, ge=1, description="Requests allowed in a burst above the sustained rate")
+    daily_quota: Optional[int] = Field(None, ge=1, description="Requests allowed per UTC day")
+
+
+class APIKeyUsage(BaseModel):
+    requests_today: int
+    remaining_today: Optional[int] = None
+
+
 class APIKeyCreate(BaseModel):
     name: str = Field(..., max_length=100)
     scopes: Optional[List[str]] = None
     expires_at: Optional[datetime] = None  # UTC naive in your project
+    limits: Optional[APIKeyLimits] = None  # server defaults apply when omitted
 
 
 class APIKeyOut(BaseModel):
@@ -17,6 +29,10 @@ class APIKeyOut(BaseModel):
     name: str
     prefix: str
     scopes: Optional[list[str]]
+    limits: Optional[APIKeyLimits] = None
+    usage: Optional[APIKeyUsage] = None  # approximate across workers (synced every few seconds)
+    request_count: int = 0
+    last_used_at: Optional[datetime] = None
     expires_at: Optional[datetime]
     revoked: bool
     created_at: datetime
@@ -0,0 +1,153 @@
+"""
+Idempotency-Key support for task creation (POST /tasks, POST /tasks/bulk).
+
+Clients on flaky networks retry writes. With an `Idempotency-Key` header, the first request under
+a key runs and its response (status and body) is stored per user for IDEMPOTENCY_TTL_SECONDS.
+Retries get those exact bytes back, with `Idempotent-Replayed: true`, without running the
+request again or touching the tasks table.
+
+- The key is claimed (a row with no response yet) before the request runs. A duplicate arriving
+  meanwhile, on any worker, waits for the response for up to IDEMPOTENCY_WAIT_SECONDS, then
+  gets 409. A claim left by a crashed worker is taken over once IDEMPOTENCY_LOCK_SECONDS pass.
+- Only successful responses are stored, in the same transaction as the request's writes: `render`
+  gets a `save` callback and calls it just before its work commits (see `before_commit` in
+  app/crud/task.py). The tasks and the stored response commit together or not at all, so a crash
+  in between can't leave created tasks behind a claim that a retry would take over and run again.
+- If the request fails, the claim is dropped, so a retry runs it again.
+- Reusing a key for a different request (method, path, query or body) gets 422.
+- The maintenance sweeper deletes expired records and keeps at most IDEMPOTENCY_MAX_ROWS.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from app.core.config import settings
+from app.crud import idempotency as crud
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Stores the response body in the current transaction
+SaveResponse = Callable[[bytes], Awaitable[None]]
+
+# Set when a request running in this process stores or drops its key, so local duplicates wake
+# up right away rather than on the next poll
+_running: dict[tuple[int, str], asyncio.Event] = {}
+
+
+async def request_fingerprint(request: Request) -> str:
+    digest = hashlib.sha256()
+    for part in (request.method, request.url.path, request.url.query):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(await request.body())
+    return digest.hexdigest()
+
+
+def _replay(status_code: int, body: bytes) -> Response:
+    headers = {"Idempotent-Replayed": "true"}
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def _lease_over(locked_until: datetime | None) -> bool:
+    if locked_until is None:
+        return True
+    if locked_until.tzinfo is None:  # SQLite hands back naive UTC
+        locked_until = locked_until.replace(tzinfo=timezone.utc)
+    return locked_until <= datetime.now(timezone.utc)
+
+
+async def run_idempotent(
+    db: AsyncSession,
+    request: Request,
+    user_id: int,
+    key: str,
+    status_code: int,
+    render: Callable[[SaveResponse], Awaitable[bytes]],
+) -> Response:
+    """
+    Respond to a request sent with an Idempotency-Key: replay the stored response, or run
+    `render` (the request's work, returning the JSON body) once and store what it returns.
+    `render` should pass the body to its `save` argument right before its work commits.
+    """
+    request_hash = await request_fingerprint(request)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        record = await crud.get_idempotency_record(db, user_id, key)
+        if record is not None:
+            if record.request_hash != request_hash:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used for a different request",
+                )
+            if record.status_code is not None:
+                return _replay(record.status_code, record.body)
+
+        if (record is None or _lease_over(record.locked_until)) and await crud.claim_idempotency_key(
+            db,
+            user_id,
+            key,
+            request_hash,
+            lease=timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+            ttl=timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+        ):
+            return await _run(db, user_id, key, status_code, render)
+
+        # The first request is still running, here or on another worker
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still in progress",
+                headers={"Retry-After": "1"},
+            )
+        done, wait = _running.get((user_id, key)), min(remaining, settings.IDEMPOTENCY_POLL_SECONDS)
+        if done is None:
+            await asyncio.sleep(wait)
+        else:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(done.wait(), wait)
+
+
+async def _run(
+    db: AsyncSession,
+    user_id: int,
+    key: str,
+    status_code: int,
+    render: Callable[[SaveResponse], Awaitable[bytes]],
+) -> Response:
+    done = _running[(user_id, key)] = asyncio.Event()
+    saved = False
+
+    async def save(body: bytes) -> None:
+        nonlocal saved
+        await crud.stage_idempotent_response(db, user_id, key, status_code, body)
+        saved = True
+
+    try:
+        try:
+            body = await render(save)
+        except BaseException:
+            await db.rollback()  # the failed work may have left the transaction unusable
+            await crud.release_idempotency_key(db, user_id, key)  # a no-op once the response committed
+            raise
+        if not saved:
+            # The work committed nothing to store it with (e.g. an empty bulk request). The response
+            # is already decided: a failure to store it only costs the replay, so don't turn it into a 500
+            try:
+                await crud.save_idempotent_response(db, user_id, key, status_code, body)
+            except Exception:
+                logger.exception("Storing the response for Idempotency-Key %r of user %s failed", key, user_id)
+        return Response(body, status_code=status_code, media_type="application/json")
+    finally:
+        done.set()
+        if _running.get((user_id, key)) is done:
+            del _running[(user_id, key)]
@@ -1,21 +1,121 @@
-from email.message import EmailMessage
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING
 
-import aiosmtplib
 from app.core.config import settings  # add smtp/env here
 
+if TYPE_CHECKING:
+    from email.message import EmailMessage
+
+    import aiosmtplib
+
+# aiosmtplib (and the email package) are imported on first use, not at app import: most workers
+# never send mail themselves, and cold starts shouldn't pay for it.
+
+
+def build_message(to_email: str, subject: str, html: str) -> EmailMessage:
+    from email.message import EmailMessage
 
-async def send_email(to_email: str, subject: str, html: str):
     msg = EmailMessage()
     msg["From"] = settings.EMAIL_FROM
     msg["To"] = to_email
     msg["Subject"] = subject
     msg.set_content(html, subtype="html")
+    return msg
+
+
+async def send_email(to_email: str, subject: str, html: str):
+    """One-off send on a fresh connection. Request handlers should enqueue via the outbox instead."""
+    import aiosmtplib
 
     await aiosmtplib.send(
-        msg,
+        build_message(to_email, subject, html),
         hostname=settings.SMTP_HOST,
         port=settings.SMTP_PORT,
-        start_tls=True,
-        username=settings.SMTP_USERNAME,
-        password=settings.SMTP_PASSWORD,
+        start_tls=settings.SMTP_START_TLS,
+        username=settings.SMTP_USERNAME or None,
+        password=settings.SMTP_PASSWORD or None,
+        timeout=settings.SMTP_TIMEOUT_SECONDS,
     )
+
+
+# ---------------------------- #
+# SMTP connection pool
+# ---------------------------- #
+class SMTPConnectionPool:
+    """
+    A small pool of connected, STARTTLS-upgraded and logged-in SMTP clients. Connections are reused
+    across messages; one that errors is dropped and replaced on the next acquire.
+    """
+
+    def __init__(
+        self,
+        size: int | None = None,
+        *,
+        hostname: str | None = None,
+        port: int | None = None,
+        username: str | None = None,
+        password: str | None = None,
+        start_tls: bool | None = None,
+        timeout: float | None = None,
+    ):
+        self.size = size or settings.SMTP_POOL_SIZE
+        self.hostname = hostname or settings.SMTP_HOST
+        self.port = port or settings.SMTP_PORT
+        self.username = settings.SMTP_USERNAME if username is None else username
+        self.password = settings.SMTP_PASSWORD if password is None else password
+        self.start_tls = settings.SMTP_START_TLS if start_tls is None else start_tls
+        self.timeout = timeout or settings.SMTP_TIMEOUT_SECONDS
+        self._idle: asyncio.LifoQueue[tuple[aiosmtplib.SMTP, float]] = asyncio.LifoQueue()
+        self._slots = asyncio.Semaphore(self.size)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        import aiosmtplib
+
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            start_tls=self.start_tls,
+            username=self.username or None,
+            password=self.password or None,
+            timeout=self.timeout,
+        )
+        await client.connect()
+        return client
+
+    async def _acquire(self) -> aiosmtplib.SMTP:
+        import aiosmtplib
+
+        while not self._idle.empty():
+            client, released_at = self._idle.get_nowait()
+            if not client.is_connected:
+                continue
+            if time.monotonic() - released_at < settings.SMTP_IDLE_CHECK_SECONDS:
+                return client
+            try:
+                # Servers drop idle sessions; probe before trusting an old connection
+                await client.noop()
+                return client
+            except aiosmtplib.SMTPException:
+                client.close()
+        return await self._connect()
+
+    async def send(self, msg: EmailMessage) -> None:
+        async with self._slots:
+            client = await self._acquire()
+            try:
+                await client.send_message(msg)
+            except BaseException:
+                client.close()
+                raise
+            self._idle.put_nowait((client, time.monotonic()))
+
+    async def close(self) -> None:
+        while not self._idle.empty():
+            client, _ = self._idle.get_nowait()
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.core.config import settings
+from app.db.session import async_session
+from app.db.sqlite import single_writer
+from app.models.apikey import APIKey
+from app.models.email_outbox import EmailOutbox
+from app.models.email_token import EmailToken
+from app.models.idempotency_key import IdempotencyKey
+from app.models.user import User
+from sqlalchemy import ColumnElement, and_, delete, or_, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SweepStats:
+    runs: int = 0
+    rows_purged: dict[str, int] = field(default_factory=dict)  # cumulative, per table
+    last_purged: dict[str, int] = field(default_factory=dict)  # most recent run, per table
+    last_duration_seconds: float = 0.0
+    total_duration_seconds: float = 0.0
+    last_run_at: Optional[datetime] = None
+
+
+class MaintenanceSweeper:
+    """
+    Periodic cleanup of rows that only grow: consumed/expired email tokens, revoked/expired API keys,
+    stale user verification tokens, delivered outbox messages and idempotency records (expired, or
+    beyond IDEMPOTENCY_MAX_ROWS). Each step deletes at most
+    `chunk_size` rows per transaction so the sweep never holds the write lock for long.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker = async_session, chunk_size: Optional[int] = None):
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size or settings.MAINTENANCE_CHUNK_SIZE
+        self.stats = SweepStats()
+
+    async def _delete_in_chunks(self, model, condition: ColumnElement[bool]) -> int:
+        total = 0
+        while True:
+            async with self.session_factory() as db:
+                ids = list((await db.execute(select(model.id).where(condition).limit(self.chunk_size))).scalars())
+                if not ids:
+                    break
+                async with single_writer.slot():
+                    await db.execute(
+                        delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+            total += len(ids)
+            if len(ids) < self.chunk_size:
+                break
+            await asyncio.sleep(0)  # let request handlers in between chunks
+        return total
+
+    async def _clear_user_verification_tokens(self, now: datetime) -> int:
+        condition = and_(User.verification_token.is_not(None), User.verification_token_expires < now)
+        total = 0
+        while True:
+            async with self.session_factory() as db:
+                ids = list((await db.execute(select(User.id).where(condition).limit(self.chunk_size))).scalars())
+                if not ids:
+                    break
+                async with single_writer.slot():
+                    await db.execute(
+                        update(User)
+                        .where(User.id.in_(ids))
+                        .values(verification_token=None, verification_token_expires=None)
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+            total += len(ids)
+            if len(ids) < self.chunk_size:
+                break
+            await asyncio.sleep(0)
+        return total
+
+    async def _purge_idempotency_keys(self, now: datetime) -> int:
+        expired = await self._delete_in_chunks(IdempotencyKey, IdempotencyKey.expires_at <= now)
+        # The cap only counts completed records; a pending claim belongs to a request still running
+        completed = IdempotencyKey.status_code.is_not(None)
+        async with self.session_factory() as db:
+            newest_dropped = (
+                await db.execute(
+                    select(IdempotencyKey.id)
+                    .where(completed)
+                    .order_by(IdempotencyKey.id.desc())
+                    .offset(settings.IDEMPOTENCY_MAX_ROWS)
+                    .limit(1)
+                )
+            ).scalar()
+        if newest_dropped is None:
+            return expired
+        return expired + await self._delete_in_chunks(
+            IdempotencyKey, and_(completed, IdempotencyKey.id <= newest_dropped)
+        )
+
+    async def run_once(self, now: Optional[datetime] = None) -> dict[str, int]:
+        started = time.perf_counter()
+        now = now or datetime.now(timezone.utc)
+        naive_now = now.replace(tzinfo=None)  # these tables use naive UTC columns
+
+        token_cutoff = naive_now - timedelta(days=settings.RETENTION_EMAIL_TOKENS_DAYS)
+        key_cutoff = naive_now - timedelta(days=settings.RETENTION_API_KEYS_DAYS)
+        outbox_cutoff = now - timedelta(days=settings.RETENTION_EMAIL_OUTBOX_DAYS)
+
+        purged = {
+            "email_tokens": await self._delete_in_chunks(
+                EmailToken, or_(EmailToken.consumed_at < token_cutoff, EmailToken.expires_at < token_cutoff)
+            ),
+            "api_keys": await self._delete_in_chunks(
+                APIKey,
+                or_(
+                    and_(APIKey.revoked.is_(True), APIKey.revoked_at < key_cutoff),
+                    APIKey.expires_at < key_cutoff,
+                ),
+            ),
+            "email_outbox": await self._delete_in_chunks(
+                EmailOutbox, and_(EmailOutbox.status.in_(("sent", "failed")), EmailOutbox.created_at < outbox_cutoff)
+            ),
+            "users.verification_token": await self._clear_user_verification_tokens(naive_now),
+            "idempotency_keys": await self._purge_idempotency_keys(now),
+        }
+
+        elapsed = time.perf_counter() - started
+        st = self.stats
+        st.runs += 1
+        st.last_purged = purged
+        for name, n in purged.items():
+            st.rows_purged[name] = st.rows_purged.get(name, 0) + n
+        st.last_duration_seconds = elapsed
+        st.total_duration_seconds += elapsed
+        st.last_run_at = now
+        logger.info("Maintenance sweep purged %s in %.3fs", purged, elapsed)
+        return purged
+
+
+maintenance = MaintenanceSweeper()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.crud.email_outbox import claim_due_emails, mark_email_failed, mark_emails_sent
+from app.db.session import async_session
+from app.models.email_outbox import EmailOutbox
+from app.services.mailer import SMTPConnectionPool, build_message
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    """Exponential backoff: base, 2x base, 4x base, ... capped at EMAIL_OUTBOX_BACKOFF_MAX_SECONDS."""
+    seconds = settings.EMAIL_OUTBOX_BACKOFF_SECONDS * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(seconds, settings.EMAIL_OUTBOX_BACKOFF_MAX_SECONDS))
+
+
+class EmailOutboxSender:
+    """
+    Background sender for the `email_outbox` table. Claims due messages in batches, sends them
+    concurrently over the pooled SMTP connections, and schedules failures for retry with backoff.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = async_session,
+        pool: SMTPConnectionPool | None = None,
+    ):
+        self.session_factory = session_factory
+        self.pool = pool
+        self._wake = asyncio.Event()
+
+    def notify(self) -> None:
+        """Wake the sender right away (called after enqueueing) instead of waiting for the next poll."""
+        self._wake.set()
+
+    def _pool(self) -> SMTPConnectionPool:
+        if self.pool is None:
+            self.pool = SMTPConnectionPool()
+        return self.pool
+
+    async def _send_one(self, msg: EmailOutbox) -> str | None:
+        try:
+            await self._pool().send(build_message(msg.to_email, msg.subject, msg.html))
+            return None
+        except Exception as e:  # any SMTP/network error is retryable
+            return f"{type(e).__name__}: {e}"
+
+    async def run_once(self) -> int:
+        """Send one batch; returns the number of messages claimed."""
+        lease = timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+        async with self.session_factory() as db:
+            batch = await claim_due_emails(db, settings.EMAIL_OUTBOX_BATCH_SIZE, lease)
+            if not batch:
+                return 0
+
+            errors = await asyncio.gather(*(self._send_one(m) for m in batch))
+
+            await mark_emails_sent(db, [m.id for m, err in zip(batch, errors) if err is None])
+            now = datetime.now(timezone.utc)
+            for m, err in zip(batch, errors):
+                if err is None:
+                    continue
+                attempts = m.attempts + 1
+                give_up = attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+                logger.warning("Email %s to %s failed (attempt %s): %s", m.id, m.to_email, attempts, err)
+                await mark_email_failed(
+                    db, m.id, err, attempts=attempts, retry_at=None if give_up else now + backoff_delay(attempts)
+                )
+            return len(batch)
+
+    async def run_forever(self) -> None:
+        while True:
+            self._wake.clear()  # before the pass: a notify() that arrives during it wakes the next wait
+            try:
+                claimed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email outbox pass failed")
+                claimed = 0
+            if claimed >= settings.EMAIL_OUTBOX_BATCH_SIZE:
+                continue  # more may be waiting
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.EMAIL_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+
+
+email_outbox = EmailOutboxSender()
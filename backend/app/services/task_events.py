@@ -0,0 +1,352 @@
+"""
+Task change feed behind GET /tasks/stream (Server-Sent Events).
+
+The CRUD layer (app/crud/task.py) publishes events after each commit: `task.created`,
+`task.updated`, `task.status` (data: the task, as in GET /tasks) and `task.deleted` (data: the
+task id and the ids of its deleted subtree). A broker assigns event ids and hands every event to
+the hub of each worker, which pushes it to that user's open streams:
+
+    local   in-process only: a single worker, and tests
+    sqlite  a SQLite file shared by the workers on one host (TASK_EVENTS_SQLITE_PATH); each worker
+            polls it every TASK_EVENTS_POLL_SECONDS
+    auto    (default) sqlite when WEB_CONCURRENCY is above 1, local otherwise
+
+Anything else (Redis pub/sub, Postgres LISTEN/NOTIFY, ...) implements `EventBroker` and is
+installed with `task_events.use_broker(...)`.
+
+Publishing never fails the write that triggered it: the write is already committed, so a broker
+or serialization error is logged and counted (`EventStats.failed`), and streams miss those events.
+
+Resume: the hub keeps each user's last TASK_EVENTS_REPLAY_SIZE events, for the
+TASK_EVENTS_REPLAY_USERS most recently active users and within TASK_EVENTS_REPLAY_MAX_BYTES of
+frames overall (least recently active users are dropped first). A client reconnecting with
+`Last-Event-ID` gets the events it missed; if those are no longer buffered, or were published
+before this worker started, it gets a `reset` event instead and should refetch GET /tasks.
+
+Backpressure: each stream buffers at most TASK_EVENTS_QUEUE_SIZE events. When a client falls
+further behind, its stream is closed after sending what was buffered, and the client resumes from
+the replay buffer when it reconnects (EventSource reconnects on its own).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Iterable, Optional, Protocol
+
+from app.core.config import settings, web_concurrency
+from app.schemas.task import TaskOutShallow
+
+logger = logging.getLogger(__name__)
+
+# (event id, user id, event name, JSON data)
+Deliver = Callable[[int, int, str, str], None]
+
+
+# ---------------------------- #
+# Brokers
+# ---------------------------- #
+class EventBroker(Protocol):
+    def attach(self, deliver: Deliver) -> int:
+        """Hand every published event (from any worker) to `deliver`; returns the last id issued so far."""
+
+    async def publish(self, user_id: int, events: list[tuple[str, str]]) -> None:
+        """Publish (event name, JSON data) pairs for a user, in order."""
+
+    async def run(self) -> None:
+        """Long-running part, if any (started in the app lifespan)."""
+
+
+class LocalBroker:
+    """Delivers straight to this process's hub."""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+        self._last_id = 0
+
+    def _next_id(self) -> int:
+        # Microsecond timestamps: ids keep increasing across restarts, so a Last-Event-ID from before
+        # a restart is recognised as such
+        self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+        return self._last_id
+
+    def attach(self, deliver: Deliver) -> int:
+        self._deliver = deliver
+        return self._next_id()
+
+    async def publish(self, user_id: int, events: list[tuple[str, str]]) -> None:
+        for event, data in events:
+            self._deliver(self._next_id(), user_id, event, data)
+
+    async def run(self) -> None:
+        return None
+
+
+class SQLiteBroker:
+    """
+    Events appended to a SQLite file that every worker on the host polls. Row ids are the event
+    ids, so they are the same in every worker. Rows older than `retention` seconds are pruned.
+    """
+
+    _PRUNE_EVERY = 300  # polls
+
+    def __init__(self, db_path: str, poll_seconds: float, retention: float = 3600.0):
+        self.db_path = db_path
+        self.poll_seconds = poll_seconds
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._deliver: Optional[Deliver] = None
+        self._last_seen = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS task_events (id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " user_id INTEGER NOT NULL, event TEXT NOT NULL, data TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def attach(self, deliver: Deliver) -> int:
+        self._deliver = deliver
+        with self._lock:
+            self._last_seen = self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM task_events").fetchone()[0]
+        return self._last_seen
+
+    def _insert_sync(self, user_id: int, events: list[tuple[str, str]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._connect().executemany(
+                "INSERT INTO task_events (user_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+                [(user_id, event, data, now) for event, data in events],
+            )
+
+    async def publish(self, user_id: int, events: list[tuple[str, str]]) -> None:
+        await asyncio.to_thread(self._insert_sync, user_id, events)
+
+    def _fetch_sync(self, after: int, prune: bool) -> list[tuple[int, int, str, str]]:
+        with self._lock:
+            conn = self._connect()
+            if prune:
+                conn.execute("DELETE FROM task_events WHERE created_at < ?", (time.time() - self.retention,))
+            return conn.execute(
+                "SELECT id, user_id, event, data FROM task_events WHERE id > ? ORDER BY id LIMIT 1000", (after,)
+            ).fetchall()
+
+    async def run(self) -> None:
+        polls = 0
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            polls += 1
+            try:
+                rows = await asyncio.to_thread(self._fetch_sync, self._last_seen, polls % self._PRUNE_EVERY == 0)
+            except sqlite3.Error:
+                logger.exception("Polling task events failed")
+                continue
+            for event_id, user_id, event, data in rows:
+                self._last_seen = event_id
+                self._deliver(event_id, user_id, event, data)
+
+
+def resolve_task_events_broker() -> str:
+    if settings.TASK_EVENTS_BROKER != "auto":
+        return settings.TASK_EVENTS_BROKER
+    return "sqlite" if web_concurrency() > 1 else "local"
+
+
+def _build_broker() -> EventBroker:
+    if resolve_task_events_broker() == "sqlite":
+        return SQLiteBroker(settings.TASK_EVENTS_SQLITE_PATH, settings.TASK_EVENTS_POLL_SECONDS)
+    return LocalBroker()
+
+
+# ---------------------------- #
+# Hub
+# ---------------------------- #
+@dataclass
+class EventStats:
+    published: int = 0
+    resumed: int = 0  # reconnects served from the replay buffer
+    resets: int = 0  # reconnects that had to refetch
+    overflows: int = 0  # streams closed for falling behind
+    failed: int = 0  # events lost to publishing errors
+
+
+@dataclass
+class _History:
+    floor: int  # events up to this id may be missing from `events`
+    events: deque[tuple[int, bytes]] = field(default_factory=deque)
+    size: int = 0  # bytes of frames in `events`
+
+    def drop_oldest(self) -> int:
+        event_id, frame = self.events.popleft()
+        self.floor = event_id
+        self.size -= len(frame)
+        return len(frame)
+
+
+class Subscription:
+    """One open stream: a bounded queue of SSE frames."""
+
+    __slots__ = ("user_id", "queue", "overflowed")
+
+    def __init__(self, user_id: int, size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(size)
+        self.overflowed = False
+
+    def push(self, frame: bytes) -> bool:
+        """Queue a frame; False (once) when the client has fallen too far behind."""
+        if self.overflowed:
+            return True
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.overflowed = True  # the stream ends once the queue drains; the client resumes
+            return False
+        return True
+
+
+def _frame(event_id: int, event: str, data: str) -> bytes:
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode()
+
+
+class TaskEventHub:
+    def __init__(self, broker: Optional[EventBroker] = None):
+        self._broker: Optional[EventBroker] = None
+        self._floor = 0  # for users without history: events up to here may have been missed
+        self._history: OrderedDict[int, _History] = OrderedDict()
+        self._history_bytes = 0
+        self._streams: dict[int, set[Subscription]] = {}
+        self.stats = EventStats()
+        if broker is not None:
+            self.use_broker(broker)
+
+    @property
+    def broker(self) -> EventBroker:
+        if self._broker is None:
+            self.use_broker(_build_broker())
+        return self._broker
+
+    def use_broker(self, broker: EventBroker) -> None:
+        self._broker = broker
+        self._history.clear()
+        self._history_bytes = 0
+        self._floor = broker.attach(self._deliver)
+
+    async def publish(self, user_id: int, events: list[tuple[str, str]]) -> None:
+        """Publish (event name, JSON data) pairs for a user. Errors are logged, never raised."""
+        if not events or not settings.TASK_EVENTS_ENABLED:
+            return
+        try:
+            await self.broker.publish(user_id, events)
+        except Exception:
+            self.stats.failed += len(events)
+            logger.exception("Publishing %d task events for user %s failed", len(events), user_id)
+            return
+        self.stats.published += len(events)
+
+    async def tasks_changed(self, user_id: int, event: str, tasks: Iterable[object]) -> None:
+        """Publish `task.<event>` for each task (ORM rows), serialized like GET /tasks items."""
+        if not settings.TASK_EVENTS_ENABLED:
+            return
+        try:
+            payloads = [TaskOutShallow.model_validate(t, from_attributes=True).model_dump_json() for t in tasks]
+        except Exception:
+            self.stats.failed += 1
+            logger.exception("Serializing task.%s events for user %s failed", event, user_id)
+            return
+        await self.publish(user_id, [(f"task.{event}", data) for data in payloads])
+
+    def _deliver(self, event_id: int, user_id: int, event: str, data: str) -> None:
+        frame = _frame(event_id, event, data)
+        history = self._history.get(user_id)
+        if history is None:
+            history = self._history[user_id] = _History(self._floor)
+        else:
+            self._history.move_to_end(user_id)
+        if len(history.events) >= settings.TASK_EVENTS_REPLAY_SIZE:
+            self._history_bytes -= history.drop_oldest()
+        history.events.append((event_id, frame))
+        history.size += len(frame)
+        self._history_bytes += len(frame)
+        self._trim_history(history)
+
+        for stream in self._streams.get(user_id, ()):
+            if not stream.push(frame):
+                self.stats.overflows += 1
+
+    def _trim_history(self, current: _History) -> None:
+        # Least recently active users go first; `current` (the most recent) only loses its own oldest
+        # events, once it is the last one left
+        while len(self._history) > settings.TASK_EVENTS_REPLAY_USERS or (
+            self._history_bytes > settings.TASK_EVENTS_REPLAY_MAX_BYTES and len(self._history) > 1
+        ):
+            _, evicted = self._history.popitem(last=False)
+            self._history_bytes -= evicted.size
+            self._floor = max(self._floor, evicted.events[-1][0] if evicted.events else evicted.floor)
+        while self._history_bytes > settings.TASK_EVENTS_REPLAY_MAX_BYTES and len(current.events) > 1:
+            self._history_bytes -= current.drop_oldest()
+
+    def streams(self, user_id: Optional[int] = None) -> int:
+        """Open streams, for one user or in total."""
+        if user_id is None:
+            return sum(len(streams) for streams in self._streams.values())
+        return len(self._streams.get(user_id, ()))
+
+    def subscribe(self, user_id: int, last_event_id: Optional[int] = None) -> tuple[Subscription, list[bytes]]:
+        """Open a stream; also returns the frames to send first (missed events, or a `reset`)."""
+        self.broker  # attached before anything is compared with the floor
+        stream = Subscription(user_id, settings.TASK_EVENTS_QUEUE_SIZE)
+        self._streams.setdefault(user_id, set()).add(stream)
+        if last_event_id is None:
+            return stream, []
+
+        history = self._history.get(user_id)
+        if last_event_id < (history.floor if history else self._floor):
+            self.stats.resets += 1
+            latest = history.events[-1][0] if history and history.events else self._floor
+            return stream, [_frame(latest, "reset", "{}")]
+        self.stats.resumed += 1
+        return stream, [frame for event_id, frame in (history.events if history else ()) if event_id > last_event_id]
+
+    def unsubscribe(self, stream: Subscription) -> None:
+        streams = self._streams.get(stream.user_id)
+        if streams is not None:
+            streams.discard(stream)
+            if not streams:
+                del self._streams[stream.user_id]
+
+    async def frames(self, stream: Subscription, backlog: list[bytes]) -> AsyncIterator[bytes]:
+        """SSE body for a stream: reconnect delay, backlog, then live events with heartbeats."""
+        try:
+            yield f"retry: {settings.TASK_EVENTS_RETRY_MS}\n\n".encode()
+            for frame in backlog:
+                yield frame
+            while not (stream.overflowed and stream.queue.empty()):
+                try:
+                    yield await asyncio.wait_for(stream.queue.get(), settings.TASK_EVENTS_HEARTBEAT_SECONDS)
+                except TimeoutError:
+                    yield b": keep-alive\n\n"
+        finally:
+            self.unsubscribe(stream)
+
+    def reset(self) -> None:
+        self._broker = None
+        self._floor = 0
+        self._history.clear()
+        self._history_bytes = 0
+        self._streams.clear()
+        self.stats = EventStats()
+
+
+task_events = TaskEventHub()
@@ -0,0 +1,150 @@
+"""
+Scrape-time collectors: copy pool, cache, queue and sweeper stats that live elsewhere into the
+metrics registry (app/core/metrics.py) right before it is rendered or written to the shared directory.
+"""
+
+from __future__ import annotations
+
+from app.core.admission import admission
+from app.core.cache import task_list_cache, task_tree_cache
+from app.core.metrics import registry
+from app.core.scopes import parse_scopes
+from app.core.security import password_hasher
+from app.core.singleflight import task_reads
+from app.db.pool import WAIT_BUCKETS, PoolStats
+from app.db.session import compiled_cache_stats, engine, pool_stats, replica_engine, replica_pool_stats
+from app.db.sqlite import single_writer
+from app.services.maintenance import maintenance
+from app.services.task_events import task_events
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Connection pools
+DB_POOL_CONNECTIONS = registry.gauge("taskaza_db_pool_connections", "Pooled connections by state", ("engine", "state"))
+DB_POOL_CHECKOUT_WAIT = registry.histogram(
+    "taskaza_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("engine",), WAIT_BUCKETS
+)
+DB_POOL_TIMEOUTS = registry.counter("taskaza_db_pool_timeouts_total", "Pool checkouts that timed out", ("engine",))
+DB_COMPILED_CACHE = registry.counter(
+    "taskaza_db_compiled_cache_total", "Statement executions by compiled cache outcome", ("result",)
+)
+
+# SQLite single writer
+SQLITE_WRITER_WAITING = registry.gauge("taskaza_sqlite_writer_waiting", "Write transactions queued for the writer")
+SQLITE_WRITER_ACQUIRED = registry.counter("taskaza_sqlite_writer_acquired_total", "Writer slots granted")
+SQLITE_WRITER_WAIT = registry.counter("taskaza_sqlite_writer_wait_seconds_total", "Time spent queued for the writer")
+
+# Auth
+AUTH_SCOPE_CACHE = registry.counter(
+    "taskaza_auth_scope_cache_total", "API key scope parsing by cache outcome", ("result",)
+)
+PASSWORD_HASH_IN_FLIGHT = registry.gauge("taskaza_password_hash_in_flight", "Password hashes running or queued")
+PASSWORD_HASH_QUEUE = registry.gauge("taskaza_password_hash_queue_depth", "Password hashes waiting for a thread")
+
+# Response caches
+TASK_LIST_CACHE = registry.counter("taskaza_task_list_cache_total", "GET /tasks cache lookups by outcome", ("result",))
+TASK_LIST_CACHE_EVICTIONS = registry.counter(
+    "taskaza_task_list_cache_evictions_total", "Cached task list pages evicted to stay within limits"
+)
+TASK_TREE_CACHE = registry.counter("taskaza_task_tree_cache_total", "Tree snapshot lookups by outcome", ("result",))
+TASK_TREE_CACHE_EVICTIONS = registry.counter(
+    "taskaza_task_tree_cache_evictions_total", "Tree snapshots evicted to stay within the byte budget"
+)
+TASK_TREE_CACHE_BYTES = registry.gauge("taskaza_task_tree_cache_bytes", "Bytes held by cached tree snapshots")
+TASK_READS = registry.counter(
+    "taskaza_task_reads_total", "Task reads that ran their queries (leader) or shared one in flight", ("result",)
+)
+
+# Admission control
+ADMISSION_IN_FLIGHT = registry.gauge("taskaza_admission_in_flight", "Requests holding a slot", ("class",))
+ADMISSION_QUEUE_DEPTH = registry.gauge("taskaza_admission_queue_depth", "Requests waiting for a slot", ("class",))
+ADMISSION_ADMITTED = registry.counter("taskaza_admission_admitted_total", "Requests let through", ("class",))
+ADMISSION_SHED = registry.counter(
+    "taskaza_admission_shed_total",
+    "Requests turned away with 503 (queue_full, timeout, shed_first)",
+    ("class", "reason"),
+)
+
+# Task change feed
+TASK_EVENT_STREAMS = registry.gauge("taskaza_task_event_streams", "Open GET /tasks/stream connections")
+TASK_EVENTS_PUBLISHED = registry.counter("taskaza_task_events_published_total", "Task events published")
+TASK_EVENTS_FAILED = registry.counter(
+    "taskaza_task_events_failed_total", "Task events lost to publishing errors (the write itself succeeded)"
+)
+TASK_EVENT_RESUMES = registry.counter(
+    "taskaza_task_event_resumes_total", "Reconnects with Last-Event-ID (replayed, or reset: refetch)", ("result",)
+)
+TASK_EVENT_OVERFLOWS = registry.counter(
+    "taskaza_task_event_overflows_total", "Streams closed because the client fell too far behind"
+)
+
+# Maintenance sweeper
+MAINTENANCE_RUNS = registry.counter("taskaza_maintenance_runs_total", "Completed maintenance sweeps")
+MAINTENANCE_ROWS = registry.counter(
+    "taskaza_maintenance_rows_purged_total", "Rows deleted or cleared by maintenance", ("table",)
+)
+MAINTENANCE_DURATION = registry.gauge(
+    "taskaza_maintenance_last_duration_seconds", "Duration of the most recent maintenance sweep"
+)
+
+
+def _collect_pool(name: str, pool, stats: PoolStats) -> None:
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        DB_POOL_CONNECTIONS.labels(name, "checked_out").set(pool.checkedout())
+        DB_POOL_CONNECTIONS.labels(name, "checked_in").set(pool.checkedin())
+        DB_POOL_CONNECTIONS.labels(name, "overflow").set(max(pool.overflow(), 0))
+    wait = DB_POOL_CHECKOUT_WAIT.labels(name)
+    wait.counts = list(stats.wait_buckets)
+    wait.sum = stats.wait_seconds_sum
+    DB_POOL_TIMEOUTS.labels(name).set(stats.timeouts)
+
+
+@registry.collector
+def collect_runtime() -> None:
+    _collect_pool("primary", engine.pool, pool_stats)
+    if replica_engine is not None:
+        _collect_pool("replica", replica_engine.pool, replica_pool_stats)
+    DB_COMPILED_CACHE.labels("hit").set(compiled_cache_stats.hits)
+    DB_COMPILED_CACHE.labels("miss").set(compiled_cache_stats.misses)
+    DB_COMPILED_CACHE.labels("uncached").set(compiled_cache_stats.uncached)
+
+    SQLITE_WRITER_WAITING.set(single_writer.waiting)
+    SQLITE_WRITER_ACQUIRED.labels().set(single_writer.acquired)
+    SQLITE_WRITER_WAIT.labels().set(single_writer.wait_seconds_sum)
+
+    scope_cache = parse_scopes.cache_info()
+    AUTH_SCOPE_CACHE.labels("hit").set(scope_cache.hits)
+    AUTH_SCOPE_CACHE.labels("miss").set(scope_cache.misses)
+    PASSWORD_HASH_IN_FLIGHT.set(password_hasher.in_flight)
+    PASSWORD_HASH_QUEUE.set(password_hasher.queue_depth)
+
+    TASK_LIST_CACHE.labels("hit").set(task_list_cache.stats.hits)
+    TASK_LIST_CACHE.labels("miss").set(task_list_cache.stats.misses)
+    TASK_LIST_CACHE_EVICTIONS.labels().set(task_list_cache.stats.evictions)
+    TASK_TREE_CACHE.labels("hit").set(task_tree_cache.stats.hits)
+    TASK_TREE_CACHE.labels("miss").set(task_tree_cache.stats.misses)
+    TASK_TREE_CACHE_EVICTIONS.labels().set(task_tree_cache.stats.evictions)
+    TASK_TREE_CACHE_BYTES.set(task_tree_cache.bytes)
+    TASK_READS.labels("leader").set(task_reads.stats.leaders)
+    TASK_READS.labels("shared").set(task_reads.stats.shared)
+
+    for cls, (running, waiting) in admission.depths().items():
+        ADMISSION_IN_FLIGHT.labels(cls).set(running)
+        ADMISSION_QUEUE_DEPTH.labels(cls).set(waiting)
+    for cls, count in admission.stats.admitted.items():
+        ADMISSION_ADMITTED.labels(cls).set(count)
+    for (cls, reason), count in admission.stats.shed.items():
+        ADMISSION_SHED.labels(cls, reason).set(count)
+
+    events = task_events.stats
+    TASK_EVENT_STREAMS.set(task_events.streams())
+    TASK_EVENTS_PUBLISHED.labels().set(events.published)
+    TASK_EVENTS_FAILED.labels().set(events.failed)
+    TASK_EVENT_RESUMES.labels("replayed").set(events.resumed)
+    TASK_EVENT_RESUMES.labels("reset").set(events.resets)
+    TASK_EVENT_OVERFLOWS.labels().set(events.overflows)
+
+    sweep = maintenance.stats
+    MAINTENANCE_RUNS.labels().set(sweep.runs)
+    for table, rows in sweep.rows_purged.items():
+        MAINTENANCE_ROWS.labels(table).set(rows)
+    MAINTENANCE_DURATION.set(sweep.last_duration_seconds)
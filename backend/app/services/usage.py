@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.crud.apikey import record_key_usage
+from app.db.session import async_session
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+
+class APIKeyUsageRecorder:
+    """
+    Write-behind usage tracking for API keys. `record()` only touches a dict, so verifying a key
+    adds no writes to the request path; `flush()` persists everything buffered in one batched UPDATE.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker = async_session):
+        self.session_factory = session_factory
+        # key_id -> [requests since last flush, last used at]
+        self._pending: dict[int, list] = {}
+
+    def record(self, key_id: int, when: Optional[datetime] = None) -> None:
+        when = when or datetime.now(timezone.utc)
+        entry = self._pending.get(key_id)
+        if entry is None:
+            self._pending[key_id] = [1, when]
+        else:
+            entry[0] += 1
+            entry[1] = when
+
+    def pending(self, key_id: int) -> int:
+        entry = self._pending.get(key_id)
+        return entry[0] if entry else 0
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        try:
+            async with self.session_factory() as db:
+                return await record_key_usage(db, [(kid, n, used) for kid, (n, used) in batch.items()])
+        except Exception:
+            # Put the counts back so the next flush retries them
+            for kid, (n, used) in batch.items():
+                entry = self._pending.setdefault(kid, [0, used])
+                entry[0] += n
+                entry[1] = max(entry[1], used)
+            raise
+
+    def reset(self) -> None:
+        self._pending.clear()
+
+
+api_key_usage = APIKeyUsageRecorder()
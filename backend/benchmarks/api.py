@@ -0,0 +1,244 @@
+"""
+End-to-end API benchmark: seeds a synthetic dataset into a temporary SQLite file, then drives the
+real ASGI app through httpx.ASGITransport with N concurrent clients and reports throughput and
+p50/p95/p99 latency per endpoint. Results can be saved as JSON baselines and compared later.
+
+    python -m benchmarks.api --dataset wide --concurrency 16 --requests 500 --save
+    python -m benchmarks.api --dataset wide --compare benchmarks/baselines/<commit>-wide.json --fail-over 10
+
+Datasets: small (many shallow trees), wide (high fan-out), deep (long chains), tags (large tag sets).
+
+Response caches and single-flight are off unless --cached is given, so runs measure the queries
+and compare like with like across commits. Latency percentiles cover successful responses only;
+4xx/5xx responses (e.g. 503 from admission control) and transport exceptions count as errors.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a throwaway database and lift limits that
+# would otherwise throttle a single client hammering the API
+_TMP = tempfile.mkdtemp(prefix="taskaza-bench-")
+os.environ["TSKZ_DATABASE_URL"] = f"sqlite+aiosqlite:///{_TMP}/bench.db"
+os.environ["TSKZ_RATE_LIMIT_ENABLED"] = "false"
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import platform  # noqa: E402
+import random  # noqa: E402
+import statistics  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+from collections import Counter  # noqa: E402
+from dataclasses import asdict, replace  # noqa: E402
+from datetime import datetime, timezone  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import Awaitable, Callable  # noqa: E402
+
+from httpx import ASGITransport, AsyncClient, Response  # noqa: E402
+
+from app.core.auth import create_access_token  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db.migrate import migrate  # noqa: E402
+from app.db.seed import SeedConfig  # noqa: E402
+from app.db.seed import seed as seed_db  # noqa: E402
+from app.db.session import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+PASSWORD = "bench-password"
+# Read per request, so --cached can switch them after import
+CACHE_SETTINGS = ("TASK_LIST_CACHE_ENABLED", "TASK_TREE_CACHE_ENABLED", "SINGLE_FLIGHT_ENABLED")
+
+
+# ---------------------------- #
+# Datasets (seeded with app.db.seed)
+# ---------------------------- #
+DATASETS = {
+    "small": SeedConfig(users=200, roots=20, fanout=2, depth=1, tags=3),
+    "wide": SeedConfig(users=20, roots=10, fanout=40, depth=1, tags=3),
+    "deep": SeedConfig(users=20, roots=10, fanout=1, depth=30, tags=3),
+    "tags": SeedConfig(users=50, roots=50, fanout=2, depth=1, tags=50, tag_vocabulary=500),
+}
+
+
+async def seed_dataset(dataset: SeedConfig, seed: int) -> list[dict]:
+    """Seed the dataset; returns username, auth headers and root task ids per user."""
+    await migrate(engine)
+    result = await seed_db(engine, replace(dataset, password=PASSWORD, seed=seed))
+    return [
+        {
+            "username": user.username,
+            "headers": {
+                "Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}",
+                "X-API-Key": user.api_keys[0],
+            },
+            "roots": user.root_ids,
+        }
+        for user in result.users
+    ]
+
+
+# ---------------------------- #
+# Scenarios
+# ---------------------------- #
+Call = Callable[[AsyncClient, dict, random.Random], Awaitable[Response]]
+
+
+def _bulk_payload(rng: random.Random) -> dict:
+    return {"create": [{"title": f"bulk {rng.random():.6f}", "tags": ["bulk"]} for _ in range(10)]}
+
+
+SCENARIOS: dict[str, Call] = {
+    "list_tasks": lambda c, s, rng: c.get("/tasks", params={"limit": 20}, headers=s["headers"]),
+    "list_tasks_tree": lambda c, s, rng: c.get(
+        "/tasks", params={"limit": 20, "include_tree": "true", "roots_only": "true"}, headers=s["headers"]
+    ),
+    "get_task": lambda c, s, rng: c.get(f"/tasks/{rng.choice(s['roots'])}", headers=s["headers"]),
+    "bulk": lambda c, s, rng: c.post("/tasks/bulk", json=_bulk_payload(rng), headers=s["headers"]),
+    "login": lambda c, s, rng: c.post("/token", data={"username": s["username"], "password": PASSWORD}),
+}
+
+
+def _percentile(samples: list[float], q: int) -> float:
+    if len(samples) < 2:
+        return round(samples[0] * 1000, 3) if samples else 0.0
+    return round(statistics.quantiles(samples, n=100)[q - 1] * 1000, 3)
+
+
+async def run_scenario(
+    client: AsyncClient, name: str, sessions: list[dict], *, requests: int, concurrency: int, seed: int
+) -> dict:
+    call = SCENARIOS[name]
+    latencies: list[float] = []  # successful responses only
+    errors: Counter[str] = Counter()  # status code or exception type -> count
+    remaining = iter(range(requests))
+
+    async def worker(n: int) -> None:
+        rng = random.Random(seed * 1000 + n)
+        session = sessions[n % len(sessions)]
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                r = await call(client, session, rng)
+            except Exception as e:  # e.g. a pool timeout raised through ASGITransport
+                errors[type(e).__name__] += 1
+                continue
+            if r.status_code >= 400:
+                errors[str(r.status_code)] += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies) + sum(errors.values()),
+        "errors": sum(errors.values()),
+        "error_kinds": dict(errors),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "p99_ms": _percentile(latencies, 99),
+    }
+
+
+# ---------------------------- #
+# Baselines
+# ---------------------------- #
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline: dict, fail_over: float | None) -> bool:
+    """Print per-endpoint deltas; False if any p95 regressed by more than `fail_over` percent."""
+    ok = True
+    print(f"\nvs {baseline['meta']['commit']} ({baseline['meta']['created_at']}):")
+    if baseline["meta"].get("cached") != current["meta"]["cached"]:
+        print(f"  warning: cached={current['meta']['cached']} but the baseline has {baseline['meta'].get('cached')}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        p95 = (result["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        rps = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100 if before["throughput_rps"] else 0.0
+        flag = ""
+        if fail_over is not None and p95 > fail_over:
+            ok, flag = False, "  REGRESSION"
+        print(f"  {name:<16} p95 {p95:+6.1f}%  throughput {rps:+6.1f}%{flag}")
+    return ok
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", choices=DATASETS, default="small")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=50, help="bcrypt makes login slow by design")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cached", action="store_true", help="enable the response caches and single-flight")
+    parser.add_argument("--save", nargs="?", const="", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to compare against")
+    parser.add_argument("--fail-over", type=float, metavar="PCT", help="exit 1 if any p95 regresses more than this")
+    args = parser.parse_args()
+
+    # Slow login requests (bcrypt) would flood the output; latencies are reported below anyway
+    logging.getLogger("app.core.instrumentation").setLevel(logging.ERROR)
+    for name in CACHE_SETTINGS:
+        setattr(settings, name, args.cached)
+    dataset = DATASETS[args.dataset]
+    started = time.perf_counter()
+    sessions = await seed_dataset(dataset, args.seed)
+    total = dataset.users * dataset.tasks_per_user
+    print(f"dataset={args.dataset} users={dataset.users} tasks={total} seeded in {time.perf_counter() - started:.1f}s")
+
+    results = {}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for name in args.scenarios:
+            requests = args.login_requests if name == "login" else args.requests
+            await run_scenario(client, name, sessions, requests=args.warmup, concurrency=args.concurrency, seed=0)
+            results[name] = result = await run_scenario(
+                client, name, sessions, requests=requests, concurrency=args.concurrency, seed=args.seed
+            )
+            print(f"  {name:<16} " + "  ".join(f"{k}={v}" for k, v in result.items()))
+    await engine.dispose()
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset": {"name": args.dataset, **asdict(dataset)},
+            "concurrency": args.concurrency,
+            "cached": args.cached,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.save is not None:
+        path = Path(args.save) if args.save else BASELINE_DIR / f"{report['meta']['commit']}-{args.dataset}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Saved baseline to {path}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if not compare(report, baseline, args.fail_over):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
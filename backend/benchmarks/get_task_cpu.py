@@ -0,0 +1,78 @@
+"""
+Per-request CPU time for `GET /tasks/{task_id}` (default: with a small subtree), measured in-process
+through the ASGI app against a temporary SQLite file.
+
+    python -m benchmarks.get_task_cpu --requests 2000
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a throwaway database
+_TMP = tempfile.mkdtemp(prefix="taskaza-bench-")
+os.environ["TSKZ_DATABASE_URL"] = f"sqlite+aiosqlite:///{_TMP}/bench.db"
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from app.core.auth import create_access_token  # noqa: E402
+from app.crud.apikey import create_api_key  # noqa: E402
+from app.crud.task import create_task_with_subtree  # noqa: E402
+from app.db.migrate import migrate  # noqa: E402
+from app.db.session import async_session, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+async def setup() -> tuple[dict[str, str], int]:
+    await migrate(engine)
+    async with async_session() as db:
+        user = User(username="bench", hashed_password="x", email_verified=True)
+        db.add(user)
+        await db.commit()
+        _, api_key = await create_api_key(db, user_id=user.id, name="bench", scopes_json=None, expires_at=None)
+        tree = {
+            "title": "root",
+            "subtasks": [{"title": f"child {i}", "subtasks": [{"title": "leaf"}]} for i in range(3)],
+        }
+        task = await create_task_with_subtree(db, user.id, tree)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}", "X-API-Key": api_key}
+    return headers, task.id
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--shallow", action="store_true", help="request include_tree=false")
+    args = parser.parse_args()
+
+    headers, task_id = await setup()
+    url = f"/tasks/{task_id}" + ("?include_tree=false" if args.shallow else "")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(args.warmup):
+            assert (await client.get(url, headers=headers)).status_code == 200
+
+        cpu: list[float] = []
+        for _ in range(args.requests):
+            started = time.process_time()
+            r = await client.get(url, headers=headers)
+            cpu.append(time.process_time() - started)
+            assert r.status_code == 200, r.text
+
+    await engine.dispose()
+    us = sorted(c * 1e6 for c in cpu)
+    print(
+        f"GET {url}: {args.requests} requests  cpu/request mean={statistics.fmean(us):.0f}us "
+        f"p50={us[len(us) // 2]:.0f}us p95={us[int(len(us) * 0.95)]:.0f}us"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
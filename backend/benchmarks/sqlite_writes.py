@@ -0,0 +1,143 @@
+"""
+Mixed read/write load against a file-backed SQLite database, comparing the default profile
+(FK + WAL only, writers racing on the busy handler) with the tuned profile (extra pragmas +
+in-process single-writer queue).
+
+    python -m benchmarks.sqlite_writes --workers 32 --ops 200 --write-ratio 0.3
+
+Measured with --workers 32 --ops 100 (1 vCPU, Python 3.12.1, SQLite 3.40.1). ops/sec counts
+successful operations only; errors are "database is locked" failures out of 3200 operations:
+
+    write ratio  profile  ops/sec  errors  read p50/p95 ms  write p50/p95 ms
+    0.3          default    251      905     79 / 193        120 / 369
+    0.3          tuned      284        0      9 / 16         335 / 476
+    0.3          default    250      900     82 / 196        120 / 237   (repeat run)
+    0.3          tuned      338        0      7 / 14         285 / 404   (repeat run)
+    0.1          default    289      228     90 / 209        127 / 234
+    0.1          tuned      281        0     21 / 71         806 / 1147
+
+The tuned profile turns lock errors into queueing. Writes that used to fail now wait their turn,
+which raises write latency, while reads no longer contend with writers.
+
+Serializing writes trades write latency for fewer lock errors; it is not a throughput win. At
+write ratio 0.3 throughput rises 13-35%, but at 0.1 it is flat (289 vs 281 ops/sec), and write
+p50 goes from about 120 ms to 285-335 ms (0.3) and 806 ms (0.1). Keep TSKZ_SQLITE_SINGLE_WRITER
+on when failed writes are the bigger problem, and turn it off when write latency matters more.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.crud.task import create_task, get_tasks_for_user, update_task_status
+from app.db.pool import POOL_PROFILES
+from app.db.session import Base
+from app.db.sqlite import single_writer, sqlite_pragmas
+from app.models.user import User
+
+
+async def run_profile(db_path: Path, *, tuned: bool, workers: int, ops: int, write_ratio: float, seed: int) -> dict:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}",
+        **{k: v for k, v in POOL_PROFILES["sqlite-dev"].items() if k != "statement_cache_size"},
+    )
+    pragmas = sqlite_pragmas(file_based=True, tuned=tuned)
+    if not tuned:
+        # Python's sqlite3 defaults to a 5 s busy timeout; drop it so contention shows up as errors
+        pragmas.append("PRAGMA busy_timeout=0")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _apply(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    single_writer.enabled = tuned
+    Session = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with Session() as db:
+        user = User(username="bench", hashed_password="x")
+        db.add(user)
+        await db.commit()
+        user_id = user.id
+        for i in range(200):
+            await create_task(db, user_id, {"title": f"seed {i}", "description": "seed"})
+
+    rng = random.Random(seed)
+    reads: list[float] = []
+    writes: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in range(ops):
+            is_write = rng.random() < write_ratio
+            started = time.perf_counter()
+            try:
+                async with Session() as db:
+                    if is_write:
+                        task = await create_task(db, user_id, {"title": "bench", "description": "bench"})
+                        await update_task_status(db, task, "completed")
+                    else:
+                        await get_tasks_for_user(db, user_id, limit=50)
+            except OperationalError:
+                errors += 1
+                continue
+            (writes if is_write else reads).append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    def pct(samples: list[float], q: int) -> float:
+        return round(statistics.quantiles(samples, n=100)[q - 1] * 1000, 2) if len(samples) > 1 else 0.0
+
+    return {
+        "profile": "tuned" if tuned else "default",
+        "ops_per_sec": round((len(reads) + len(writes)) / elapsed, 1),
+        "errors": errors,
+        "read_p50_ms": pct(reads, 50),
+        "read_p95_ms": pct(reads, 95),
+        "write_p50_ms": pct(writes, 50),
+        "write_p95_ms": pct(writes, 95),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--ops", type=int, default=100, help="operations per worker")
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for tuned in (False, True):
+            result = await run_profile(
+                Path(tmp) / f"bench-{tuned}.db",
+                tuned=tuned,
+                workers=args.workers,
+                ops=args.ops,
+                write_ratio=args.write_ratio,
+                seed=args.seed,
+            )
+            print("  ".join(f"{k}={v}" for k, v in result.items()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
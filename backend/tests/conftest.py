@@ -1,6 +1,9 @@
 import os
 import sys
+from collections import Counter
+from contextlib import contextmanager
 
+import pytest
 import pytest_asyncio
 from dotenv import load_dotenv
 from httpx import ASGITransport, AsyncClient
@@ -13,10 +16,20 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 load_dotenv()
 
-from app.core.dependencies import get_db
+# Any request repeating one statement shape N+1 style fails the test (see app/core/instrumentation.py)
+os.environ.setdefault("TSKZ_N_PLUS_ONE_DETECTION", "raise")
+
+from app.core.admission import admission
+from app.core.cache import task_list_cache, task_tree_cache
+from app.core.dependencies import get_db, get_read_db
+from app.core.instrumentation import fingerprint, instrument_engine
+from app.core.ratelimit import api_key_throttle, limiter
+from app.core.singleflight import task_reads
 from app.crud import apikey as crud_apikey
 from app.crud import user as crud_user
 from app.db.session import Base
+from app.services.task_events import task_events
+from app.services.usage import api_key_usage
 from app.main import app
 
 # ---------------------------------------------------------------------
@@ -45,6 +58,61 @@ def _enable_sqlite_fks_for_tests(dbapi_connection, _):
     dbapi_connection.execute("PRAGMA foreign_keys=ON")
 
 
+# Per-request query counts / Server-Timing, as on the app engine
+instrument_engine(engine_test)
+
+
+# ---------------------------------------------------------------------
+# Count SQL statements sent to the test database
+# ---------------------------------------------------------------------
+class QueryCounter:
+    """Records statements executed on the test engine while active (`with query_counter: ...`)."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+        self._active = False
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self._active:
+            self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __enter__(self):
+        self.statements.clear()
+        self._active = True
+        return self
+
+    def __exit__(self, *exc):
+        self._active = False
+
+
+@pytest.fixture
+def query_counter():
+    counter = QueryCounter()
+    event.listen(engine_test.sync_engine, "before_cursor_execute", counter._record)
+    yield counter
+    event.remove(engine_test.sync_engine, "before_cursor_execute", counter._record)
+
+
+@pytest.fixture
+def assert_max_queries(query_counter):
+    """`with assert_max_queries(3): ...` fails if the block runs more than 3 statements."""
+
+    @contextmanager
+    def check(limit: int):
+        with query_counter:
+            yield query_counter
+        if query_counter.count > limit:
+            shapes = Counter(fingerprint(s) for s in query_counter.statements)
+            detail = "\n".join(f"  {n}x {shape}" for shape, n in shapes.most_common())
+            pytest.fail(f"{query_counter.count} queries, expected at most {limit}:\n{detail}")
+
+    return check
+
+
 # ---------------------------------------------------------------------
 # Auto-check once per test session that FKs are really ON
 # ---------------------------------------------------------------------
@@ -65,6 +133,7 @@ async def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 
 # ---------------------------------------------------------------------
@@ -79,6 +148,16 @@ async def async_client():
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
 
+    # Rate limit counters are process-wide; start every test with a clean slate
+    await limiter.store.reset()
+    api_key_throttle.reset()
+    api_key_usage.reset()
+    await task_list_cache.reset()  # user ids repeat across tests
+    task_tree_cache.reset()
+    task_reads.reset()
+    admission.reset()
+    task_events.reset()
+
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
         yield client
 
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.responses import PlainTextResponse
+
+from app.core.admission import AdmissionMiddleware, admission, route_class
+from app.core.config import settings
+from utils import _wait_for
+
+
+def _scope(method: str, path: str, query: bytes = b"") -> dict:
+    return {"type": "http", "method": method, "path": path, "query_string": query}
+
+
+def test_route_classes():
+    assert route_class(_scope("POST", "/token")) == "auth"
+    assert route_class(_scope("POST", "/auth/password-reset/request")) == "auth"
+    assert route_class(_scope("POST", "/tasks/bulk")) == "bulk"
+    assert route_class(_scope("POST", "/tasks")) == "write"
+    assert route_class(_scope("DELETE", "/tasks/3")) == "write"
+    assert route_class(_scope("GET", "/tasks")) == "read"
+    assert route_class(_scope("GET", "/tasks", b"include_tree=true")) == "tree"
+    assert route_class(_scope("GET", "/tasks/3")) == "tree"
+    assert route_class(_scope("GET", "/tasks/3", b"include_tree=false")) == "read"
+    assert route_class(_scope("GET", "/users/me")) == "read"
+    assert route_class(_scope("GET", "/internal/metrics")) is None
+    assert route_class(_scope("GET", "/tasks/stream")) is None
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_LIMITS", {"read": 1, "tree": 1})
+    monkeypatch.setattr(settings, "ADMISSION_QUEUE_SIZE", {"read": 1, "tree": 1})
+    monkeypatch.setattr(settings, "ADMISSION_QUEUE_TIMEOUT_SECONDS", 0.2)
+    admission.reset()
+    gate = asyncio.Event()
+
+    async def app(scope, receive, send):
+        if scope["path"] == "/slow":
+            await gate.wait()
+        await PlainTextResponse("ok")(scope, receive, send)
+
+    client = AsyncClient(transport=ASGITransport(app=AdmissionMiddleware(app)), base_url="http://test")
+    yield client, gate
+    admission.reset()
+
+
+@pytest.mark.asyncio
+async def test_queue_then_shed_with_retry_after(limited):
+    client, gate = limited
+    running = asyncio.create_task(client.get("/slow"))
+    await _wait_for(lambda: admission.depths().get("read") == (1, 0))
+
+    # One may wait; the next is shed at once
+    queued = asyncio.create_task(client.get("/fast"))
+    await _wait_for(lambda: admission.depths()["read"] == (1, 1))
+    shed = await client.get("/fast")
+    assert shed.status_code == 503 and shed.headers["retry-after"] == "1"
+
+    # Expensive classes are turned away while cheaper ones are queueing
+    tree = await client.get("/tasks/1")
+    assert tree.status_code == 503
+
+    gate.set()
+    assert [(await running).status_code, (await queued).status_code] == [200, 200]
+    assert admission.depths()["read"] == (0, 0)
+    assert admission.stats.shed == {("read", "queue_full"): 1, ("tree", "shed_first"): 1}
+    assert admission.stats.admitted["read"] == 2
+
+
+@pytest.mark.asyncio
+async def test_waiters_past_the_deadline_are_shed(limited):
+    client, gate = limited
+    running = asyncio.create_task(client.get("/slow"))
+    await _wait_for(lambda: admission.depths().get("read") == (1, 0))
+
+    r = await client.get("/fast")
+    assert r.status_code == 503 and admission.stats.shed[("read", "timeout")] == 1
+    assert admission.depths()["read"] == (1, 0)
+
+    # A client giving up while queued leaves no trace either
+    queued = asyncio.create_task(client.get("/fast"))
+    await _wait_for(lambda: admission.depths()["read"] == (1, 1))
+    queued.cancel()
+    await _wait_for(lambda: admission.depths()["read"] == (1, 0))
+
+    gate.set()
+    assert (await running).status_code == 200
+    assert admission.depths()["read"] == (0, 0)
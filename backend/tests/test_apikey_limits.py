@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import update
+
+from app.core.ratelimit import APIKeyThrottle, RateLimitExceeded, api_key_throttle
+from app.core.scopes import KeyLimits, encode_scopes, parse_scopes
+from app.crud import apikey as crud_apikey
+from app.crud import user as crud_user
+from app.models.user import User
+from conftest import TestingSessionLocal
+
+
+async def _user_with_key(client, username: str, limits: KeyLimits | None):
+    await client.post("/signup", json={"username": username, "password": "pw"})
+    tok = await client.post("/token", data={"username": username, "password": "pw"})
+    async with TestingSessionLocal() as db:
+        user = await crud_user.get_user_by_username(db, username)
+        await db.execute(update(User).where(User.id == user.id).values(email_verified=True))
+        await db.commit()
+        _, display_key = await crud_apikey.create_api_key(
+            db, user_id=user.id, name="limited", scopes_json=encode_scopes(["tasks:read"], limits), expires_at=None
+        )
+    return {"Authorization": f"Bearer {tok.json()['access_token']}", "X-API-Key": display_key}
+
+
+def test_scopes_roundtrip_and_cache():
+    raw = encode_scopes(["tasks:read"], KeyLimits(rate_per_sec=2.5, burst=5, daily_quota=100))
+    parsed = parse_scopes(raw)
+    assert parsed.scopes == ("tasks:read",)
+    assert parsed.limits == KeyLimits(rate_per_sec=2.5, burst=5, daily_quota=100)
+    assert parse_scopes(raw) is parsed  # parsed once, then served from cache
+    assert parse_scopes(None).limits.is_empty()
+
+
+def test_token_bucket_refills():
+    throttle = APIKeyThrottle()
+    limits = KeyLimits(rate_per_sec=1, burst=2)
+    throttle.hit(1, limits, now=100.0)
+    throttle.hit(1, limits, now=100.0)
+    with pytest.raises(RateLimitExceeded) as exc:
+        throttle.hit(1, limits, now=100.2)
+    assert exc.value.retry_after == 1
+    throttle.hit(1, limits, now=101.2)
+
+
+def test_keys_without_limits_are_not_throttled():
+    throttle = APIKeyThrottle()
+    assert throttle.effective_limits(KeyLimits()).is_empty()
+    for _ in range(1000):
+        throttle.hit(1, KeyLimits(), now=100.0)
+
+
+@pytest.mark.asyncio
+async def test_daily_quota_enforced_and_usage_listed(async_client):
+    headers = await _user_with_key(async_client, "quota", KeyLimits(daily_quota=3))
+
+    for _ in range(3):
+        r = await async_client.get("/users/me", headers=headers)
+        assert r.status_code == 200
+    r = await async_client.get("/users/me", headers=headers)
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
+
+    await api_key_throttle.flush()
+    r = await async_client.get("/apikeys", headers=headers)
+    assert r.status_code == 200, r.text
+    (key,) = r.json()
+    assert key["scopes"] == ["tasks:read"]
+    assert key["limits"]["daily_quota"] == 3
+    assert key["usage"] == {"requests_today": 3, "remaining_today": 0}
+
+
+@pytest.mark.asyncio
+async def test_per_second_limit_returns_429(async_client):
+    headers = await _user_with_key(async_client, "burst", KeyLimits(rate_per_sec=0.01, burst=2))
+    codes = [(await async_client.get("/users/me", headers=headers)).status_code for _ in range(3)]
+    assert codes == [200, 200, 429]
+
+
+@pytest.mark.asyncio
+async def test_create_key_with_limits(async_client):
+    headers = await _user_with_key(async_client, "creator", None)
+    payload = {"name": "ci", "scopes": ["tasks:write"], "limits": {"rate_limit_per_sec": 5, "daily_quota": 1000}}
+    r = await async_client.post("/apikeys", json=payload, headers=headers)
+    assert r.status_code == 201, r.text
+    body = r.json()
+    assert body["api_key"].startswith("tsk_")
+    assert body["scopes"] == ["tasks:write"]
+    assert body["limits"] == {"rate_limit_per_sec": 5.0, "burst": None, "daily_quota": 1000}
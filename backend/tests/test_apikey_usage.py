@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import event, select
+
+from app.crud import user as crud_user
+from app.models.apikey import APIKey
+from app.services.usage import api_key_usage
+from conftest import TestingSessionLocal, engine_test
+from utils import _signup_and_login
+
+
+@pytest.mark.asyncio
+async def test_usage_is_buffered_then_flushed_in_one_update(async_client, monkeypatch):
+    headers = await _signup_and_login(async_client, "usage", "pw")
+
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine_test.sync_engine, "before_cursor_execute", _capture)
+    try:
+        for _ in range(3):
+            r = await async_client.get("/users/me", headers=headers)
+            assert r.status_code == 200
+        assert not any(s.lstrip().upper().startswith("UPDATE API_KEYS") for s in statements)
+    finally:
+        event.remove(engine_test.sync_engine, "before_cursor_execute", _capture)
+
+    async with TestingSessionLocal() as db:
+        user = await crud_user.get_user_by_username(db, "usage")
+        key = (await db.execute(select(APIKey).where(APIKey.user_id == user.id))).scalar_one()
+        assert key.request_count == 0 and key.last_used_at is None
+    assert api_key_usage.pending(key.id) == 3
+
+    monkeypatch.setattr(api_key_usage, "session_factory", TestingSessionLocal)
+    assert await api_key_usage.flush() == 1
+    assert api_key_usage.pending(key.id) == 0
+
+    async with TestingSessionLocal() as db:
+        key = (await db.execute(select(APIKey).where(APIKey.id == key.id))).scalar_one()
+        assert key.request_count == 3
+        assert key.last_used_at is not None
@@ -0,0 +1,64 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.core.openapi import export_openapi, use_prebuilt_openapi
+from app.main import app
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Generous wall-clock ceiling for `import app.main` (CI machines vary); override with TSKZ_IMPORT_BUDGET_SECONDS
+IMPORT_BUDGET_SECONDS = float(os.environ.get("TSKZ_IMPORT_BUDGET_SECONDS", "3.0"))
+# Only needed when mail is sent or a password is hashed; must stay off the import path
+LAZY_MODULES = ("aiosmtplib", "passlib", "bcrypt")
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$")
+
+
+def _importtime(module: str) -> dict[str, int]:
+    """Cumulative import time (microseconds) per module, parsed from `python -X importtime`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m:
+            timings[m.group(4)] = int(m.group(2))
+    return timings
+
+
+def test_import_time_budget():
+    timings = _importtime("app.main")
+    eager = sorted(name for name in timings if name.split(".")[0] in LAZY_MODULES)
+    assert not eager, f"heavy modules imported eagerly: {eager}"
+    assert timings["app.main"] / 1e6 < IMPORT_BUDGET_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_openapi_served_from_prebuilt_file(async_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "openapi_schema", None)
+    monkeypatch.setattr(app, "openapi", app.openapi)
+
+    path = export_openapi(app, tmp_path / "openapi.json")
+    schema = json.loads(path.read_text())
+    assert "/tasks" in schema["paths"]
+
+    # Mark the file so we can tell it apart from a freshly generated schema
+    schema["info"]["title"] = "from file"
+    path.write_text(json.dumps(schema))
+    app.openapi_schema = None
+    use_prebuilt_openapi(app, path)
+
+    r = await async_client.get("/openapi.json")
+    assert r.status_code == 200
+    assert r.json()["info"]["title"] == "from file"
@@ -0,0 +1,88 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.responses import PlainTextResponse, StreamingResponse
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, negotiate
+from utils import _signup_and_login
+
+
+def test_negotiate_honours_q_values():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0, deflate") is None
+    assert negotiate("identity") is None
+    assert negotiate("*;q=0.5") == next(iter(compression.ENCODERS))
+    assert negotiate("") is None
+
+
+@pytest.mark.asyncio
+async def test_json_is_gzipped_above_threshold(async_client):
+    headers = await _signup_and_login(async_client, username="squeezed", password="squeezedpw")
+    await async_client.post(
+        "/tasks/bulk", json={"create": [{"title": f"task {i}"} for i in range(30)]}, headers=headers
+    )
+
+    r = await async_client.get("/tasks", headers={**headers, "Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip" and "Accept-Encoding" in r.headers["vary"]
+    assert len(r.json()) == 20  # default page size; httpx decodes transparently
+    raw_length = int(r.headers["content-length"])
+    assert raw_length < len(r.content)
+
+    r = await async_client.get("/tasks", headers={**headers, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers and len(r.json()) == 20
+
+    # Small bodies aren't worth it
+    r = await async_client.get("/tasks", params={"limit": 1}, headers={**headers, "Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers and "Accept-Encoding" in r.headers["vary"]
+
+
+@pytest.mark.asyncio
+async def test_cached_pages_reuse_their_encoded_copy(async_client, monkeypatch):
+    headers = await _signup_and_login(async_client, username="recycled", password="recycledpw")
+    payload = {"title": "root", "subtasks": [{"title": f"leaf {i}"} for i in range(30)]}
+    root = (await async_client.post("/tasks", json=payload, headers=headers)).json()["id"]
+
+    calls = []
+    real = compression._Gzip.compress
+    monkeypatch.setattr(compression._Gzip, "compress", staticmethod(lambda body: calls.append(1) or real(body)))
+
+    for path in ("/tasks", f"/tasks/{root}"):
+        calls.clear()
+        first = await async_client.get(path, headers={**headers, "Accept-Encoding": "gzip"})
+        second = await async_client.get(path, headers={**headers, "Accept-Encoding": "gzip"})
+        assert first.headers["content-encoding"] == second.headers["content-encoding"] == "gzip"
+        assert first.content == second.content
+        assert len(calls) == 1, path
+
+
+def _app(response):
+    async def app(scope, receive, send):
+        await response(scope, receive, send)
+
+    return CompressionMiddleware(app)
+
+
+@pytest.mark.asyncio
+async def test_media_type_allowlist_and_streaming():
+    async def get(response, path="/"):
+        transport = ASGITransport(app=_app(response))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers={"Accept-Encoding": "gzip"})
+
+    r = await get(PlainTextResponse("x" * 5000, media_type="image/svg+xml"))
+    assert "content-encoding" not in r.headers
+
+    async def chunks():
+        for i in range(3):
+            yield f"data: {i}\n\n".encode()
+
+    r = await get(StreamingResponse(chunks(), media_type="text/event-stream"))
+    assert "content-encoding" not in r.headers and r.text.count("data:") == 3
+
+    async def lines():
+        for i in range(50):
+            yield f"line {i}\n".encode()
+
+    r = await get(StreamingResponse(lines(), media_type="text/plain"))
+    assert r.headers["content-encoding"] == "gzip" and "content-length" not in r.headers
+    assert r.text == "".join(f"line {i}\n" for i in range(50))
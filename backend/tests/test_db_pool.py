@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.db.pool import PoolStats, engine_options, pool_status
+
+
+def test_profiles_and_overrides(monkeypatch):
+    pg = make_url("postgresql+asyncpg://u:p@db/taskaza")
+    monkeypatch.setattr(settings, "DB_POOL_PROFILE", "postgres-high")
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+    opts = engine_options(pg, PoolStats())
+    assert opts["pool_size"] == 7  # explicit setting wins
+    assert opts["max_overflow"] == 20  # rest comes from the profile
+    assert opts["pool_pre_ping"] is False
+    assert opts["connect_args"]["statement_cache_size"] == 500
+
+    assert engine_options(make_url("sqlite+aiosqlite:///:memory:"), PoolStats()) == {}
+
+
+@pytest.mark.asyncio
+async def test_pool_records_checkout_waits(tmp_path):
+    url = make_url(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+    stats = PoolStats()
+    engine = create_async_engine(url, **engine_options(url, stats))
+    try:
+        for _ in range(3):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        snapshot = pool_status(engine, stats, "sqlite-dev")
+    finally:
+        await engine.dispose()
+
+    assert snapshot["checkouts"] == 3
+    assert snapshot["checked_out"] == 0
+    assert snapshot["wait_seconds_histogram"]["+Inf"] == 3
+    assert snapshot["size"] == 5
+
+
+@pytest.mark.asyncio
+async def test_internal_pool_endpoint_requires_token(async_client, monkeypatch):
+    r = await async_client.get("/internal/db/pool")
+    assert r.status_code == 404
+
+    monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", "s3cret")
+    r = await async_client.get("/internal/db/pool", headers={"X-Internal-Token": "wrong"})
+    assert r.status_code == 404
+    r = await async_client.get("/internal/db/pool", headers={"X-Internal-Token": "s3cret"})
+    assert r.status_code == 200
+    body = r.json()
+    assert {"profile", "checkouts", "wait_seconds_histogram", "compiled_cache"} <= body.keys()
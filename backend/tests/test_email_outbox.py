@@ -0,0 +1,177 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.timeutils import as_aware_utc
+from app.crud import email_outbox as crud_outbox
+from app.models.email_outbox import EmailOutbox
+from app.services.mailer import SMTPConnectionPool
+from app.services.outbox import EmailOutboxSender
+from conftest import TestingSessionLocal
+
+
+class StubSMTPServer:
+    """Minimal local SMTP server: no TLS, no auth, records every DATA payload."""
+
+    def __init__(self):
+        self.messages: list[str] = []
+        self.connections = 0
+        self.server: asyncio.AbstractServer | None = None
+        self.port: int | None = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+
+        async def reply(line: str):
+            writer.write((line + "\r\n").encode())
+            await writer.drain()
+
+        await reply("220 stub ESMTP")
+        while line := await reader.readline():
+            cmd = line.decode().strip().upper()
+            if cmd.startswith("EHLO"):
+                await reply("250-stub\r\n250 8BITMIME")
+            elif cmd.startswith("DATA"):
+                await reply("354 go ahead")
+                body = []
+                while (data := await reader.readline()) not in (b".\r\n", b""):
+                    body.append(data.decode())
+                self.messages.append("".join(body))
+                await reply("250 queued")
+            elif cmd.startswith("QUIT"):
+                await reply("221 bye")
+                break
+            else:  # HELO, MAIL, RCPT, NOOP, RSET
+                await reply("250 ok")
+        writer.close()
+
+
+@pytest_asyncio.fixture
+async def smtp_stub():
+    server = StubSMTPServer()
+    await server.start()
+    yield server
+    await server.stop()
+
+
+async def _outbox_rows():
+    async with TestingSessionLocal() as db:
+        return list((await db.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars())
+
+
+@pytest.mark.asyncio
+async def test_verify_request_enqueues_and_dedupes(async_client):
+    r = await async_client.post("/signup", json={"username": "mailer", "password": "pw", "email": "m@example.com"})
+    assert r.status_code == 201
+
+    for _ in range(2):
+        r = await async_client.post("/auth/verify-email/request", json={"email": "m@example.com"})
+        assert r.status_code == 202
+
+    rows = await _outbox_rows()
+    assert len(rows) == 1
+    assert rows[0].status == "pending" and rows[0].dedupe_key.startswith("verify:")
+
+
+@pytest.mark.asyncio
+async def test_claimed_message_is_not_rewritten_by_a_dedupe(async_client):
+    async with TestingSessionLocal() as db:
+        await crud_outbox.enqueue_email(db, "a@example.com", "first", "<p>1</p>", dedupe_key="k")
+        (claimed,) = await crud_outbox.claim_due_emails(db, limit=10, lease=timedelta(minutes=5))
+        await crud_outbox.enqueue_email(db, "a@example.com", "second", "<p>2</p>", dedupe_key="k")
+        await crud_outbox.enqueue_email(db, "a@example.com", "third", "<p>3</p>", dedupe_key="k")
+
+    rows = await _outbox_rows()
+    assert [(r.subject, r.dedupe_key, r.claim_token) for r in rows] == [
+        ("first", None, claimed.claim_token),
+        ("third", "k", None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sender_delivers_batch_over_one_pooled_connection(async_client, smtp_stub):
+    for i in range(3):
+        email = f"u{i}@example.com"
+        await async_client.post("/signup", json={"username": f"u{i}", "password": "pw", "email": email})
+        await async_client.post("/auth/password-reset/request", json={"email": email})
+
+    pool = SMTPConnectionPool(1, hostname="127.0.0.1", port=smtp_stub.port, username="", start_tls=False)
+    sender = EmailOutboxSender(session_factory=TestingSessionLocal, pool=pool)
+    try:
+        assert await sender.run_once() == 3
+        assert await sender.run_once() == 0
+    finally:
+        await sender.close()
+
+    assert len(smtp_stub.messages) == 3
+    assert smtp_stub.connections == 1
+    rows = await _outbox_rows()
+    assert all(r.status == "sent" and r.dedupe_key is None for r in rows)
+    assert all(r.html == "" for r in rows)  # the reset links are not kept after sending
+
+
+@pytest.mark.asyncio
+async def test_failed_send_is_retried_with_backoff(async_client, smtp_stub):
+    await async_client.post("/signup", json={"username": "retry", "password": "pw", "email": "r@example.com"})
+    await async_client.post("/auth/password-reset/request", json={"email": "r@example.com"})
+    await smtp_stub.stop()  # nothing listening -> connection refused
+
+    pool = SMTPConnectionPool(1, hostname="127.0.0.1", port=smtp_stub.port, username="", start_tls=False, timeout=2)
+    sender = EmailOutboxSender(session_factory=TestingSessionLocal, pool=pool)
+    assert await sender.run_once() == 1
+
+    (row,) = await _outbox_rows()
+    assert row.status == "pending"
+    assert row.attempts == 1
+    assert row.last_error
+    assert as_aware_utc(row.next_attempt_at) > datetime.now(timezone.utc)
+    # Not due yet, so the next pass claims nothing
+    assert await sender.run_once() == 0
+
+
+@pytest.mark.asyncio
+async def test_given_up_message_drops_its_links(async_client):
+    await async_client.post("/signup", json={"username": "bounced", "password": "pw", "email": "b@example.com"})
+    await async_client.post("/auth/password-reset/request", json={"email": "b@example.com"})
+    (row,) = await _outbox_rows()
+    assert "reset-password?token=" in row.html
+
+    async with TestingSessionLocal() as db:
+        await crud_outbox.mark_email_failed(db, row.id, "550 no such user", attempts=5, retry_at=None)
+    (row,) = await _outbox_rows()
+    assert (row.status, row.html, row.last_error) == ("failed", "", "550 no such user")
+
+
+@pytest.mark.asyncio
+async def test_notify_during_a_pass_is_not_lost(monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_POLL_SECONDS", 60)
+    sender = EmailOutboxSender(session_factory=TestingSessionLocal)
+    passes = 0
+
+    async def run_once():
+        nonlocal passes
+        passes += 1
+        if passes == 1:
+            sender.notify()  # a message enqueued while the first pass is running
+        return 0
+
+    monkeypatch.setattr(sender, "run_once", run_once)
+    loop = asyncio.create_task(sender.run_forever())
+    try:
+        await asyncio.sleep(0.05)
+        assert passes == 2  # woken straight away instead of after the poll interval
+    finally:
+        loop.cancel()
+        await asyncio.gather(loop, return_exceptions=True)
@@ -0,0 +1,158 @@
+import asyncio
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.crud import idempotency as crud_idempotency
+from app.crud import task as crud_task
+from app.models.idempotency_key import IdempotencyKey
+from app.services.maintenance import MaintenanceSweeper
+from conftest import TestingSessionLocal
+from utils import _signup_and_login
+
+
+async def _task_count(client, headers) -> int:
+    return len((await client.get("/tasks", params={"limit": 100}, headers=headers)).json())
+
+
+@pytest.mark.asyncio
+async def test_retries_replay_the_first_response(async_client, query_counter):
+    headers = await _signup_and_login(async_client, username="retrier", password="retrierpw")
+    keyed = {**headers, "Idempotency-Key": "create-1"}
+
+    first = await async_client.post("/tasks", json={"title": "once"}, headers=keyed)
+    assert first.status_code == 201 and "idempotent-replayed" not in first.headers
+    with query_counter:
+        again = await async_client.post("/tasks", json={"title": "once"}, headers=keyed)
+    assert again.status_code == 201 and again.headers["idempotent-replayed"] == "true"
+    assert again.content == first.content
+    assert not any(re.search(r"\btasks\b", s) for s in query_counter.statements), query_counter.statements
+    assert await _task_count(async_client, headers) == 1
+
+    # Same key, different request
+    r = await async_client.post("/tasks", json={"title": "other"}, headers=keyed)
+    assert r.status_code == 422
+    r = await async_client.post("/tasks/bulk", json={"create": [{"title": "once"}]}, headers=keyed)
+    assert r.status_code == 422
+
+    # Bulk, and keys are per user
+    bulk = {"create": [{"title": "a"}, {"title": "b"}]}
+    first = await async_client.post("/tasks/bulk", json=bulk, headers={**headers, "Idempotency-Key": "bulk-1"})
+    again = await async_client.post("/tasks/bulk", json=bulk, headers={**headers, "Idempotency-Key": "bulk-1"})
+    assert first.status_code == again.status_code == 200 and first.content == again.content
+    assert await _task_count(async_client, headers) == 3
+
+    other = await _signup_and_login(async_client, username="stranger", password="strangerpw")
+    r = await async_client.post("/tasks", json={"title": "once"}, headers={**other, "Idempotency-Key": "create-1"})
+    assert r.status_code == 201 and "idempotent-replayed" not in r.headers
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_wait_and_failures_release_the_key(async_client, monkeypatch):
+    headers = await _signup_and_login(async_client, username="racer", password="racerpw")
+    keyed = {**headers, "Idempotency-Key": "race"}
+    gate, calls = asyncio.Event(), []
+    real = crud_task.create_task
+
+    async def gated(*args, **kwargs):
+        calls.append(1)
+        await gate.wait()
+        if len(calls) == 1:
+            raise HTTPException(status_code=503, detail="flaky")
+        return await real(*args, **kwargs)
+
+    monkeypatch.setattr(crud_task, "create_task", gated)
+
+    # The first attempt fails while a duplicate waits: the duplicate then runs it itself
+    first = asyncio.create_task(async_client.post("/tasks", json={"title": "raced"}, headers=keyed))
+    second = asyncio.create_task(async_client.post("/tasks", json={"title": "raced"}, headers=keyed))
+    async with asyncio.timeout(5):
+        while not calls:
+            await asyncio.sleep(0.005)
+    await asyncio.sleep(0.05)
+    assert len(calls) == 1  # the duplicate is waiting, not creating
+    gate.set()
+    assert (await first).status_code == 503
+    created = await second
+    assert created.status_code == 201 and len(calls) == 2
+
+    # Later duplicates replay the stored success
+    third = await async_client.post("/tasks", json={"title": "raced"}, headers=keyed)
+    assert third.content == created.content and len(calls) == 2
+    assert await _task_count(async_client, headers) == 1
+
+
+@pytest.mark.asyncio
+async def test_sweeper_expires_and_caps_records(async_client, monkeypatch):
+    headers = await _signup_and_login(async_client, username="sweepy", password="sweepypw")
+    for i in range(4):
+        r = await async_client.post("/tasks", json={"title": f"t{i}"}, headers={**headers, "Idempotency-Key": f"k{i}"})
+        assert r.status_code == 201
+
+    async with TestingSessionLocal() as db:
+        past = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await db.execute(update(IdempotencyKey).where(IdempotencyKey.key == "k0").values(expires_at=past))
+        await db.commit()
+
+    monkeypatch.setattr(settings, "IDEMPOTENCY_MAX_ROWS", 2)
+    purged = await MaintenanceSweeper(session_factory=TestingSessionLocal).run_once()
+    assert purged["idempotency_keys"] == 2
+
+    async with TestingSessionLocal() as db:
+        keys = (await db.execute(select(IdempotencyKey.key).order_by(IdempotencyKey.id))).scalars().all()
+        assert keys == ["k2", "k3"]
+        assert (await db.execute(select(func.count()).select_from(IdempotencyKey))).scalar_one() == 2
+
+
+@pytest.mark.asyncio
+async def test_sweeper_cap_keeps_pending_claims(async_client, monkeypatch):
+    headers = await _signup_and_login(async_client, username="pender", password="penderpw")
+    user_id = (await async_client.get("/users/me", headers=headers)).json()["id"]
+    async with TestingSessionLocal() as db:
+        expires = datetime.now(timezone.utc) + timedelta(hours=1)
+        db.add(IdempotencyKey(user_id=user_id, key="running", request_hash="h", expires_at=expires))
+        await db.commit()
+    for i in range(3):
+        r = await async_client.post("/tasks", json={"title": f"t{i}"}, headers={**headers, "Idempotency-Key": f"k{i}"})
+        assert r.status_code == 201
+
+    monkeypatch.setattr(settings, "IDEMPOTENCY_MAX_ROWS", 2)
+    purged = await MaintenanceSweeper(session_factory=TestingSessionLocal).run_once()
+    assert purged["idempotency_keys"] == 1
+
+    async with TestingSessionLocal() as db:
+        keys = (await db.execute(select(IdempotencyKey.key).order_by(IdempotencyKey.id))).scalars().all()
+        assert keys == ["running", "k1", "k2"]  # the oldest row is an in-flight claim, not counted
+
+
+@pytest.mark.asyncio
+async def test_response_is_stored_with_the_tasks(async_client, monkeypatch):
+    headers = await _signup_and_login(async_client, username="atomic", password="atomicpw")
+
+    # Storing the response can't fail separately from the insert any more
+    async def broken(*args, **kwargs):
+        raise RuntimeError("separate save")
+
+    monkeypatch.setattr(crud_idempotency, "save_idempotent_response", broken)
+    keyed = {**headers, "Idempotency-Key": "with-tasks"}
+    first = await async_client.post("/tasks/bulk", json={"create": [{"title": "a"}, {"title": "b"}]}, headers=keyed)
+    assert first.status_code == 200
+    again = await async_client.post("/tasks/bulk", json={"create": [{"title": "a"}, {"title": "b"}]}, headers=keyed)
+    assert again.content == first.content and again.headers["idempotent-replayed"] == "true"
+
+    # ... and when staging it fails, everything the request wrote rolls back with it and a retry runs again
+    ids = [t["id"] for t in first.json()["created"]]
+    monkeypatch.setattr(crud_idempotency, "stage_idempotent_response", broken)
+    keyed = {**headers, "Idempotency-Key": "rolled-back"}
+    body = {"create": [{"title": "never"}], "update_status": [{"id": ids[0], "status": "completed"}]}
+    with pytest.raises(RuntimeError):
+        await async_client.post("/tasks/bulk", json=body, headers=keyed)
+    tasks = (await async_client.get("/tasks", headers=headers)).json()
+    assert sorted((t["title"], t["status"]) for t in tasks) == [("a", "todo"), ("b", "todo")]
+    user_id = (await async_client.get("/users/me", headers=headers)).json()["id"]
+    async with TestingSessionLocal() as db:
+        assert await crud_idempotency.get_idempotency_record(db, user_id, "rolled-back") is None
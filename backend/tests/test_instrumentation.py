@@ -0,0 +1,128 @@
+import logging
+import re
+
+import pytest
+
+from app.core import instrumentation
+from app.core.config import settings
+from app.core.instrumentation import NPlusOneDetected, RequestTimingMiddleware, fingerprint
+from utils import _signup_and_login
+
+_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries", serialize;dur=([\d.]+), app;dur=([\d.]+)')
+
+
+def _server_timing(response) -> tuple[float, int, float, float]:
+    m = _TIMING.fullmatch(response.headers["server-timing"])
+    assert m, response.headers["server-timing"]
+    return float(m.group(1)), int(m.group(2)), float(m.group(3)), float(m.group(4))
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_counts_queries(async_client):
+    headers = await _signup_and_login(async_client, username="timed", password="timedpw")
+    await async_client.post("/tasks", json={"title": "t1"}, headers=headers)
+
+    r = await async_client.get("/tasks", headers=headers)
+    assert r.status_code == 200
+    db_ms, queries, serialize_ms, app_ms = _server_timing(r)
+    assert queries >= 3  # API key, user, task page
+    assert db_ms > 0 and serialize_ms > 0 and app_ms >= 0
+
+    # Unauthenticated requests are timed too (no queries run)
+    r = await async_client.get("/tasks")
+    assert _server_timing(r)[1] == 0
+
+
+@pytest.mark.asyncio
+async def test_diagnostic_headers_are_exposed_to_browsers(async_client):
+    r = await async_client.get("/tasks", headers={"Origin": "https://app.example.com"})
+    exposed = {h.strip().lower() for h in r.headers["access-control-expose-headers"].split(",")}
+    assert {"server-timing", "retry-after", "x-profile-id"} <= exposed
+
+
+@pytest.mark.asyncio
+async def test_slow_requests_are_logged(async_client, monkeypatch, caplog):
+    headers = await _signup_and_login(async_client, username="slowpoke", password="slowpw")
+    monkeypatch.setattr(settings, "SLOW_REQUEST_QUERIES", 2)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.instrumentation"):
+        await async_client.get("/tasks", headers=headers)
+    assert any(r.getMessage().startswith("Slow request GET /tasks -> 200") for r in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_sampled_requests_log_query_plans(async_client, monkeypatch, caplog):
+    headers = await _signup_and_login(async_client, username="planner", password="plannerpw")
+    await async_client.post("/tasks", json={"title": "t1"}, headers=headers)
+    plain = await async_client.get("/tasks", headers=headers)
+
+    monkeypatch.setattr(settings, "SQL_EXPLAIN_SAMPLE_RATE", 1.0)
+    with caplog.at_level(logging.INFO, logger="app.core.instrumentation"):
+        sampled = await async_client.get("/tasks", params={"sort": "asc"}, headers=headers)  # not a cached page
+
+    plans = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Query plan")]
+    assert 0 < len(plans) <= settings.SQL_EXPLAIN_MAX_STATEMENTS
+    assert any("tasks" in plan for plan in plans)
+    # EXPLAIN runs on the side and isn't counted as a request query
+    assert _server_timing(sampled)[1] == _server_timing(plain)[1]
+
+
+@pytest.mark.asyncio
+async def test_failed_explain_leaves_the_request_transaction_alone(async_client, monkeypatch, caplog):
+    headers = await _signup_and_login(async_client, username="badplan", password="badplanpw")
+    monkeypatch.setattr(settings, "SQL_EXPLAIN_SAMPLE_RATE", 1.0)
+    monkeypatch.setitem(instrumentation._EXPLAIN_PREFIX, "sqlite", "EXPLAIN NONSENSE ")
+
+    with caplog.at_level(logging.DEBUG, logger="app.core.instrumentation"):
+        created = await async_client.post("/tasks", json={"title": "kept"}, headers=headers)
+    assert created.status_code == 201
+    assert any(r.getMessage().startswith("EXPLAIN failed") for r in caplog.records)
+    monkeypatch.setattr(settings, "SQL_EXPLAIN_SAMPLE_RATE", 0.0)
+    tasks = (await async_client.get("/tasks", headers=headers)).json()
+    assert [t["title"] for t in tasks] == ["kept"]
+
+
+def test_fingerprint_collapses_in_lists():
+    a = fingerprint("SELECT id FROM tasks\n  WHERE parent_id IN (?, ?, ?)")
+    assert (
+        a
+        == fingerprint("SELECT id FROM tasks WHERE parent_id IN (?, ?)")
+        == "SELECT id FROM tasks WHERE parent_id IN (?, ...)"
+    )
+    assert fingerprint("SELECT id FROM tasks WHERE id = $1") != fingerprint("SELECT id FROM users WHERE id = $1")
+
+
+@pytest.mark.asyncio
+async def test_repeated_statement_shapes_are_flagged(async_client, monkeypatch, caplog):
+    headers = await _signup_and_login(async_client, username="repeater", password="repeatpw")
+    ids = [(await async_client.post("/tasks", json={"title": t}, headers=headers)).json()["id"] for t in "ab"]
+    # Bulk status updates run one UPDATE per target status: the same shape twice
+    body = {"update_status": [{"id": ids[0], "status": "completed"}, {"id": ids[1], "status": "cancelled"}]}
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 2)
+
+    monkeypatch.setattr(settings, "N_PLUS_ONE_DETECTION", "log")
+    with caplog.at_level(logging.WARNING, logger="app.core.instrumentation"):
+        r = await async_client.post("/tasks/bulk", json=body, headers=headers)
+    assert r.status_code == 200
+    warning = next(rec.getMessage() for rec in caplog.records if rec.getMessage().startswith("Possible N+1"))
+    assert "POST /tasks/bulk" in warning and "2x UPDATE tasks" in warning
+
+    monkeypatch.setattr(settings, "N_PLUS_ONE_DETECTION", "raise")
+    with pytest.raises(NPlusOneDetected, match="2x UPDATE tasks"):
+        await async_client.post("/tasks/bulk", json=body, headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_repeat_detection_does_not_mask_handler_errors(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "N_PLUS_ONE_DETECTION", "raise")
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 2)
+
+    async def failing(scope, receive, send):
+        instrumentation._current.get().shapes["SELECT id FROM tasks WHERE id = ?"] += 3
+        raise RuntimeError("handler failed")
+
+    scope = {"type": "http", "method": "GET", "path": "/boom"}
+    with caplog.at_level(logging.WARNING, logger="app.core.instrumentation"):
+        with pytest.raises(RuntimeError, match="handler failed"):
+            await RequestTimingMiddleware(failing)(scope, None, None)
+    assert any(r.getMessage().startswith("Possible N+1 in GET /boom") for r in caplog.records)
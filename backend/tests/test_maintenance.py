@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app.crud import user as crud_user
+from app.models.apikey import APIKey
+from app.models.email_outbox import EmailOutbox
+from app.models.email_token import EmailToken
+from app.models.user import User
+from app.services.maintenance import MaintenanceSweeper
+from conftest import TestingSessionLocal
+
+
+async def _count(model) -> int:
+    async with TestingSessionLocal() as db:
+        return (await db.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_sweep_purges_stale_rows_in_chunks(async_client):
+    now = datetime.now(timezone.utc)
+    naive = now.replace(tzinfo=None)
+    old = naive - timedelta(days=90)
+
+    async with TestingSessionLocal() as db:
+        user = await crud_user.create_user(db, "sweep", "pw")
+        db.add_all(
+            [EmailToken(user_id=user.id, purpose="verify", token_hash=f"old{i}", expires_at=old) for i in range(5)]
+            + [EmailToken(user_id=user.id, purpose="reset", token_hash="live", expires_at=naive + timedelta(hours=1))]
+            + [
+                APIKey(user_id=user.id, name="gone", prefix="a", secret_hash="h1", revoked=True, revoked_at=old),
+                APIKey(user_id=user.id, name="stale", prefix="b", secret_hash="h2", expires_at=old),
+                APIKey(user_id=user.id, name="live", prefix="c", secret_hash="h3"),
+                EmailOutbox(
+                    to_email="x@example.com",
+                    subject="s",
+                    html="h",
+                    status="sent",
+                    next_attempt_at=now - timedelta(days=90),
+                    created_at=now - timedelta(days=90),
+                ),
+                EmailOutbox(to_email="y@example.com", subject="s", html="h", next_attempt_at=now),
+            ]
+        )
+        user.verification_token = "stale-token"
+        user.verification_token_expires = old
+        await db.commit()
+
+    sweeper = MaintenanceSweeper(session_factory=TestingSessionLocal, chunk_size=2)
+    purged = await sweeper.run_once(now)
+
+    assert purged == {
+        "email_tokens": 5,
+        "api_keys": 2,
+        "email_outbox": 1,
+        "users.verification_token": 1,
+        "idempotency_keys": 0,
+    }
+    assert await _count(EmailToken) == 1
+    assert await _count(APIKey) == 1
+    assert await _count(EmailOutbox) == 1
+    async with TestingSessionLocal() as db:
+        assert (await db.execute(select(User.verification_token))).scalar_one() is None
+
+    # Stats accumulate across runs; a second pass finds nothing
+    assert await sweeper.run_once(now) == dict.fromkeys(purged, 0)
+    assert sweeper.stats.runs == 2
+    assert sweeper.stats.rows_purged["email_tokens"] == 5
+    assert sweeper.stats.total_duration_seconds > 0
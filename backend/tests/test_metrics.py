@@ -0,0 +1,106 @@
+import json
+import os
+import re
+
+import pytest
+
+from app.core.config import settings
+from app.core.metrics import MetricsRegistry, render_text
+from utils import _signup_and_login
+
+
+def _sample(text: str, name: str, **labels) -> float:
+    """Value of one sample line in Prometheus text output."""
+    for line in text.splitlines():
+        m = re.fullmatch(r"([a-z_]+)(?:\{(.*)\})? (\S+)", line)
+        if not m or m.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', m.group(2) or ""))
+        if all(found.get(k) == str(v) for k, v in labels.items()):
+            return float(m.group(3))
+    raise AssertionError(f"no sample {name} {labels} in:\n{text}")
+
+
+def test_registry_text_format():
+    reg = MetricsRegistry()
+    hits = reg.counter("demo_hits_total", "Hits", ("path",))
+    hist = reg.histogram("demo_seconds", "Latency", buckets=(0.1, 1.0))
+    hits.labels('/a"b').inc()
+    hits.labels('/a"b').inc(2)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        hist.observe(value)
+
+    text = render_text(reg.snapshot())
+    assert "# TYPE demo_hits_total counter" in text
+    assert 'demo_hits_total{path="/a\\"b"} 3' in text
+    assert _sample(text, "demo_seconds_bucket", le="0.1") == 2  # upper bounds are inclusive
+    assert _sample(text, "demo_seconds_bucket", le="1.0") == 3
+    assert _sample(text, "demo_seconds_bucket", le="+Inf") == 4
+    assert _sample(text, "demo_seconds_count") == 4
+    assert _sample(text, "demo_seconds_sum") == pytest.approx(3.65)
+
+
+@pytest.mark.asyncio
+async def test_multiprocess_snapshots_are_merged(tmp_path):
+    def worker_registry():
+        reg = MetricsRegistry(str(tmp_path))
+        return reg, reg.counter("jobs_total", "Jobs"), reg.gauge("busy", "Busy"), reg.histogram("lat", "Lat")
+
+    async def flush_as(reg, pid):
+        await reg.flush()
+        own = tmp_path / f"metrics_{os.getpid()}.json"
+        snapshot = json.loads(own.read_text())
+        own.unlink()
+        (tmp_path / f"metrics_{pid}.json").write_text(json.dumps({**snapshot, "pid": pid}))
+
+    # Another (still running) worker's snapshot
+    other, jobs, busy, lat = worker_registry()
+    jobs.inc(5)
+    busy.set(2)
+    lat.observe(0.2)
+    await flush_as(other, os.getppid())
+
+    # A worker that has exited: its counters still count, its gauges don't
+    gone, jobs, busy, _ = worker_registry()
+    jobs.inc(1)
+    busy.set(100)
+    await flush_as(gone, 2**22 + 1)  # above the default pid_max, so never a live process
+
+    this, jobs, busy, lat = worker_registry()
+    jobs.inc(10)
+    busy.set(1)
+    lat.observe(0.2)
+    text = this.render()
+
+    assert _sample(text, "jobs_total") == 16
+    assert _sample(text, "busy") == 3
+    assert _sample(text, "lat_count") == 2
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(async_client, monkeypatch):
+    headers = await _signup_and_login(async_client, username="metered", password="meteredpw")
+    created = await async_client.post(
+        "/tasks", json={"title": "root", "subtasks": [{"title": "leaf"}]}, headers=headers
+    )
+    await async_client.get(f"/tasks/{created.json()['id']}", headers=headers)
+
+    r = await async_client.get("/internal/metrics")
+    assert r.status_code == 404  # internal routes stay hidden without a token
+
+    monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", "s3cret")
+    r = await async_client.get("/internal/metrics", headers={"X-Internal-Token": "s3cret"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = r.text
+
+    route = {"method": "GET", "route": "/tasks/{task_id}"}
+    assert _sample(text, "taskaza_http_request_duration_seconds_count", status=200, **route) >= 1
+    assert _sample(text, "taskaza_http_request_queries_count", **route) >= 1
+    assert _sample(text, "taskaza_http_requests_in_flight") >= 1  # the scrape itself
+    assert _sample(text, "taskaza_task_tree_nodes_bucket", endpoint="get", le="2.0") >= 1
+    assert _sample(text, "taskaza_auth_scope_cache_total", result="hit") >= 0
+    assert _sample(text, "taskaza_password_hash_queue_depth") == 0
+    assert "taskaza_db_compiled_cache_total" in text
+    assert _sample(text, "taskaza_task_tree_cache_total", result="miss") >= 1
+    assert _sample(text, "taskaza_task_tree_cache_bytes") > 0
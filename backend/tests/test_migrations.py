@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.migrate import SchemaOutOfDate, check_schema, latest_version, migrate
+from app.db.session import Base
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite+aiosqlite:///{tmp_path / 'migrate.db'}"
+
+
+def _schema(sync_conn):
+    insp = inspect(sync_conn)
+    return {
+        table: ({c["name"] for c in insp.get_columns(table)}, {i["name"] for i in insp.get_indexes(table)})
+        for table in insp.get_table_names()
+    }
+
+
+@pytest.mark.asyncio
+async def test_fresh_database_matches_models(db_url):
+    engine = create_async_engine(db_url)
+    try:
+        with pytest.raises(SchemaOutOfDate):
+            await check_schema(engine)
+
+        applied = await migrate(engine)
+        assert applied == list(range(1, latest_version() + 1))
+        await check_schema(engine)
+        assert await migrate(engine) == []  # idempotent
+
+        async with engine.connect() as conn:
+            schema = await conn.run_sync(_schema)
+    finally:
+        await engine.dispose()
+
+    # Every model table/column/index exists, so models and migrations can't drift apart
+    for table in Base.metadata.sorted_tables:
+        columns, indexes = schema[table.name]
+        assert {c.name for c in table.columns} <= columns, table.name
+        assert {i.name for i in table.indexes} <= indexes, table.name
+
+
+@pytest.mark.asyncio
+async def test_migrations_do_not_depend_on_the_models(db_url, monkeypatch):
+    # Old migrations create the tables as they were then, whatever the models look like today
+    monkeypatch.setattr(Base, "metadata", MetaData())
+    engine = create_async_engine(db_url)
+    try:
+        await migrate(engine)
+        async with engine.connect() as conn:
+            schema = await conn.run_sync(_schema)
+    finally:
+        await engine.dispose()
+    assert {"users", "tasks", "api_keys", "email_tokens", "email_outbox"} <= set(schema)
+
+
+@pytest.mark.asyncio
+async def test_adopts_database_created_by_create_all(db_url):
+    engine = create_async_engine(db_url)
+    try:
+        # api_keys as the old create_all-on-boot produced it, before the usage columns existed
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(50))"))
+            await conn.execute(
+                text(
+                    "CREATE TABLE api_keys (id INTEGER PRIMARY KEY, user_id INTEGER, name VARCHAR(100), "
+                    "secret_hash VARCHAR(128), prefix VARCHAR(32), scopes TEXT, expires_at DATETIME, "
+                    "revoked BOOLEAN, created_at DATETIME, revoked_at DATETIME)"
+                )
+            )
+            await conn.execute(text("INSERT INTO api_keys (id, user_id, name) VALUES (1, 1, 'old')"))
+
+        await migrate(engine)
+
+        async with engine.connect() as conn:
+            schema = await conn.run_sync(_schema)
+            row = (await conn.execute(text("SELECT request_count, last_used_at FROM api_keys"))).one()
+    finally:
+        await engine.dispose()
+
+    assert {"last_used_at", "request_count"} <= schema["api_keys"][0]
+    assert tuple(row) == (0, None)  # existing rows keep working
+    assert "email_outbox" in schema
+    assert {"ix_tasks_user_created", "ix_tasks_user_parent"} <= schema["tasks"][1]
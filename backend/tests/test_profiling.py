@@ -0,0 +1,65 @@
+import pstats
+import re
+
+import pytest
+
+from app.core.config import settings
+from app.core.profiling import PROFILE_ID
+from utils import _signup_and_login
+
+TOKEN = "s3cret"
+
+
+@pytest.fixture
+def profiling(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", TOKEN)
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_profiled_request_writes_pstats_and_summary(async_client, profiling):
+    headers = await _signup_and_login(async_client, username="profiled", password="profiledpw")
+    await async_client.post("/tasks", json={"title": "root", "subtasks": [{"title": "leaf"}]}, headers=headers)
+
+    r = await async_client.get(
+        "/tasks", params={"include_tree": "true"}, headers={**headers, "X-Profile": "1", "X-Internal-Token": TOKEN}
+    )
+    assert r.status_code == 200
+    profile_id = r.headers["x-profile-id"]
+    assert PROFILE_ID.fullmatch(profile_id) and "-GET-tasks-" in profile_id
+
+    stats = pstats.Stats(str(profiling / f"{profile_id}.prof"))
+    assert any(func[2] == "get_tasks_for_user" for func in stats.stats)
+
+    r = await async_client.get(f"/internal/profiles/{profile_id}", headers={"X-Internal-Token": TOKEN})
+    assert r.status_code == 200
+    summary = r.text
+    assert summary.startswith("GET /tasks?include_tree=true -> 200")
+    assert re.search(r"^db +[\d.]+ms in \d+ queries$", summary, re.M)
+    assert "ncalls" in summary  # the pstats listing follows
+
+    r = await async_client.get(
+        f"/internal/profiles/{profile_id}", params={"format": "pstats"}, headers={"X-Internal-Token": TOKEN}
+    )
+    assert r.status_code == 200 and r.content == (profiling / f"{profile_id}.prof").read_bytes()
+
+    r = await async_client.get("/internal/profiles/..%2F..%2Fetc%2Fpasswd", headers={"X-Internal-Token": TOKEN})
+    assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_profiling_requires_token_and_switch(async_client, profiling, monkeypatch):
+    headers = await _signup_and_login(async_client, username="unprofiled", password="unprofiledpw")
+
+    r = await async_client.get("/tasks", headers={**headers, "X-Profile": "1"})
+    assert r.status_code == 200 and "x-profile-id" not in r.headers
+
+    r = await async_client.get("/tasks", headers={**headers, "X-Profile": "1", "X-Internal-Token": "wrong"})
+    assert "x-profile-id" not in r.headers
+
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", False)
+    r = await async_client.get("/tasks", headers={**headers, "X-Profile": "1", "X-Internal-Token": TOKEN})
+    assert "x-profile-id" not in r.headers
+    assert not list(profiling.iterdir())
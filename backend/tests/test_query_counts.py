@@ -0,0 +1,49 @@
+import pytest
+
+from utils import _signup_and_login
+
+# Statements per request, including auth (user + API key lookups). These are ceilings: lower is
+# fine, higher means a write path grew an extra round trip (e.g. a re-select after commit).
+MAX_QUERIES = {
+    "POST /tasks": 4,  # API key, user (+ its tasks), INSERT ... RETURNING
+    "PUT /tasks/{id}": 5,  # ... + task lookup, UPDATE ... RETURNING
+    "PATCH /tasks/{id}": 5,
+    "POST /tasks/bulk": 5,  # API key, user (+ its tasks), one multi-row INSERT, one UPDATE per target status
+}
+
+
+@pytest.mark.asyncio
+async def test_write_endpoint_query_counts(async_client, query_counter):
+    headers = await _signup_and_login(async_client, username="counter", password="counterpw")
+    seed = await async_client.post("/tasks", json={"title": "seed"}, headers=headers)
+    task_id = seed.json()["id"]
+
+    counts = {}
+    with query_counter:
+        r = await async_client.post("/tasks", json={"title": "new", "tags": ["a"]}, headers=headers)
+    assert r.status_code == 201 and r.json()["title"] == "new"
+    counts["POST /tasks"] = query_counter.count
+
+    with query_counter:
+        r = await async_client.put(f"/tasks/{task_id}", json={"title": "renamed"}, headers=headers)
+    assert r.status_code == 200 and r.json()["title"] == "renamed"
+    counts["PUT /tasks/{id}"] = query_counter.count
+
+    with query_counter:
+        r = await async_client.patch(f"/tasks/{task_id}", json={"status": "completed"}, headers=headers)
+    assert r.status_code == 200 and r.json()["status"] == "completed"
+    counts["PATCH /tasks/{id}"] = query_counter.count
+
+    bulk = {
+        "create": [{"title": "b1"}, {"title": "b2"}, {"title": "b3"}],
+        "update_status": [{"id": task_id, "status": "todo"}],
+    }
+    with query_counter:
+        r = await async_client.post("/tasks/bulk", json=bulk, headers=headers)
+    assert r.status_code == 200
+    assert [t["title"] for t in r.json()["created"]] == ["b1", "b2", "b3"]
+    assert [t["status"] for t in r.json()["updated"]] == ["todo"]
+    counts["POST /tasks/bulk"] = query_counter.count
+
+    for endpoint, ceiling in MAX_QUERIES.items():
+        assert counts[endpoint] <= ceiling, (endpoint, counts[endpoint], query_counter.statements)
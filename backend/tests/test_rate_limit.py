@@ -0,0 +1,91 @@
+import pytest
+
+from app.core import ratelimit
+from app.core.ratelimit import MemoryRateLimitStore, Rate, RateLimiter, RateLimitExceeded, SQLiteRateLimitStore
+
+
+def test_rate_parse():
+    assert Rate.parse("10/minute") == Rate(limit=10, window=60)
+    assert Rate.parse("5 / hours") == Rate(limit=5, window=3600)
+    assert Rate.parse("3/30s") == Rate(limit=3, window=30)
+    with pytest.raises(ValueError):
+        Rate.parse("ten per minute")
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_counts_previous_window():
+    lim = RateLimiter(MemoryRateLimitStore())
+    rate = Rate(limit=4, window=60)
+
+    for _ in range(4):
+        await lim.check("k", rate, now=50.0)
+    with pytest.raises(RateLimitExceeded):
+        await lim.check("k", rate, now=55.0)
+
+    # Early in the next window the previous window still weighs in heavily...
+    with pytest.raises(RateLimitExceeded) as exc:
+        await lim.check("k", rate, now=65.0)
+    assert exc.value.retry_after >= 1
+
+    # ...but once it has decayed, requests go through again
+    await lim.check("k", rate, now=175.0)
+
+
+@pytest.mark.asyncio
+async def test_memory_store_evicts_least_recently_hit_keys_when_full():
+    lim = RateLimiter(MemoryRateLimitStore(max_keys=10))
+    rate = Rate(limit=2, window=60)
+    await lim.check("victim", rate, now=1.0)
+    await lim.check("victim", rate, now=2.0)
+
+    # Spraying new keys evicts idle ones, not the counter of a key in use
+    for i in range(30):
+        await lim.check(f"spray{i}", rate, now=3.0)
+        if i % 5 == 0:
+            with pytest.raises(RateLimitExceeded):
+                await lim.check("victim", rate, now=3.0)
+    assert len(lim.store._buckets) <= 10
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_is_shared_between_instances(tmp_path):
+    db_path = str(tmp_path / "rl.db")
+    worker_a = RateLimiter(SQLiteRateLimitStore(db_path))
+    worker_b = RateLimiter(SQLiteRateLimitStore(db_path))
+    rate = Rate(limit=3, window=60)
+
+    await worker_a.check("login:x", rate, now=10.0)
+    await worker_b.check("login:x", rate, now=11.0)
+    await worker_a.check("login:x", rate, now=12.0)
+    with pytest.raises(RateLimitExceeded):
+        await worker_b.check("login:x", rate, now=13.0)
+
+
+@pytest.mark.asyncio
+async def test_login_is_throttled_per_username(async_client, monkeypatch):
+    monkeypatch.setattr(ratelimit.login_rate_limits[1], "rate", Rate(limit=3, window=60))
+    await async_client.post("/signup", json={"username": "rl", "password": "pw"})
+
+    for _ in range(3):
+        res = await async_client.post("/token", data={"username": "rl", "password": "wrong"})
+        assert res.status_code == 401
+
+    res = await async_client.post("/token", data={"username": "rl", "password": "pw"})
+    assert res.status_code == 429
+    assert int(res.headers["Retry-After"]) >= 1
+
+    # A different username from the same client is unaffected
+    res = await async_client.post("/token", data={"username": "someone-else", "password": "pw"})
+    assert res.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_password_reset_request_is_throttled_per_address(async_client, monkeypatch):
+    monkeypatch.setattr(ratelimit.email_rate_limits[1], "rate", Rate(limit=2, window=3600))
+    for _ in range(2):
+        res = await async_client.post("/auth/password-reset/request", json={"email": "nobody@example.com"})
+        assert res.status_code == 202
+
+    res = await async_client.post("/auth/password-reset/request", json={"email": "nobody@example.com"})
+    assert res.status_code == 429
+    assert "Retry-After" in res.headers
@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.auth import create_access_token
+from app.core.config import settings
+from app.core.dependencies import get_db, get_read_db
+from app.crud.apikey import create_api_key
+from app.db.routing import ReadRouter, read_router
+from app.db.session import Base
+from app.main import app
+from app.models.user import User
+from conftest import TestingSessionLocal, override_get_db
+from utils import _signup_and_login
+
+
+def test_router_sticks_to_primary_after_write():
+    primary, replica = object(), object()
+    router = ReadRouter(primary, replica, sticky_seconds=5)
+    assert router.session_for(1) is replica
+
+    router.mark_write(1)
+    assert router.session_for(1) is primary  # read-your-writes
+    assert router.session_for(2) is replica  # other users unaffected
+
+    router.mark_write(1, now=100.0)
+    assert router.is_sticky(1, now=104.9)
+    assert not router.is_sticky(1, now=105.0)
+
+    # Without a replica everything goes to the primary
+    assert ReadRouter(primary).session_for(1) is primary
+
+
+@pytest_asyncio.fixture
+async def replica(tmp_path, monkeypatch):
+    """A second SQLite file standing in for a lagging replica: it only sees what we copy into it."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    router = read_router
+    monkeypatch.setattr(router, "primary", TestingSessionLocal)
+    monkeypatch.setattr(router, "replica", factory)
+    monkeypatch.setattr(router, "sticky_seconds", 30)
+    app.dependency_overrides.pop(get_read_db)
+    try:
+        yield factory, router
+    finally:
+        app.dependency_overrides[get_read_db] = override_get_db
+        router.reset()
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_use_replica_except_right_after_writes(async_client, replica, monkeypatch):
+    factory, router = replica
+    monkeypatch.setattr(settings, "TASK_LIST_CACHE_ENABLED", False)  # every GET /tasks should hit a database
+    headers = await _signup_and_login(async_client, username="rory", password="rorypw")
+    async with TestingSessionLocal() as db:
+        user = (await db.execute(select(User).where(User.username == "rory"))).scalar_one()
+    assert router.is_sticky(user.id)  # signup counts as a write
+
+    # Replicate the user row only, then let the window lapse
+    async with factory() as db:
+        db.add(User(id=user.id, username=user.username, hashed_password=user.hashed_password))
+        await db.commit()
+    router.reset()
+
+    r = await async_client.get("/users/me", headers=headers)
+    assert r.status_code == 200 and r.json()["username"] == "rory"
+
+    r = await async_client.post("/tasks", json={"title": "fresh", "description": "d"}, headers=headers)
+    assert r.status_code == 201
+
+    # Within the window the user's reads go to the primary and see the new task
+    r = await async_client.get("/tasks", headers=headers)
+    assert [t["title"] for t in r.json()] == ["fresh"]
+
+    # Afterwards reads go to the replica, which hasn't caught up
+    router.reset()
+    r = await async_client.get("/tasks", headers=headers)
+    assert r.status_code == 200 and r.json() == []
+
+
+@pytest.mark.asyncio
+async def test_reads_hold_one_connection_per_request(async_client, tmp_path, monkeypatch):
+    # More concurrent reads than pooled connections: each request must make do with one
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", pool_size=2, max_overflow=0, pool_timeout=2
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    headers = []
+    async with factory() as db:
+        for i in range(8):
+            user = User(username=f"reader{i}", hashed_password="x", email_verified=True)
+            db.add(user)
+            await db.commit()
+            _, api_key = await create_api_key(db, user_id=user.id, name="k", scopes_json=None, expires_at=None)
+            token = create_access_token({"sub": str(user.id)})
+            headers.append({"Authorization": f"Bearer {token}", "X-API-Key": api_key})
+
+    async def pooled_db():
+        async with factory() as session:
+            yield session
+
+    monkeypatch.setattr(settings, "TASK_LIST_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+    monkeypatch.setattr(read_router, "primary", factory)
+    monkeypatch.setitem(app.dependency_overrides, get_db, pooled_db)
+    app.dependency_overrides.pop(get_read_db)
+    try:
+        responses = await asyncio.gather(*(async_client.get("/tasks", headers=h) for h in headers * 2))
+    finally:
+        app.dependency_overrides[get_read_db] = override_get_db
+        await engine.dispose()
+    assert [r.status_code for r in responses] == [200] * 16
+
+
+@pytest.mark.asyncio
+async def test_replica_pages_are_not_cached(async_client, replica, monkeypatch):
+    factory, router = replica
+    monkeypatch.setattr(settings, "TASK_LIST_CACHE_ENABLED", True)
+    headers = await _signup_and_login(async_client, username="quinn", password="quinnpw")
+    async with TestingSessionLocal() as db:
+        user = (await db.execute(select(User).where(User.username == "quinn"))).scalar_one()
+    async with factory() as db:
+        db.add(User(id=user.id, username=user.username, hashed_password=user.hashed_password))
+        await db.commit()
+
+    r = await async_client.post("/tasks", json={"title": "fresh", "description": "d"}, headers=headers)
+    assert r.status_code == 201
+
+    # The write was handled elsewhere: this worker reads the lagging replica, but must not cache what it saw
+    router.reset()
+    r = await async_client.get("/tasks", headers=headers)
+    assert r.json() == []
+
+    router.mark_write(user.id)
+    r = await async_client.get("/tasks", headers=headers)
+    assert [t["title"] for t in r.json()] == ["fresh"]
@@ -0,0 +1,86 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.core.auth import create_access_token
+from app.db.seed import SeedConfig, _Generator, parse_status_mix, seed
+from app.models.task import Task
+from app.models.user import User
+from conftest import engine_test
+
+CONFIG = SeedConfig(
+    users=3,
+    roots=4,
+    fanout=2,
+    depth=2,
+    tags=2,
+    anchor=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    batch_size=7,  # several batches, and batches that split trees
+)
+
+
+async def _task_rows():
+    async with engine_test.connect() as conn:
+        return (
+            await conn.execute(select(Task.id, Task.user_id, Task.parent_id, Task.title, Task.status, Task.tags))
+        ).all()
+
+
+@pytest.mark.asyncio
+async def test_seed_builds_trees_deterministically(async_client):
+    result = await seed(engine_test, CONFIG)
+    rows = await _task_rows()
+    assert result.tasks == len(rows) == 3 * CONFIG.tasks_per_user == 3 * 4 * 7
+
+    by_id = {r.id: r for r in rows}
+    roots = [r for r in rows if r.parent_id is None]
+    assert sorted(r.id for r in roots) == sorted(i for u in result.users for i in u.root_ids)
+    for r in rows:
+        if r.parent_id is not None:
+            assert by_id[r.parent_id].user_id == r.user_id  # children stay in their owner's tree
+    assert all(len(r.tags) == 2 for r in rows)
+
+    # Same seed, same data
+    async with engine_test.begin() as conn:
+        await conn.execute(delete(Task))
+        await conn.execute(delete(User))
+    await seed(engine_test, CONFIG)
+    assert await _task_rows() == rows
+
+
+@pytest.mark.asyncio
+async def test_seeded_api_keys_work(async_client):
+    result = await seed(engine_test, CONFIG)
+    user = result.users[1]
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}", "X-API-Key": user.api_keys[0]}
+
+    r = await async_client.get("/tasks", params={"roots_only": "true", "limit": 100}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert sorted(t["id"] for t in r.json()) == sorted(user.root_ids)
+
+
+def test_seeded_api_key_secrets_are_not_derived_from_the_seed():
+    one, two = _Generator(CONFIG).api_key(), _Generator(CONFIG).api_key()
+    assert one[1] == two[1]  # same row shape
+    assert one[0] != two[0] and one[2] != two[2]
+
+
+@pytest.mark.asyncio
+async def test_task_list_query_plan_uses_index(async_client):
+    await seed(engine_test, CONFIG)
+    async with engine_test.connect() as conn:
+        plan = " ".join(
+            row[-1]
+            for row in await conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN SELECT id FROM tasks WHERE user_id = ? ORDER BY created_at DESC LIMIT 20", (1,)
+            )
+        )
+    assert "ix_tasks_user_created" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_status_mix_validation():
+    assert parse_status_mix("todo=3, completed=1") == {"todo": 3.0, "completed": 1.0}
+    with pytest.raises(ValueError):
+        parse_status_mix("todo=1,blocked=2")
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight, task_reads
+from app.crud import task as crud_task
+from utils import _signup_and_login, _wait_for
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_reads_share_one_query(async_client, monkeypatch):
+    headers = await _signup_and_login(async_client, username="tabby", password="tabbypw")
+    await async_client.post("/tasks", json={"title": "shared"}, headers=headers)
+    monkeypatch.setattr(settings, "TASK_LIST_CACHE_ENABLED", False)
+
+    gate, calls = asyncio.Event(), []
+    real = crud_task.get_tasks_for_user
+
+    async def gated(*args, **kwargs):
+        calls.append(kwargs)
+        await gate.wait()
+        return await real(*args, **kwargs)
+
+    monkeypatch.setattr(crud_task, "get_tasks_for_user", gated)
+
+    requests = [asyncio.create_task(async_client.get("/tasks", headers=headers)) for _ in range(5)]
+    other = asyncio.create_task(async_client.get("/tasks", params={"sort": "asc"}, headers=headers))
+    await _wait_for(lambda: task_reads.stats.shared == 4 and len(calls) == 2)
+    gate.set()
+
+    responses = await asyncio.gather(*requests)
+    assert {r.status_code for r in responses} == {200} and len({r.content for r in responses}) == 1
+    assert [t["title"] for t in responses[0].json()] == ["shared"]
+    assert (await other).status_code == 200
+    assert len(calls) == 2  # one per distinct query
+    assert task_reads.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter(async_client):
+    headers = await _signup_and_login(async_client, username="missing", password="missingpw")
+    responses = await asyncio.gather(*(async_client.get("/tasks/999", headers=headers) for _ in range(3)))
+    assert [r.status_code for r in responses] == [404] * 3
+
+    flight, gate = SingleFlight(), asyncio.Event()
+
+    async def failing():
+        await gate.wait()
+        raise ValueError("boom")
+
+    calls = [asyncio.create_task(flight.do(1, "k", failing)) for _ in range(3)]
+    await _wait_for(lambda: flight.stats.shared == 2)
+    gate.set()
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results) and flight.stats.leaders == 1
+
+
+@pytest.mark.asyncio
+async def test_cancellation_and_writes():
+    flight, gate, runs = SingleFlight(), asyncio.Event(), []
+
+    async def render():
+        runs.append(1)
+        await gate.wait()
+        return len(runs)
+
+    # A waiter going away doesn't cancel the flight
+    leader = asyncio.create_task(flight.do(1, "k", render))
+    waiter = asyncio.create_task(flight.do(1, "k", render))
+    await _wait_for(lambda: flight.stats.shared == 1)
+    waiter.cancel()
+    await asyncio.sleep(0)
+    assert not leader.done()
+
+    # The leader going away hands the work to a waiter
+    follower = asyncio.create_task(flight.do(1, "k", render))
+    await _wait_for(lambda: flight.stats.shared == 2)
+    leader.cancel()
+    await _wait_for(lambda: len(runs) == 2)
+    gate.set()
+    assert await follower == 2
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+    # After a write, new reads start their own flight instead of joining one that read old rows
+    gate.clear()
+    before = asyncio.create_task(flight.do(1, "k", render))
+    await _wait_for(lambda: len(runs) == 3)
+    flight.forget(1)
+    after = asyncio.create_task(flight.do(1, "k", render))
+    await _wait_for(lambda: len(runs) == 4)
+    gate.set()
+    assert (await before, await after) == (4, 4)
+    assert flight.stats.leaders == 4 and flight.in_flight() == 0
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.sqlite import SingleWriter, sqlite_pragmas
+
+
+@pytest.mark.asyncio
+async def test_tuned_pragmas_applied(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tuned.db'}")
+    pragmas = sqlite_pragmas(file_based=True, tuned=True)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _apply(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    try:
+        async with engine.connect() as conn:
+            assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+            assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+            assert (await conn.execute(text("PRAGMA temp_store"))).scalar() == 2  # MEMORY
+            assert (await conn.execute(text("PRAGMA busy_timeout"))).scalar() > 0
+            assert (await conn.execute(text("PRAGMA foreign_keys"))).scalar() == 1
+    finally:
+        await engine.dispose()
+
+    # In-memory databases skip WAL/mmap/synchronous; untuned keeps the old FK + WAL behaviour
+    assert not any("journal_mode" in p or "mmap" in p for p in sqlite_pragmas(file_based=False, tuned=True))
+    assert sqlite_pragmas(file_based=True, tuned=False) == ["PRAGMA foreign_keys=ON", "PRAGMA journal_mode=WAL"]
+
+
+@pytest.mark.asyncio
+async def test_single_writer_serializes_in_order():
+    writer = SingleWriter(enabled=True)
+    active, peak, order = 0, 0, []
+
+    @writer.serialized
+    async def write(i: int):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.005)
+        async with writer.slot():  # re-entrant: nested writes don't deadlock
+            order.append(i)
+        active -= 1
+
+    await asyncio.gather(*(write(i) for i in range(10)))
+    assert peak == 1
+    assert order == list(range(10))  # FIFO
+    assert writer.acquired == 10 and writer.waiting == 0
@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy import event
+
+from app.crud import apikey as crud_apikey
+from app.crud import task as crud_task
+from app.crud import user as crud_user
+from app.db.pool import CompiledCacheStats
+from conftest import TestingSessionLocal, engine_test
+
+
+async def _hot_path(db, user_id: int, task_id: int, key_hash: str, title_filter: str):
+    await crud_user.get_user_by_id(db, user_id)
+    await crud_apikey.get_key_by_hash(db, key_hash)
+    await crud_task.get_task_by_id(db, task_id, user_id, include_tree=False)
+    await crud_task.get_task_by_id(db, task_id, user_id, include_tree=True)
+    return await crud_task.get_tasks_for_user(db, user_id, q=title_filter, status="todo", page=1, limit=10)
+
+
+@pytest.mark.asyncio
+async def test_hot_queries_hit_compiled_cache(async_client):
+    async with TestingSessionLocal() as db:
+        user = await crud_user.create_user(db, "cachy", "pw")
+        await crud_apikey.create_api_key(db, user_id=user.id, name="k", scopes_json=None, expires_at=None)
+        key = (await crud_apikey.list_api_keys(db, user.id))[0]
+        first = await crud_task.create_task(db, user.id, {"title": "alpha"})
+        await crud_task.create_task(db, user.id, {"title": "beta"})
+
+    stats = CompiledCacheStats()
+    event.listen(engine_test.sync_engine, "after_cursor_execute", stats._observe)
+    try:
+        async with TestingSessionLocal() as db:
+            await _hot_path(db, user.id, first.id, key.secret_hash, "alp")
+        warm_misses = stats.misses
+
+        # Same statements with different values: everything comes from the compiled cache
+        stats.hits = 0
+        async with TestingSessionLocal() as db:
+            rows = await _hot_path(db, user.id, first.id + 1, key.secret_hash, "bet")
+    finally:
+        event.remove(engine_test.sync_engine, "after_cursor_execute", stats._observe)
+
+    assert [t.title for t in rows] == ["beta"]  # lambda_stmt picked up the new closure values
+    assert stats.misses == warm_misses
+    assert stats.hits >= 5
@@ -0,0 +1,237 @@
+import pytest
+from sqlalchemy import update
+
+import app.api.v1.tasks
+import app.core.cache
+import app.crud.task
+from app.core.cache import (
+    CachedBody,
+    MemoryTaskListCache,
+    SQLiteTaskListCache,
+    TaskTreeCache,
+    resolve_task_list_store,
+    task_list_cache,
+    task_list_key,
+    task_tree_cache,
+    task_tree_cache_enabled,
+)
+from app.core.config import settings
+from app.models.task import Task
+from conftest import TestingSessionLocal
+from utils import _signup_and_login
+
+
+@pytest.mark.asyncio
+async def test_list_is_cached_until_a_write(async_client, query_counter):
+    headers = await _signup_and_login(async_client, username="cached", password="cachedpw")
+    created = await async_client.post("/tasks", json={"title": "one"}, headers=headers)
+    task_id = created.json()["id"]
+
+    first = await async_client.get("/tasks", headers=headers)
+    with query_counter:
+        second = await async_client.get("/tasks", headers=headers)
+    assert second.status_code == 200 and second.content == first.content
+    assert not any("FROM tasks" in s and "tasks.user_id = ?" in s for s in query_counter.statements)
+
+    # Params are part of the key
+    other = await async_client.get("/tasks", params={"status": "completed"}, headers=headers)
+    assert other.json() == []
+
+    async def titles(**params):
+        r = await async_client.get("/tasks", params=params, headers=headers)
+        return [(t["title"], t["status"]) for t in r.json()]
+
+    # Every write path invalidates the user's pages
+    await async_client.put(f"/tasks/{task_id}", json={"title": "renamed"}, headers=headers)
+    assert await titles() == [("renamed", "todo")]
+    await async_client.patch(f"/tasks/{task_id}", json={"status": "completed"}, headers=headers)
+    assert await titles() == [("renamed", "completed")]
+    assert await titles(status="completed") == [("renamed", "completed")]
+    await async_client.post("/tasks/bulk", json={"create": [{"title": "two"}]}, headers=headers)
+    assert len(await titles()) == 2
+    await async_client.delete(f"/tasks/{task_id}", headers=headers)
+    assert await titles() == [("two", "todo")]
+    assert task_list_cache.stats.hits >= 1
+
+
+@pytest.mark.asyncio
+async def test_users_do_not_share_pages(async_client):
+    alice = await _signup_and_login(async_client, username="alice", password="alicepw")
+    bob = await _signup_and_login(async_client, username="bobby", password="bobbypw")
+    await async_client.post("/tasks", json={"title": "alice's"}, headers=alice)
+
+    assert len((await async_client.get("/tasks", headers=alice)).json()) == 1
+    assert (await async_client.get("/tasks", headers=bob)).json() == []
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_lru_and_generations():
+    cache = MemoryTaskListCache(max_entries=3, max_per_user=2, ttl=60)
+    key = task_list_key(page=1)
+
+    generation, body = await cache.lookup(1, key)
+    assert body is None
+    await cache.store(1, key, generation, CachedBody(b"[1]"))
+    assert await cache.lookup(1, key) == (generation, CachedBody(b"[1]"))
+
+    # A read that raced a write doesn't cache what it read
+    generation, _ = await cache.lookup(1, "stale")
+    await cache.invalidate(1)
+    await cache.store(1, "stale", generation, CachedBody(b"old"))
+    assert (await cache.lookup(1, "stale"))[1] is None
+    assert (await cache.lookup(1, key))[1] is None
+
+    # Per-user cap, then the global cap evicts the least recently used user's pages first
+    for user_id in (1, 2):
+        for page in ("a", "b", "c"):
+            generation, _ = await cache.lookup(user_id, page)
+            await cache.store(user_id, page, generation, CachedBody(page.encode()))
+    assert [(await cache.lookup(2, page))[1] for page in ("b", "c")] == [CachedBody(b"b"), CachedBody(b"c")]
+    assert [(await cache.lookup(1, page))[1] for page in ("b", "c")] == [None, CachedBody(b"c")]
+    assert cache.stats.evictions == 3
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "cache.db")
+    one = SQLiteTaskListCache(path, max_entries=100, max_per_user=2, ttl=60)
+    two = SQLiteTaskListCache(path, max_entries=100, max_per_user=2, ttl=60)
+
+    generation, _ = await one.lookup(7, "k")
+    await one.store(7, "k", generation, CachedBody(b"[]"))
+    assert await two.lookup(7, "k") == (generation, CachedBody(b"[]"))
+
+    await two.invalidate(7)
+    generation_after, body = await one.lookup(7, "k")
+    assert body is None and generation_after != generation
+    await one.store(7, "k", generation, CachedBody(b"stale"))  # read before the write: dropped
+    assert (await two.lookup(7, "k"))[1] is None
+
+    for page in ("a", "b", "c"):
+        await one.store(7, page, generation_after, CachedBody(page.encode()))
+    assert (await two.lookup(7, "a"))[1] is None  # per-user cap keeps the 2 most recent
+    assert (await two.lookup(7, "c"))[1] == CachedBody(b"c")
+
+
+def test_auto_store_is_shared_with_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "TASK_LIST_CACHE_STORE", "auto")
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    assert resolve_task_list_store() == "memory"
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert resolve_task_list_store() == "sqlite"
+    monkeypatch.setattr(settings, "TASK_LIST_CACHE_STORE", "memory")
+    assert resolve_task_list_store() == "memory"  # an explicit store wins
+
+
+def _titles(tree: dict) -> list:
+    return [tree["title"], *(_titles(c) for c in tree.get("subtasks") or [])]
+
+
+@pytest.mark.asyncio
+async def test_tree_snapshots_invalidated_up_the_ancestor_chain(async_client):
+    headers = await _signup_and_login(async_client, username="arborist", password="arboristpw")
+    payload = {"title": "root", "subtasks": [{"title": "a", "subtasks": [{"title": "a1"}]}, {"title": "b"}]}
+    root = (await async_client.post("/tasks", json=payload, headers=headers)).json()["id"]
+
+    async def tree(task_id: int) -> dict:
+        r = await async_client.get(f"/tasks/{task_id}", headers=headers)
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    ids = {}
+    stack = [await tree(root)]
+    while stack:
+        node = stack.pop()
+        ids[node["title"]] = node["id"]
+        stack.extend(node["subtasks"])
+    for title in ("root", "a", "b"):
+        await tree(ids[title])
+
+    hits = task_tree_cache.stats.hits
+    assert _titles(await tree(root)) == ["root", ["a", ["a1"]], ["b"]]
+    assert task_tree_cache.stats.hits == hits + 1
+
+    # A change deep down reaches the root and "a", but "b" (not an ancestor) stays cached
+    await async_client.patch(f"/tasks/{ids['a1']}", json={"status": "completed"}, headers=headers)
+    assert (await tree(root))["subtasks"][0]["subtasks"][0]["status"] == "completed"
+    assert (await tree(ids["a"]))["subtasks"][0]["status"] == "completed"
+    hits = task_tree_cache.stats.hits
+    await tree(ids["b"])
+    assert task_tree_cache.stats.hits == hits + 1
+
+    # New child, then a move: both the old and the new chain are rebuilt
+    await async_client.post("/tasks", json={"title": "a2", "parent_id": ids["a"]}, headers=headers)
+    assert _titles(await tree(root)) == ["root", ["a", ["a1"], ["a2"]], ["b"]]
+    await tree(ids["b"])
+    await async_client.put(f"/tasks/{ids['a1']}", json={"parent_id": ids["b"]}, headers=headers)
+    assert _titles(await tree(ids["a"])) == ["a", ["a2"]]
+    assert _titles(await tree(ids["b"])) == ["b", ["a1"]]
+
+    # Deleting a subtree drops its own snapshots too
+    await tree(ids["a1"])
+    await async_client.delete(f"/tasks/{ids['b']}", headers=headers)
+    assert (await async_client.get(f"/tasks/{ids['a1']}", headers=headers)).status_code == 404
+    assert _titles(await tree(root)) == ["root", ["a", ["a2"]]]
+
+
+def test_tree_cache_byte_budget_and_races():
+    cache = TaskTreeCache(max_bytes=200, ttl=60)
+
+    token, body = cache.lookup(1, 10)
+    assert body is None
+    cache.invalidate(1, [10])  # a write lands while the tree is being built
+    cache.store(1, 10, token, CachedBody(b"x" * 10))
+    assert cache.lookup(1, 10)[1] is None
+
+    for task_id in (10, 11, 12, 13):
+        token, _ = cache.lookup(1, task_id)
+        cache.store(1, task_id, token, CachedBody(b"x" * 45))
+    assert cache.bytes == 180 and cache.tracks(1) and not cache.tracks(2)
+    cache.lookup(1, 10)  # now the most recently used
+
+    token, _ = cache.lookup(2, 1)
+    cache.store(2, 1, token, CachedBody(b"y" * 50))  # over budget: evicts the LRU snapshot (11)
+    assert cache.bytes == 185 and cache.stats.evictions == 1
+    assert cache.lookup(1, 11)[1] is None and cache.lookup(1, 10)[1] == CachedBody(b"x" * 45)
+
+    token, _ = cache.lookup(2, 2)
+    cache.store(2, 2, token, CachedBody(b"z" * 51))  # over a quarter of the budget: not cached
+    assert cache.lookup(2, 2)[1] is None
+
+    cache.invalidate_user(1)
+    assert cache.bytes == 50
+
+
+@pytest.mark.asyncio
+async def test_tree_snapshots_follow_writes_from_other_workers(async_client, tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.db")
+    shared = SQLiteTaskListCache(path, max_entries=100, max_per_user=10, ttl=60)
+    for module in (app.core.cache, app.crud.task, app.api.v1.tasks):
+        monkeypatch.setattr(module, "task_list_cache", shared)
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    headers = await _signup_and_login(async_client, username="worker", password="workerpw")
+    user_id = (await async_client.get("/users/me", headers=headers)).json()["id"]
+    task_id = (await async_client.post("/tasks", json={"title": "old"}, headers=headers)).json()["id"]
+
+    for _ in range(2):
+        r = await async_client.get(f"/tasks/{task_id}", headers=headers)
+        assert r.json()["title"] == "old"
+    assert task_tree_cache.stats.hits == 1
+
+    # Another worker renames the task: its CRUD layer bumps the shared generation, not our snapshots
+    async with TestingSessionLocal() as db:
+        await db.execute(update(Task).where(Task.id == task_id).values(title="new"))
+        await db.commit()
+    await SQLiteTaskListCache(path, max_entries=100, max_per_user=10, ttl=60).invalidate(user_id)
+    r = await async_client.get(f"/tasks/{task_id}", headers=headers)
+    assert r.json()["title"] == "new"
+
+
+def test_tree_cache_needs_a_shared_store_with_several_workers(monkeypatch):
+    monkeypatch.setattr(app.core.cache, "task_list_cache", MemoryTaskListCache(10, 10, 60))
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    assert task_tree_cache_enabled()
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert not task_tree_cache_enabled()
+    monkeypatch.setattr(app.core.cache, "task_list_cache", SQLiteTaskListCache(":memory:", 10, 10, 60))
+    assert task_tree_cache_enabled()
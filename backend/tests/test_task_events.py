@@ -0,0 +1,226 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.services.task_events import (
+    LocalBroker,
+    SQLiteBroker,
+    TaskEventHub,
+    resolve_task_events_broker,
+    task_events,
+)
+from conftest import app
+from utils import _signup_and_login
+
+
+def _parse(raw: bytes) -> list[dict]:
+    """SSE frames -> [{"id": ..., "event": ..., "data": ...}]; comments and `retry:` are skipped."""
+    events = []
+    for block in raw.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if "event" in fields:
+            events.append({"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])})
+    return events
+
+
+class _Stream:
+    """GET /tasks/stream driven straight through the ASGI app (httpx's transport buffers whole bodies)."""
+
+    def __init__(self, headers: dict, last_event_id: int | None = None):
+        headers = {**headers, "Accept": "text/event-stream"}
+        if last_event_id is not None:
+            headers["Last-Event-ID"] = str(last_event_id)
+        self.scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/tasks/stream",
+            "raw_path": b"/tasks/stream",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            "client": ("127.0.0.1", 1234),
+            "server": ("test", 80),
+        }
+        self.started: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.body = bytearray()
+        self._received = asyncio.Event()
+        self._disconnect = asyncio.Event()
+        self._requested = False
+        self.task = asyncio.create_task(app(self.scope, self._receive, self._send))
+
+    async def _receive(self):
+        if not self._requested:
+            self._requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self._disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def _send(self, message):
+        if message["type"] == "http.response.start":
+            self.started.set_result(message)
+        elif message["type"] == "http.response.body":
+            self.body += message.get("body", b"")
+            self._received.set()
+
+    async def events(self, count: int) -> list[dict]:
+        async with asyncio.timeout(5):
+            while len(_parse(bytes(self.body))) < count:
+                self._received.clear()
+                await self._received.wait()
+        return _parse(bytes(self.body))
+
+    async def close(self) -> None:
+        self._disconnect.set()
+        async with asyncio.timeout(5):
+            await self.task
+
+
+@pytest.mark.asyncio
+async def test_stream_pushes_changes_and_resumes_with_last_event_id(async_client):
+    headers = await _signup_and_login(async_client, username="watcher", password="watcherpw")
+    other = await _signup_and_login(async_client, username="bystander", password="bystanderpw")
+
+    stream = _Stream(headers)
+    start = await asyncio.wait_for(stream.started, 5)
+    assert start["status"] == 200
+    assert dict(start["headers"])[b"content-type"].startswith(b"text/event-stream")
+
+    parent = (await async_client.post("/tasks", json={"title": "parent"}, headers=headers)).json()
+    child = await async_client.post("/tasks", json={"title": "child", "parent_id": parent["id"]}, headers=headers)
+    await async_client.post("/tasks", json={"title": "not mine"}, headers=other)
+    await async_client.patch(f"/tasks/{parent['id']}", json={"status": "completed"}, headers=headers)
+    await async_client.delete(f"/tasks/{parent['id']}", headers=headers)
+
+    events = await stream.events(4)
+    assert [e["event"] for e in events] == ["task.created", "task.created", "task.status", "task.deleted"]
+    assert events[0]["data"]["title"] == "parent" and events[2]["data"]["status"] == "completed"
+    assert events[3]["data"] == {"id": parent["id"], "deleted": sorted([parent["id"], child.json()["id"]])}
+    assert [e["id"] for e in events] == sorted(e["id"] for e in events)
+    await stream.close()
+    assert task_events.streams() == 0
+
+    # Reconnecting after the first event replays the rest; an id from before this worker started resets
+    resumed = _Stream(headers, last_event_id=events[0]["id"])
+    assert await resumed.events(3) == events[1:]
+    await resumed.close()
+    stale = _Stream(headers, last_event_id=1)
+    assert [e["event"] for e in await stale.events(1)] == ["reset"]
+    await stale.close()
+    assert (task_events.stats.resumed, task_events.stats.resets) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_open_streams_are_limited_per_user(async_client, monkeypatch):
+    headers = await _signup_and_login(async_client, username="tabby", password="tabbypw")
+    monkeypatch.setattr(settings, "TASK_EVENTS_MAX_STREAMS_PER_USER", 1)
+    stream = _Stream(headers)
+    await asyncio.wait_for(stream.started, 5)
+
+    r = await async_client.get("/tasks/stream", headers=headers)
+    assert r.status_code == 429
+    r = await async_client.get("/tasks/stream")
+    assert r.status_code in (401, 403)
+    await stream.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_streams_are_closed_and_idle_ones_kept_alive(monkeypatch):
+    monkeypatch.setattr(settings, "TASK_EVENTS_QUEUE_SIZE", 2)
+    monkeypatch.setattr(settings, "TASK_EVENTS_REPLAY_SIZE", 2)
+    monkeypatch.setattr(settings, "TASK_EVENTS_HEARTBEAT_SECONDS", 0.02)
+    hub = TaskEventHub(LocalBroker())
+
+    slow, backlog = hub.subscribe(7)
+    await hub.publish(7, [("task.created", "{}")] * 3)
+    frames = [frame async for frame in hub.frames(slow, backlog)]
+    assert frames[0].startswith(b"retry:") and len(_parse(b"".join(frames))) == 2
+    assert hub.stats.overflows == 1 and hub.streams(7) == 0
+
+    # Only the last REPLAY_SIZE events are kept: resuming from further back resets
+    ids = [e["id"] for e in _parse(b"".join(frames))]
+    _, replay = hub.subscribe(7, last_event_id=ids[0])
+    replayed = [e["id"] for e in _parse(b"".join(replay))]
+    assert len(replayed) == 2 and replayed[0] == ids[1]
+    _, replay = hub.subscribe(7, last_event_id=ids[0] - 1)
+    assert [e["event"] for e in _parse(b"".join(replay))] == ["reset"]
+
+    idle, backlog = hub.subscribe(8)
+    body = hub.frames(idle, backlog)
+    assert (await anext(body)).startswith(b"retry:")
+    assert await anext(body) == b": keep-alive\n\n"
+    await body.aclose()
+    assert hub.streams(8) == 0
+
+
+@pytest.mark.asyncio
+async def test_replay_buffers_are_bounded_in_bytes(monkeypatch):
+    monkeypatch.setattr(settings, "TASK_EVENTS_REPLAY_MAX_BYTES", 1000)
+    hub = TaskEventHub(LocalBroker())
+    data = json.dumps({"title": "x" * 200})
+
+    await hub.publish(1, [("task.created", data)])
+    first = hub._history[1].events[0][0]
+    for user_id in (2, 3, 4):
+        await hub.publish(user_id, [("task.created", data)] * 2)
+    # The least recently active user went first; its client has to refetch
+    assert 1 not in hub._history and hub._history_bytes <= 1000
+    _, replay = hub.subscribe(1, last_event_id=first)
+    assert [e["event"] for e in _parse(b"".join(replay))] == ["reset"]
+
+    # A single user over the budget keeps its newest events
+    await hub.publish(5, [("task.created", data)] * 10)
+    assert list(hub._history) == [5] and 1 <= len(hub._history[5].events) < 10
+    assert hub._history_bytes == hub._history[5].size <= 1000
+
+
+class _FailingBroker(LocalBroker):
+    async def publish(self, user_id, events):
+        raise ConnectionError("broker is down")
+
+
+@pytest.mark.asyncio
+async def test_broker_errors_do_not_fail_committed_writes(async_client, caplog):
+    headers = await _signup_and_login(async_client, username="unheard", password="unheardpw")
+    task_events.use_broker(_FailingBroker())
+
+    r = await async_client.post("/tasks", json={"title": "saved anyway"}, headers=headers)
+    assert r.status_code == 201
+    assert [t["title"] for t in (await async_client.get("/tasks", headers=headers)).json()] == ["saved anyway"]
+    assert (task_events.stats.published, task_events.stats.failed) == (0, 1)
+    assert any(rec.getMessage().startswith("Publishing 1 task events") for rec in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_broker_fans_out_across_workers(tmp_path):
+    path = str(tmp_path / "events.db")
+    publisher, listener = TaskEventHub(SQLiteBroker(path, 0.01)), TaskEventHub(SQLiteBroker(path, 0.01))
+    runs = [asyncio.create_task(hub.broker.run()) for hub in (publisher, listener)]
+    try:
+        stream, _ = listener.subscribe(3)
+        await publisher.publish(3, [("task.created", '{"id": 1}'), ("task.deleted", '{"id": 1, "deleted": [1]}')])
+        async with asyncio.timeout(5):
+            frames = [await stream.queue.get(), await stream.queue.get()]
+        events = _parse(b"".join(frames))
+        assert [e["event"] for e in events] == ["task.created", "task.deleted"]
+
+        # Ids come from the shared file, so a client can resume on either worker
+        assert b"".join(publisher.subscribe(3, last_event_id=events[0]["id"])[1]) == frames[1]
+    finally:
+        for run in runs:
+            run.cancel()
+        await asyncio.gather(*runs, return_exceptions=True)
+
+
+def test_auto_broker_is_shared_with_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "TASK_EVENTS_BROKER", "auto")
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    assert resolve_task_events_broker() == "local"
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert resolve_task_events_broker() == "sqlite"
+    monkeypatch.setattr(settings, "TASK_EVENTS_BROKER", "local")
+    assert resolve_task_events_broker() == "local"  # an explicit broker wins
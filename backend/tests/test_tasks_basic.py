@@ -62,7 +62,7 @@ async def test_create_list_get_update_patch_delete(async_client):
 
 
 @pytest.mark.asyncio
-async def test_filters_pagination_and_sort(async_client):
+async def test_filters_pagination_and_sort(async_client, assert_max_queries):
     headers = await _signup_and_login(async_client, "pager", "pw")
 
     # Create 5 tasks with different titles/status
@@ -84,8 +84,9 @@ async def test_filters_pagination_and_sort(async_client):
     q_items = r.json()
     assert any("T1" in t["title"] for t in q_items)
 
-    # Pagination (limit=2, page=2)
-    r = await async_client.get("/tasks?limit=2&page=2&sort=desc", headers=headers)
+    # Pagination (limit=2, page=2): auth plus a single page query
+    with assert_max_queries(4):
+        r = await async_client.get("/tasks?limit=2&page=2&sort=desc", headers=headers)
     assert r.status_code == 200
     page2 = r.json()
     assert len(page2) <= 2  # must not exceed page size
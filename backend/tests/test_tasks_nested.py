@@ -3,7 +3,7 @@ from utils import _signup_and_login
 
 
 @pytest.mark.asyncio
-async def test_create_and_list_with_tree(async_client):
+async def test_create_and_list_with_tree(async_client, assert_max_queries):
     headers = await _signup_and_login(async_client, "treeuser", "pw")
 
     # Create a task with nested subtasks (create_subtree defaults to True)
@@ -21,8 +21,9 @@ async def test_create_and_list_with_tree(async_client):
     root = r.json()
     assert root["title"] == "Parent"
 
-    # List with include_tree to hydrate subtasks
-    r = await async_client.get("/tasks?include_tree=true", headers=headers)
+    # List with include_tree to hydrate subtasks: one query per level for the whole page
+    with assert_max_queries(6):
+        r = await async_client.get("/tasks?include_tree=true", headers=headers)
     assert r.status_code == 200
     items = r.json()
     parent = next(x for x in items if x["id"] == root["id"])
@@ -109,7 +110,7 @@ async def test_nested_does_not_leak_into_roots_only_and_can_be_individually_dele
 
 
 @pytest.mark.asyncio
-async def test_ultra_nested_subtasks_full_flow(async_client):
+async def test_ultra_nested_subtasks_full_flow(async_client, assert_max_queries):
     # -----------------------
     # Helpers (local to test)
     # -----------------------
@@ -195,7 +196,9 @@ async def test_ultra_nested_subtasks_full_flow(async_client):
         ],
     }
 
-    r = await async_client.post("/tasks", json=payload, headers=headers)
+    # One INSERT per tree level (and column set), not per node
+    with assert_max_queries(8):  # auth (3) + 5 levels
+        r = await async_client.post("/tasks", json=payload, headers=headers)
     assert r.status_code == 201
     root_shallow = r.json()
     root_id = root_shallow["id"]
@@ -204,7 +207,9 @@ async def test_ultra_nested_subtasks_full_flow(async_client):
     assert "subtasks" not in root_shallow
 
     # ---- Read single (tree) and verify deep structure is fully present ----
-    r = await async_client.get(f"/tasks/{root_id}?include_tree=true", headers=headers)
+    # Auth, the root, then one query per tree level however many nodes there are
+    with assert_max_queries(9):
+        r = await async_client.get(f"/tasks/{root_id}?include_tree=true", headers=headers)
     assert r.status_code == 200
     tree = r.json()
     assert tree["id"] == root_id
@@ -267,11 +272,12 @@ async def test_ultra_nested_subtasks_full_flow(async_client):
 
     # ---- Reparent (move) a subtree: move L3-A1 under "Draft content" ----
     # Use PATCH for partial update semantics (only changing parent_id)
-    r = await async_client.put(
-        f"/tasks/{l3_a1_id}",
-        json={"parent_id": l1_draft_id},
-        headers=headers,
-    )
+    with assert_max_queries(7):  # auth, lookups, one cycle-check query per level below the moved task
+        r = await async_client.put(
+            f"/tasks/{l3_a1_id}",
+            json={"parent_id": l1_draft_id},
+            headers=headers,
+        )
     assert r.status_code == 200
     moved = r.json()
     assert moved["parent_id"] == l1_draft_id
@@ -1,3 +1,5 @@
+import asyncio
+
 from httpx import AsyncClient
 
 from conftest import TestingSessionLocal
@@ -24,3 +26,10 @@ async def _signup_and_login(async_client: AsyncClient, username="alice", passwor
 
     headers = {"Authorization": f"Bearer {token}", "X-API-Key": display_key}
     return headers
+
+
+async def _wait_for(condition, timeout: float = 5.0) -> None:
+    """Poll `condition` until it holds, failing with TimeoutError after `timeout` seconds."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.005)